@@ -1,7 +1,108 @@
 # app.py
+import asyncio
+from typing import Optional
+
 import streamlit as st
 from core.schema import Response
-from core.graph import workflow
+from core.graph import (
+    CHECKPOINT_PATH, aprepare_final_rerun, aprepare_resume, checkpointed_async_workflow,
+    new_thread_id, thread_config,
+)
+from core.node import GUIDES
+from core.telemetry import run_breakdown, span, start_metrics_server
+
+start_metrics_server()  # no-op unless METRICS_PORT is set
+
+# nodes whose LLM output is streamed token by token into the page
+STREAMED_NODES = {"llm_node": "merge", "final_updated_node": "final"}
+
+async def stream_review(graph, run_input, config, guideline_slots, merge_slot, final_slot) -> dict:
+    """
+    Drive the async workflow's astream and paint results as they arrive:
+    "updates" events fill each guideline as its node finishes, "messages" events
+    stream merge/final tokens. run_input None continues the thread's checkpoint.
+    Returns the accumulated final state as a dict.
+    """
+    if run_input is None:
+        # resuming: start from (and show) what the checkpoint already has
+        state = dict((await graph.aget_state(config)).values)
+        for key, slot in guideline_slots.items():
+            if state.get(key):
+                slot.markdown(state[key])
+        if state.get("merge_guide_res"):
+            merge_slot.markdown(state["merge_guide_res"])
+    else:
+        state = run_input.model_dump()
+    # token buffers per LLM call (a chunked final transform or a hedged call runs several at once)
+    buffers = {"merge": {}, "final": {}}
+    async for mode, chunk in graph.astream(run_input, config, stream_mode=["updates", "messages"]):
+        if mode == "updates":
+            for _node, update in (chunk or {}).items():
+                for key, value in (update or {}).items():
+                    state[key] = value
+                    if key in guideline_slots and value:
+                        guideline_slots[key].markdown(value)
+                    elif key == "merge_guide_res" and value and not buffers["merge"]:
+                        merge_slot.markdown(value)  # MERGE_MODE=local: no tokens to stream
+        elif mode == "messages":
+            message, meta = chunk
+            target = STREAMED_NODES.get((meta or {}).get("langgraph_node"))
+            text = getattr(message, "content", "")
+            if not target or not isinstance(text, str) or not text:
+                continue
+            run = buffers[target]
+            msg_id = getattr(message, "id", None)
+            run[msg_id] = run.get(msg_id, "") + text
+            # one call per preview: parallel chunk calls and hedged duplicates stream under the
+            # same node, so show the call furthest along (the likely hedge winner), never a mix
+            live = max(run.values(), key=len)
+            if target == "merge":
+                merge_slot.markdown(live)
+            else:
+                final_slot.code(live, language="java")
+    return state
+
+NO_SUGGESTIONS = "No suggestions produced."
+
+def suggestions_key() -> str:
+    # one text area per checkpoint thread, so a new review never shows the previous one's edits
+    return f"final_sugg_{st.session_state.get('thread_id')}"
+
+def edited_suggestions(stored: Optional[str]) -> Optional[str]:
+    """The user's edits to the merged suggestions, or None when the text area holds nothing new."""
+    edited = st.session_state.get(suggestions_key()) or ""
+    if not edited.strip() or edited.strip() in (NO_SUGGESTIONS, (stored or "").strip()):
+        return None
+    return edited
+
+async def run_review(action, code, guideline_slots, merge_slot, final_slot) -> dict:
+    """
+    action "new": fresh checkpoint thread for this session; "resume": continue the last
+    run from its last completed node; "final": re-run only the final transform with the
+    stored (or edited) merged suggestions.
+    """
+    async with checkpointed_async_workflow() as graph:
+        run_input = None
+        if action == "new":
+            old = st.session_state.get("thread_id")
+            if old and graph.checkpointer is not None:
+                await graph.checkpointer.adelete_thread(old)  # keep one thread per session
+            st.session_state["thread_id"] = new_thread_id()
+            run_input = Response(code_snippet=code)
+        config = thread_config(st.session_state["thread_id"])
+        if action == "resume" and not await aprepare_resume(graph, config):
+            return dict((await graph.aget_state(config)).values)  # already complete: just show it
+        if action == "final":
+            stored = ((await graph.aget_state(config)).values or {}).get("merge_guide_res")
+            if not await aprepare_final_rerun(graph, config, edited_suggestions(stored)):
+                raise RuntimeError("the last run has no merged suggestions yet — resume it first")
+        return await stream_review(graph, run_input, config, guideline_slots, merge_slot, final_slot)
+
+STATUS = {
+    "new": "Running 10 guideline agents in parallel then merging — results appear as each agent finishes.",
+    "resume": "Resuming the last run from its last completed step…",
+    "final": "Re-running only the final transform with the current suggestions…",
+}
 
 st.set_page_config(page_title="Simple Java Review", layout="wide")
 st.title("Simple Multi-Agent Java Review — Minimal")
@@ -10,44 +111,99 @@ st.write("Paste or upload Java code. App runs 10 parallel checks and shows two o
 uploaded = st.file_uploader("Upload Java file", type=["java"], key="upload")
 pasted = st.text_area("Or paste Java code (overrides upload)", height=300, key="paste")
 
-if st.button("Run review"):
+# every run is checkpointed under a thread id kept in the session (CHECKPOINT_PATH)
+col_run, col_resume, col_final = st.columns(3)
+action = None
+if col_run.button("Run review"):
+    action = "new"
+if col_resume.button("Resume last run", disabled=not CHECKPOINT_PATH,
+                     help="Continue a failed or interrupted run; finished guideline calls are reused."):
+    action = "resume"
+if col_final.button("Re-run final transform only", disabled=not CHECKPOINT_PATH,
+                    help="Re-apply the final suggestions (including your edits) without re-running the agents."):
+    action = "final"
+
+if action:
     code = None
-    filename = "pasted.java"
-    if pasted and pasted.strip():
-        code = pasted
-    elif uploaded:
-        try:
-            code = uploaded.getvalue().decode("utf-8")
-            filename = uploaded.name
-        except Exception:
-            code = uploaded.getvalue().decode("latin-1")
-            filename = uploaded.name
-    else:
-        st.error("Provide Java code by uploading or pasting.")
+    filename = st.session_state.get("filename", "pasted.java")
+    if action == "new":
+        filename = "pasted.java"
+        if pasted and pasted.strip():
+            code = pasted
+        elif uploaded:
+            try:
+                code = uploaded.getvalue().decode("utf-8")
+                filename = uploaded.name
+            except Exception:
+                code = uploaded.getvalue().decode("latin-1")
+                filename = uploaded.name
+        else:
+            st.error("Provide Java code by uploading or pasting.")
+            st.stop()
+        st.session_state["filename"] = filename
+    elif not st.session_state.get("thread_id"):
+        st.error("No earlier run in this session — use “Run review” first.")
         st.stop()
 
-    st.info("Running 10 guideline agents in parallel then merging — please wait.")
-    init_state = Response(code_snippet=code)
+    status = st.empty()
+    status.info(STATUS[action])
+
+    # live placeholders, filled from the graph stream
+    st.markdown("## Guideline findings")
+    guideline_slots = {}
+    for i in range(1, 11):
+        gid = f"G{str(i).zfill(2)}"
+        title = GUIDES.get(gid, (gid, ""))[0]
+        with st.expander(f"{gid} — {title}", expanded=False):
+            guideline_slots[f"guideline_{i}"] = st.empty()
+            guideline_slots[f"guideline_{i}"].caption("waiting…")
+    st.markdown("## Final consolidated suggestions")
+    merge_slot = st.empty()
+    merge_slot.caption("waiting for guideline agents…")
+    st.markdown("## Final updated code")
+    final_slot = st.empty()
+    final_slot.caption("waiting for merged suggestions…")
+
     try:
-        final_state = workflow.invoke(init_state)
+        with span("review", kind="review", filename=filename, action=action) as review_span:
+            final_state = asyncio.run(run_review(action, code, guideline_slots, merge_slot, final_slot))
     except Exception as e:
-        st.error(f"Workflow invocation failed: {e}")
+        hint = " Completed steps are saved — use “Resume last run” to continue." if CHECKPOINT_PATH else ""
+        status.error(f"Workflow invocation failed: {e}.{hint}")
         st.stop()
 
-    # fetch merged suggestions and final code (state may be dict or pydantic)
-    if isinstance(final_state, dict):
-        merge_text = final_state.get("merge_guide_res", "")
-        final_code = final_state.get("final_updated_code", "")
-    else:
-        merge_text = getattr(final_state, "merge_guide_res", "") or ""
-        final_code = getattr(final_state, "final_updated_code", "") or ""
+    # ⏱️ Sidebar: where this run's time went
+    st.sidebar.markdown(f"### Run timing — {review_span.duration:.1f}s total")
+    rows = run_breakdown(review_span.trace_id)
+    if rows:
+        st.sidebar.dataframe(rows, hide_index=True, use_container_width=True)
+        st.sidebar.caption(
+            f"{sum(r['calls'] for r in rows)} LLM calls ({sum(r['cached'] for r in rows)} cached), "
+            f"{sum(r['retries'] for r in rows)} retries, {sum(r['tokens'] for r in rows)} tokens. "
+            "wall_s per node; queue_s is time waiting on rate limits."
+        )
+    compaction = final_state.get("compaction_report") or {}
+    if compaction.get("enabled") and compaction.get("tokens_before"):
+        st.sidebar.caption(
+            f"Compaction: guideline prompts carry ~{compaction['tokens_after']} code tokens instead of "
+            f"~{compaction['tokens_before']} (-{compaction['saved_pct']}%)."
+        )
+    units = final_state.get("unit_cache_report") or {}
+    if units.get("lookups"):
+        st.sidebar.caption(
+            f"Findings cache: {units['hits']}/{units['lookups']} unit reviews reused "
+            f"({units['hit_rate']:.0%}) across {units['units']} units."
+        )
+
+    merge_text = final_state.get("merge_guide_res", "") or ""
+    final_code = final_state.get("final_updated_code", "") or ""
 
     # 🎉 Balloons on success
     if (merge_text and merge_text.strip()) or (final_code and final_code.strip()):
-        st.success("Review completed — results below 🎉")
+        status.success("Review completed — results below 🎉")
         st.balloons()
     else:
-        st.info("Review completed but no suggestions/final code were produced.")
+        status.info("Review completed but no suggestions/final code were produced.")
 
     # # 🖼️ Sidebar: workflow diagram
     # try:
@@ -58,10 +214,15 @@ if st.button("Run review"):
     # except Exception as e:
     #     st.sidebar.warning(f"Could not render workflow graph: {e}")
 
-    # Main outputs
-    st.markdown("## Final consolidated suggestions")
-    st.text_area("Final suggestions (LLM)", value=(merge_text or "No suggestions produced."), height=300, key="final_sugg")
-
-    st.markdown("## Final updated code")
-    st.code(final_code or "// no final code produced", language="java", line_numbers=True)
+    # Main outputs (replace the live previews with the final widgets)
+    merge_slot.text_area("Final suggestions (LLM)", value=(merge_text or NO_SUGGESTIONS), height=300,
+                         key=suggestions_key())
+    final_slot.code(final_code or "// no final code produced", language="java", line_numbers=True)
+    report = final_state.get("final_patch_report") or {}
+    if report:
+        st.caption(f"Diff mode: {report.get('applied', 0)}/{report.get('hunks', 0)} hunks applied "
+                   f"({report.get('fuzzy', 0)} with fuzzy context).")
+        if report.get("rejected"):
+            with st.expander(f"{len(report['rejected'])} rejected hunk(s)"):
+                st.json(report["rejected"])
     st.download_button("Download final code", final_code or "", file_name=f"final_{filename}", key="dl_final")
@@ -0,0 +1,161 @@
+# batch_review.py
+"""
+Bulk repository review from the command line.
+
+Walks a directory for .java files, runs `workflow` on each across a bounded
+thread/process pool and appends one JSON line per file to the results file as
+soon as that file finishes. Files already present (without error) in the results
+file are skipped, so an interrupted run can simply be restarted. A file whose LLM
+calls failed or timed out inside the graph is written with its "degraded" stages
+and reviewed again on the next run.
+
+    python batch_review.py path/to/repo --out review_results.jsonl --workers 8
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, Set
+
+
+def iter_java_files(root: Path, pattern: str = "*.java") -> Iterator[Path]:
+    skip_dirs = {".git", "build", "target", "out", "node_modules", ".gradle", ".idea"}
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if d not in skip_dirs)
+        for name in sorted(filenames):
+            path = Path(dirpath) / name
+            if path.match(pattern):
+                yield path
+
+
+def load_done(out_path: Path) -> Set[str]:
+    """Relative paths already reviewed successfully in a previous run."""
+    done: Set[str] = set()
+    if not out_path.exists():
+        return done
+    with out_path.open("r", encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn last line from an interrupted run
+            if rec.get("path") and not rec.get("error") and not rec.get("degraded"):
+                done.add(rec["path"])
+    return done
+
+
+def review_file(root: str, rel_path: str) -> Dict[str, Any]:
+    """Worker: review one file. Module-level so it pickles for process pools."""
+    from core.clients import call_stats
+    from core.graph import workflow
+    from core.schema import Response
+    from core.telemetry import span
+
+    started = time.time()
+    calls_before = call_stats()["calls"]
+    rec: Dict[str, Any] = {"path": rel_path}
+    try:
+        raw = (Path(root) / rel_path).read_bytes()
+        try:
+            code = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            code = raw.decode("latin-1")
+        with span("review", kind="review", path=rel_path) as sp:
+            rec["trace_id"] = sp.trace_id  # look up its spans in TRACE_FILE
+            final_state = workflow.invoke(Response(code_snippet=code))
+        rec["merge_guide_res"] = final_state.get("merge_guide_res", "") or ""
+        rec["final_updated_code"] = final_state.get("final_updated_code", "") or ""
+        rec["compaction"] = final_state.get("compaction_report")
+        rec["unit_cache"] = final_state.get("unit_cache_report")
+        if final_state.get("degraded"):  # fallback output: retried on restart
+            rec["degraded"] = final_state["degraded"]
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+    rec["elapsed_s"] = round(time.time() - started, 3)
+    # exact in process pools (one file per process at a time); approximate with threads
+    rec["calls"] = call_stats()["calls"] - calls_before
+    return rec
+
+
+def run(args: argparse.Namespace) -> int:
+    root = Path(args.root).resolve()
+    out_path = Path(args.out)
+    done = load_done(out_path)
+    todo = [str(p.relative_to(root)) for p in iter_java_files(root, args.pattern)]
+    todo = [p for p in todo if p not in done]
+    total = len(todo)
+    print(f"{len(done)} files already reviewed, {total} to go ({args.workers} {args.executor} workers)")
+    if not total:
+        return 0
+
+    use_processes = args.executor == "process"
+    pool_cls = ProcessPoolExecutor if use_processes else ThreadPoolExecutor
+    pool = pool_cls(max_workers=args.workers)
+    if not use_processes:
+        from core.clients import call_stats
+        calls_base = call_stats()["calls"]
+
+    started = time.time()
+    last_report = 0.0
+    finished = failed = degraded = calls_from_results = tokens_saved = 0
+    unit_hits = unit_lookups = 0
+    pending: Dict[Any, str] = {}  # future -> relative path
+    queue = iter(todo)
+    # keep at most 2x workers in flight so memory stays flat on huge trees
+    max_in_flight = max(1, args.workers * 2)
+    with pool, out_path.open("a", encoding="utf-8") as out:
+        while True:
+            for rel in queue:
+                pending[pool.submit(review_file, str(root), rel)] = rel
+                if len(pending) >= max_in_flight:
+                    break
+            if not pending:
+                break
+            completed, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in completed:
+                rel = pending.pop(fut)
+                try:
+                    rec = fut.result()
+                except Exception as e:  # worker crashed (e.g. BrokenProcessPool)
+                    rec = {"path": rel, "error": f"{type(e).__name__}: {e}"}
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+                finished += 1
+                failed += 1 if rec.get("error") else 0
+                degraded += 1 if rec.get("degraded") else 0
+                calls_from_results += rec.get("calls", 0)
+                tokens_saved += (rec.get("compaction") or {}).get("saved_tokens", 0)
+                unit_hits += (rec.get("unit_cache") or {}).get("hits", 0)
+                unit_lookups += (rec.get("unit_cache") or {}).get("lookups", 0)
+
+            now = time.time()
+            if now - last_report >= args.progress_every or not pending:
+                last_report = now
+                minutes = max(now - started, 1e-6) / 60
+                # threads share this process' counter; process workers report their own
+                calls = calls_from_results if use_processes else call_stats()["calls"] - calls_base
+                units = f" unit_cache_hits={unit_hits / unit_lookups:.0%}" if unit_lookups else ""
+                print(
+                    f"[{finished}/{total}] files/min={finished / minutes:.1f} "
+                    f"calls/min={calls / minutes:.1f} failed={failed} degraded={degraded} prompt_tokens_saved~{tokens_saved}{units}",
+                    flush=True,
+                )
+    return 1 if failed or degraded else 0
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Review every .java file under a directory.")
+    ap.add_argument("root", help="repository / directory to walk")
+    ap.add_argument("--out", default="review_results.jsonl", help="JSONL results file (appended, used for resume)")
+    ap.add_argument("--workers", type=int, default=4, help="pool size")
+    ap.add_argument("--executor", choices=("thread", "process"), default="thread")
+    ap.add_argument("--pattern", default="*.java", help="file name glob")
+    ap.add_argument("--progress-every", type=float, default=10.0, help="seconds between throughput lines")
+    return run(ap.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
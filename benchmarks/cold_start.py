@@ -0,0 +1,101 @@
+# benchmarks/cold_start.py
+"""
+Cold-start benchmark: how long a fresh interpreter takes to become useful.
+
+    python -m benchmarks.cold_start               # 5 fresh processes per step
+    python -m benchmarks.cold_start --runs 10 --top 15 --json cold.json
+
+Each step runs in its own `python -X importtime` subprocess (nothing warm is shared):
+  import_node     import core.node              (prompt builders, clients, no graph)
+  import_graph    import core.graph             (langgraph, no compilation)
+  compile_sync    core.graph.get_workflow()
+  compile_async   core.graph.get_async_workflow()
+  first_review    one stub-mode review through the sync workflow
+Reports median/min/max wall time per step and the slowest packages by cumulative import time.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+STEPS: Dict[str, str] = {
+    "import_node": "import core.node",
+    "import_graph": "import core.graph",
+    "compile_sync": "import core.graph as g; g.get_workflow()",
+    "compile_async": "import core.graph as g; g.get_async_workflow()",
+    "first_review": (
+        "import core.graph as g; "
+        "g.get_workflow().invoke({'code_snippet': 'public class A { public int x; }'})"
+    ),
+}
+
+_TIMER = "import time as _t; _s = _t.perf_counter(); {body}; print('__ELAPSED__', _t.perf_counter() - _s)"
+_IMPORT_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s*(\S+)")
+
+
+def run_step(body: str) -> Tuple[float, List[Tuple[str, float]]]:
+    """(seconds, [(package, cumulative import seconds)]) from one fresh process."""
+    env = dict(os.environ, USE_STUB="true", LLM_CACHE="false", PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _TIMER.format(body=body)],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    m = re.search(r"__ELAPSED__ ([0-9.]+)", proc.stdout)
+    if proc.returncode != 0 or not m:
+        raise RuntimeError(f"step failed: {body}\n{proc.stderr[-2000:]}")
+    # slowest import per top-level package (our own core/config modules contain everything else)
+    packages: Dict[str, float] = {}
+    for line in proc.stderr.splitlines():
+        im = _IMPORT_RE.match(line)
+        if im:
+            root = im.group(3).split(".")[0]
+            if root not in ("core", "config", "benchmarks"):
+                packages[root] = max(packages.get(root, 0.0), int(im.group(2)) / 1e6)
+    return float(m.group(1)), list(packages.items())
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Measure import / compile / first-review cold start")
+    ap.add_argument("--runs", type=int, default=5, help="fresh processes per step")
+    ap.add_argument("--steps", default=",".join(STEPS), help="comma-separated subset of steps")
+    ap.add_argument("--top", type=int, default=10, help="slowest packages to list")
+    ap.add_argument("--json", help="write results to this file")
+    args = ap.parse_args(argv)
+
+    results = {}
+    for name in (s for s in args.steps.split(",") if s in STEPS):
+        times, slowest = [], {}
+        for _ in range(args.runs):
+            secs, imports = run_step(STEPS[name])
+            times.append(secs)
+            for mod, cum in imports:
+                slowest[mod] = max(slowest.get(mod, 0.0), cum)
+        results[name] = {
+            "median_s": round(statistics.median(times), 3),
+            "min_s": round(min(times), 3),
+            "max_s": round(max(times), 3),
+            "top_imports": [(m, round(t, 3)) for m, t in sorted(slowest.items(), key=lambda kv: -kv[1])[:args.top]],
+        }
+        r = results[name]
+        print(f"{name:<14} median={r['median_s']:<7} min={r['min_s']:<7} max={r['max_s']}")
+
+    last = results.get("first_review") or next(reversed(results.values()), None)
+    if last:
+        print("\nslowest packages to import (cumulative s):")
+        for mod, secs in last["top_imports"]:
+            print(f"  {secs:>7.3f}  {mod}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
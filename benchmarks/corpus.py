@@ -0,0 +1,98 @@
+# benchmarks/corpus.py
+"""Deterministic Java corpus of varying size for the benchmarks."""
+import random
+from pathlib import Path
+from typing import List, Tuple
+
+# name -> approximate size in characters
+SIZES = {"small": 2_000, "medium": 10_000, "large": 40_000, "xlarge": 100_000}
+
+_FIELD_TYPES = ["String", "int", "long", "List<String>", "Map<String, Integer>", "Vector<Integer>", "boolean"]
+
+
+def _method(rng: random.Random, cls: str, k: int) -> str:
+    kind = rng.choice(("loop", "try", "getter", "null", "legacy"))
+    if kind == "loop":
+        return (
+            f"    public List<String> transform{k}(List<String> input) {{\n"
+            f"        List<String> out = new ArrayList<>();\n"
+            f"        for (String s : input) {{\n"
+            f"            if (s != null && s.length() > {k % 7}) {{\n"
+            f"                out.add(s.trim().toUpperCase());\n"
+            f"            }}\n"
+            f"        }}\n"
+            f"        return out;\n"
+            f"    }}\n"
+        )
+    if kind == "try":
+        return (
+            f"    public void load{k}(String path) {{\n"
+            f"        try {{\n"
+            f"            java.nio.file.Files.readAllLines(java.nio.file.Paths.get(path));\n"
+            f"        }} catch (Exception e) {{\n"
+            f"            e.printStackTrace();\n"
+            f"        }}\n"
+            f"    }}\n"
+        )
+    if kind == "getter":
+        return f"    public List<String> getItems{k}() {{ return items; }}\n"
+    if kind == "null":
+        return (
+            f"    public int size{k}(Map<String, List<String>> m, String key) {{\n"
+            f"        return m.get(key).size();\n"
+            f"    }}\n"
+        )
+    return (
+        f"    public Hashtable<String, Integer> counts{k}(String[] words) {{\n"
+        f"        Hashtable<String, Integer> h = new Hashtable<>();\n"
+        f"        for (int i = 0; i < words.length; i++) {{\n"
+        f"            h.put(words[i], h.getOrDefault(words[i], 0) + 1);\n"
+        f"        }}\n"
+        f"        return h;\n"
+        f"    }}\n"
+    )
+
+
+def generate_java(target_chars: int, seed: int = 0, name: str = "Generated") -> str:
+    rng = random.Random(f"{seed}:{target_chars}:{name}")
+    parts = [
+        "/*\n * Copyright (c) Example Corp. All rights reserved.\n */\n",
+        "package com.example.bench;\n\nimport java.util.*;\n\n",
+    ]
+    size = sum(len(p) for p in parts)
+    cls_idx = 0
+    while size < target_chars:
+        cls = f"{name}{cls_idx}"
+        body = [f"/**\n * {cls} generated for benchmarking.\n */\npublic class {cls} {{\n"]
+        for f in range(rng.randint(2, 5)):
+            vis = rng.choice(("private", "public", ""))
+            body.append(f"    {vis + ' ' if vis else ''}{rng.choice(_FIELD_TYPES)} field{f};\n")
+        body.append("    private List<String> items = new ArrayList<>();\n\n")
+        for k in range(rng.randint(3, 8)):
+            body.append(_method(rng, cls, k) + "\n")
+        if rng.random() < 0.3:
+            body.append(
+                "    @Override\n    public boolean equals(Object o) {\n"
+                f"        return o instanceof {cls} && ((({cls}) o).field0 == field0);\n    }}\n"
+            )
+        body.append("}\n\n")
+        text = "".join(body)
+        parts.append(text)
+        size += len(text)
+        cls_idx += 1
+    return "".join(parts)
+
+
+def build_corpus(per_size: int = 3, sizes: Tuple[str, ...] = tuple(SIZES), seed: int = 0) -> List[Tuple[str, str]]:
+    """[(name, java_source)] — `per_size` distinct files for each size class."""
+    corpus = []
+    for size in sizes:
+        for i in range(per_size):
+            corpus.append((f"{size}_{i}.java", generate_java(SIZES[size], seed + i, f"{size.title()}{i}")))
+    return corpus
+
+
+def load_corpus(directory: str) -> List[Tuple[str, str]]:
+    root = Path(directory)
+    return [(str(p.relative_to(root)), p.read_text(encoding="utf-8", errors="replace"))
+            for p in sorted(root.rglob("*.java"))]
@@ -0,0 +1,328 @@
+# benchmarks/fake_llm.py
+"""
+Deterministic stand-in for the Groq chat model.
+
+FakeLLM plugs into core.clients in-process (clients.set_llm_client) and `serve()`
+exposes the same behaviour as an OpenAI-compatible HTTP endpoint, so the real
+ChatGroq client can be pointed at it with GROQ_BASE_URL=http://127.0.0.1:<port>.
+
+Per call it simulates:
+  * time-to-first-token drawn from a log-normal distribution (median, sigma),
+  * generation time at a fixed tokens/sec rate for the reply length,
+  * injected 429 (with a retry hint) and 5xx errors at configurable rates,
+  * replies shaped like the real ones (Finding template, merge template, Java file).
+Randomness is seeded from the prompt and its attempt number, so a rerun of the
+same corpus produces the same sequence of latencies, errors and replies.
+
+    python -m benchmarks.fake_llm --port 8089 --median-latency 0.8
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+
+
+@dataclass
+class FakeLLMConfig:
+    median_latency: float = 0.6     # seconds to first token (log-normal median)
+    latency_sigma: float = 0.5      # log-normal shape; 0 = fixed latency
+    tokens_per_sec: float = 250.0   # generation speed; 0 = instant
+    error_429_rate: float = 0.0     # probability a call is rate limited
+    error_5xx_rate: float = 0.0     # probability a call fails with 503
+    retry_after: float = 1.0        # seconds advertised on 429s
+    seed: int = 0
+    time_scale: float = 1.0         # multiply every sleep (0 = no sleeping, for quick runs)
+
+
+class FakeRateLimitError(Exception):
+    status_code = 429
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"Rate limit reached for model. Please try again in {retry_after:.2f}s.")
+        self.response = type("FakeResponse", (), {"status_code": 429, "headers": {"retry-after": f"{retry_after:.2f}"}})()
+
+
+class FakeServerError(Exception):
+    status_code = 503
+
+    def __init__(self):
+        super().__init__("Service Unavailable (injected)")
+        self.response = type("FakeResponse", (), {"status_code": 503, "headers": {}})()
+
+
+# -----------------------
+# Reply templates
+# -----------------------
+_METHOD_RE = re.compile(r"\b(?:public|private|protected|static|\s)+[\w<>\[\], ?]+\s+(\w+)\s*\([^;{]*\)\s*(?:throws [\w., ]+)?\{")
+_SEVERITIES = ("High", "Medium", "Low")
+
+
+def _methods(code: str) -> List[str]:
+    names = [m.group(1) for m in _METHOD_RE.finditer(code)]
+    return [n for n in names if n not in ("if", "for", "while", "switch", "catch")] or ["approximate"]
+
+
+def _section(prompt: str, name: str) -> str:
+    m = re.search(rf"{name}:\n(.*?)(?:\n\nRespond only|\Z)", prompt, re.S)
+    return m.group(1) if m else ""
+
+
+def _findings(rng: random.Random, guid: str, code: str, count: int) -> str:
+    methods = _methods(code)
+    out = []
+    for k in range(count):
+        area = rng.choice(methods)
+        out.append(
+            f"- Finding: {guid} issue {k + 1} in {area}\n"
+            f"- Area: {area}\n"
+            f"- Severity: {rng.choice(_SEVERITIES)}\n"
+            f"- Confidence: {rng.randint(2, 5)}\n"
+            f"- Issue: {area} does not follow guideline {guid}.\n"
+            f"- Fix: Apply the {guid} recommendation in {area}.\n"
+            f"- Patch (optional): ```java\n  // {guid}: minimal change in {area}\n  ```\n"
+        )
+    return "\n".join(out)
+
+
+def _diff(rng: random.Random, code: str, max_hunks: int = 3) -> str:
+    """A unified diff touching a few declaration lines; line numbers are sometimes off, as with real models."""
+    lines = code.splitlines()
+    targets = [i for i, ln in enumerate(lines) if re.search(r"\b(public|return)\b", ln)]
+    picked = sorted(rng.sample(targets, min(max_hunks, len(targets))))
+    out, last = ["--- a/Original.java", "+++ b/Original.java"], -1
+    for i in picked:
+        lo, hi = max(0, i - 3), min(len(lines), i + 4)
+        if lo <= last:
+            continue  # keep hunks disjoint
+        last = hi
+        claimed = lo + 1 + (rng.randint(-5, 5) if rng.random() < 0.3 else 0)
+        out.append(f"@@ -{claimed},{hi - lo} +{claimed},{hi - lo + 1} @@")
+        for j in range(lo, hi):
+            if j == i:
+                indent = lines[j][:len(lines[j]) - len(lines[j].lstrip())]
+                out.append(f"+{indent}// reviewed")
+            out.append(f" {lines[j]}")
+    return "\n".join(out) if len(out) > 2 else ""
+
+
+def render_reply(prompt: str, rng: random.Random) -> str:
+    """A reply of the shape the real model returns for each prompt family."""
+    if prompt.startswith("GUIDELINE:") and "\nUNITS:\n" in prompt:
+        guid = prompt[len("GUIDELINE:"):].split("|", 1)[0].strip()
+        parts = re.split(r"^### (U\d+)[^\n]*\n", prompt.split("\nUNITS:\n", 1)[-1], flags=re.M)
+        return "\n".join(
+            f"### {uid}\n" + ("NONE" if rng.random() < 0.6 else _findings(rng, guid, code, rng.randint(1, 2)))
+            for uid, code in zip(parts[1::2], parts[2::2])
+        )
+    if prompt.startswith("GUIDELINE:"):
+        guid = prompt[len("GUIDELINE:"):].split("|", 1)[0].strip()
+        code = prompt.split("CODE:\n", 1)[-1]
+        if "respond with exactly: NONE" in prompt and rng.random() < 0.4:
+            return "NONE"
+        return _findings(rng, guid, code, rng.randint(1, 3))
+    if prompt.startswith("GUIDELINES:"):
+        guids = re.findall(r"^(G\d{2}) \|", prompt, re.M)
+        code = prompt.split("CODE:\n", 1)[-1]
+        return "\n".join(f"### {g}\n" + _findings(rng, g, code, rng.randint(1, 2)) for g in guids)
+    if prompt.startswith("You are a strict integrator"):
+        items = []
+        for i in range(1, 11):
+            g = f"G{i:02d}"
+            items.append(
+                f"- Title: Consolidated {g} fix\n- Trigger: {g}\n- Area: approximate\n"
+                f"- Severity: {rng.choice(_SEVERITIES)}\n- Rationale: Agents agree on {g}.\n"
+                f"- Change: Apply {g}.\n"
+            )
+        return "\n".join(items) + "\nMinimal Patch:\n" + "\n".join(f"// edit {i}" for i in range(1, 6))
+    if "Return ONLY a unified diff" in prompt:
+        return _diff(rng, _section(prompt, "ORIGINAL_CODE"))
+    if "ORIGINAL_FRAGMENT:" in prompt:
+        return _section(prompt, "ORIGINAL_FRAGMENT")
+    if "ORIGINAL_CODE:" in prompt:
+        code = _section(prompt, "ORIGINAL_CODE")
+        return "/* Applied: G01,G02,G03,G04,G05,G06,G07,G08,G09,G10 */\n" + code
+    return "ok"
+
+
+# -----------------------
+# Model
+# -----------------------
+@dataclass
+class FakeLLM:
+    """ChatGroq look-alike: invoke/ainvoke(input=..., max_tokens=..., temperature=...)."""
+
+    config: FakeLLMConfig = field(default_factory=FakeLLMConfig)
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._attempts: Dict[str, int] = {}
+        self.stats = {"calls": 0, "errors_429": 0, "errors_5xx": 0, "prompt_tokens": 0, "completion_tokens": 0}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for k in self.stats:
+                self.stats[k] = 0
+
+    def _plan(self, prompt: str, max_tokens: Optional[int]) -> Tuple[float, Optional[Exception], str, Dict[str, int]]:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            attempt = self._attempts.get(digest, 0)
+            self._attempts[digest] = attempt + 1
+            self.stats["calls"] += 1
+        rng = random.Random(f"{self.config.seed}:{digest}:{attempt}")
+        cfg = self.config
+        ttft = cfg.median_latency * (math.exp(rng.gauss(0, cfg.latency_sigma)) if cfg.latency_sigma else 1.0)
+        roll = rng.random()
+        if roll < cfg.error_429_rate:
+            with self._lock:
+                self.stats["errors_429"] += 1
+            return ttft * 0.1, FakeRateLimitError(cfg.retry_after), "", {}
+        if roll < cfg.error_429_rate + cfg.error_5xx_rate:
+            with self._lock:
+                self.stats["errors_5xx"] += 1
+            return ttft, FakeServerError(), "", {}
+        text = render_reply(prompt, rng)
+        completion = len(text) // CHARS_PER_TOKEN + 1
+        if max_tokens and completion > max_tokens:
+            text = text[: max_tokens * CHARS_PER_TOKEN]
+            completion = max_tokens
+        usage = {"prompt_tokens": len(prompt) // CHARS_PER_TOKEN + 1, "completion_tokens": completion}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        with self._lock:
+            self.stats["prompt_tokens"] += usage["prompt_tokens"]
+            self.stats["completion_tokens"] += usage["completion_tokens"]
+        gen = completion / cfg.tokens_per_sec if cfg.tokens_per_sec else 0.0
+        return ttft + gen, None, text, usage
+
+    @staticmethod
+    def _message(text: str, usage: Dict[str, int]) -> Any:
+        try:
+            from langchain_core.messages import AIMessage
+        except ImportError:
+            return {"content": text, "usage": usage}
+        return AIMessage(
+            content=text,
+            response_metadata={"token_usage": usage, "model_name": "fake-llm"},
+            usage_metadata={"input_tokens": usage["prompt_tokens"], "output_tokens": usage["completion_tokens"],
+                            "total_tokens": usage["total_tokens"]},
+        )
+
+    def invoke(self, input: str, max_tokens: Optional[int] = None, temperature: float = 0.0, **_: Any) -> Any:
+        delay, error, text, usage = self._plan(str(input), max_tokens)
+        time.sleep(delay * self.config.time_scale)
+        if error is not None:
+            raise error
+        return self._message(text, usage)
+
+    async def ainvoke(self, input: str, max_tokens: Optional[int] = None, temperature: float = 0.0, **_: Any) -> Any:
+        delay, error, text, usage = self._plan(str(input), max_tokens)
+        await asyncio.sleep(delay * self.config.time_scale)
+        if error is not None:
+            raise error
+        return self._message(text, usage)
+
+
+# -----------------------
+# OpenAI-compatible HTTP server
+# -----------------------
+def _make_handler(llm: FakeLLM):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):  # keep benchmark output clean
+            pass
+
+        def _send(self, status: int, body: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_POST(self):
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": "not found"}})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            req = json.loads(self.rfile.read(length) or b"{}")
+            prompt = "\n".join(str(m.get("content", "")) for m in req.get("messages", []))
+            try:
+                msg = llm.invoke(prompt, max_tokens=req.get("max_tokens"))
+            except FakeRateLimitError as e:
+                self._send(429, {"error": {"message": str(e), "type": "rate_limit_exceeded"}},
+                           {"retry-after": e.response.headers["retry-after"]})
+                return
+            except FakeServerError as e:
+                self._send(503, {"error": {"message": str(e)}})
+                return
+            text = getattr(msg, "content", None) or msg["content"]
+            usage = getattr(msg, "response_metadata", {}).get("token_usage") if not isinstance(msg, dict) else msg["usage"]
+            self._send(200, {
+                "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()),
+                "model": req.get("model", "fake-llm"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": usage,
+            })
+
+    return Handler
+
+
+def serve(port: int = 8089, config: Optional[FakeLLMConfig] = None, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """Start the fake endpoint in a daemon thread; server.llm holds the stats, .shutdown() stops it."""
+    llm = FakeLLM(config or FakeLLMConfig())
+    server = ThreadingHTTPServer((host, port), _make_handler(llm))
+    server.llm = llm  # stats live here
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def add_config_args(ap: argparse.ArgumentParser) -> None:
+    ap.add_argument("--median-latency", type=float, default=0.6)
+    ap.add_argument("--latency-sigma", type=float, default=0.5)
+    ap.add_argument("--tokens-per-sec", type=float, default=250.0)
+    ap.add_argument("--error-429", type=float, default=0.0, help="rate-limit error probability per call")
+    ap.add_argument("--error-5xx", type=float, default=0.0, help="server error probability per call")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--time-scale", type=float, default=1.0)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeLLMConfig:
+    return FakeLLMConfig(
+        median_latency=args.median_latency, latency_sigma=args.latency_sigma,
+        tokens_per_sec=args.tokens_per_sec, error_429_rate=args.error_429,
+        error_5xx_rate=args.error_5xx, retry_after=args.retry_after,
+        seed=args.seed, time_scale=args.time_scale,
+    )
+
+
+def main(argv=None) -> None:
+    ap = argparse.ArgumentParser(description="OpenAI-compatible fake LLM endpoint")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--host", default="127.0.0.1")
+    add_config_args(ap)
+    args = ap.parse_args(argv)
+    server = serve(args.port, config_from_args(args), args.host)
+    print(f"fake LLM listening on http://{args.host}:{args.port} (set GROQ_BASE_URL to this)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
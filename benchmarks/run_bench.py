@@ -0,0 +1,184 @@
+# benchmarks/run_bench.py
+"""
+End-to-end latency/throughput benchmark for the review graph against the fake LLM.
+
+    python -m benchmarks.run_bench --concurrency 1,4,16 --reviews 24
+    python -m benchmarks.run_bench --mode async --error-429 0.05 --json bench.json
+    python -m benchmarks.run_bench --http            # through ChatGroq + the fake HTTP server
+
+Reports, per concurrency level: p50/p95/p99 end-to-end latency, reviews/sec,
+provider calls and tokens per review, and p50 time per graph stage.
+The response cache and the rate limiter are disabled unless --keep-cache /
+--keep-limits are given, so runs measure the graph rather than the cache.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+from benchmarks.corpus import SIZES, build_corpus, load_corpus
+from benchmarks.fake_llm import FakeLLM, add_config_args, config_from_args, serve
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * pct / 100
+    lo, hi = int(k), min(int(k) + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def _stage_times(events: List[Tuple[str, float]], started: float) -> Dict[str, float]:
+    """Per-stage durations from (node, finished_at) update events."""
+    done = {node: t for node, t in events}
+    pre = done.get("precheck_node", started)
+    guides = [t for node, t in events if node not in ("precheck_node", "llm_node", "final_updated_node")]
+    fan_in = max(guides) if guides else pre
+    out = {"precheck": pre - started, "guidelines": fan_in - pre}
+    if "llm_node" in done:
+        out["merge"] = done["llm_node"] - fan_in
+        out["final"] = done.get("final_updated_node", done["llm_node"]) - done["llm_node"]
+    return out
+
+
+def review_sync(workflow, code: str) -> Tuple[float, Dict[str, float]]:
+    started = time.perf_counter()
+    events = []
+    for update in workflow.stream({"code_snippet": code}, stream_mode="updates"):
+        for node in update:
+            events.append((node, time.perf_counter()))
+    return time.perf_counter() - started, _stage_times(events, started)
+
+
+async def review_async(workflow, code: str) -> Tuple[float, Dict[str, float]]:
+    started = time.perf_counter()
+    events = []
+    async for update in workflow.astream({"code_snippet": code}, stream_mode="updates"):
+        for node in update:
+            events.append((node, time.perf_counter()))
+    return time.perf_counter() - started, _stage_times(events, started)
+
+
+def run_level(args, corpus, concurrency: int, fake: FakeLLM) -> Dict[str, Any]:
+    from core.graph import get_async_workflow, get_workflow
+
+    jobs = [corpus[i % len(corpus)] for i in range(args.reviews)]
+    fake.reset_stats()
+    started = time.perf_counter()
+    if args.mode == "async":
+        async def _all():
+            sem = asyncio.Semaphore(concurrency)
+
+            async def one(code):
+                async with sem:
+                    return await review_async(get_async_workflow(), code)
+            return await asyncio.gather(*(one(code) for _, code in jobs))
+        results = asyncio.run(_all())
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            workflow = get_workflow()
+            results = list(pool.map(lambda job: review_sync(workflow, job[1]), jobs))
+    wall = time.perf_counter() - started
+
+    latencies = [lat for lat, _ in results]
+    stages: Dict[str, List[float]] = {}
+    for _, st in results:
+        for k, v in st.items():
+            stages.setdefault(k, []).append(v)
+    by_size: Dict[str, List[float]] = {}
+    for (name, _), lat in zip(jobs, latencies):
+        by_size.setdefault(name.split("_")[0], []).append(lat)
+    n = max(1, len(jobs))
+    stats = dict(fake.stats)
+    return {
+        "concurrency": concurrency,
+        "reviews": len(jobs),
+        "wall_s": round(wall, 3),
+        "reviews_per_s": round(len(jobs) / wall, 3) if wall else 0.0,
+        "p50_s": round(percentile(latencies, 50), 3),
+        "p95_s": round(percentile(latencies, 95), 3),
+        "p99_s": round(percentile(latencies, 99), 3),
+        "calls_per_review": round(stats["calls"] / n, 2),
+        "prompt_tokens_per_review": round(stats["prompt_tokens"] / n),
+        "completion_tokens_per_review": round(stats["completion_tokens"] / n),
+        "errors_429": stats["errors_429"],
+        "errors_5xx": stats["errors_5xx"],
+        "stage_p50_s": {k: round(percentile(v, 50), 3) for k, v in stages.items()},
+        "size_p50_s": {k: round(percentile(v, 50), 3) for k, v in by_size.items()},
+    }
+
+
+def _print_level(r: Dict[str, Any]) -> None:
+    print(
+        f"c={r['concurrency']:<3} reviews={r['reviews']:<4} rev/s={r['reviews_per_s']:<7} "
+        f"p50={r['p50_s']:<7} p95={r['p95_s']:<7} p99={r['p99_s']:<7} "
+        f"calls/rev={r['calls_per_review']:<6} tok/rev={r['prompt_tokens_per_review']}+{r['completion_tokens_per_review']} "
+        f"429s={r['errors_429']} 5xx={r['errors_5xx']}"
+    )
+    print("      stages p50: " + "  ".join(f"{k}={v}" for k, v in r["stage_p50_s"].items()))
+    print("      size   p50: " + "  ".join(f"{k}={v}" for k, v in r["size_p50_s"].items()))
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark the review graph against a fake LLM")
+    ap.add_argument("--concurrency", default="1,4,16", help="comma-separated concurrent review levels")
+    ap.add_argument("--reviews", type=int, default=12, help="reviews per concurrency level")
+    ap.add_argument("--mode", choices=("sync", "async"), default="sync")
+    ap.add_argument("--corpus", help="directory of .java files (default: generated corpus)")
+    ap.add_argument("--per-size", type=int, default=2, help="generated files per size class")
+    ap.add_argument("--sizes", default=",".join(SIZES), help="generated size classes")
+    ap.add_argument("--http", action="store_true", help="go through ChatGroq and the fake HTTP server")
+    ap.add_argument("--port", type=int, default=8089)
+    ap.add_argument("--keep-cache", action="store_true", help="leave the LLM response cache enabled")
+    ap.add_argument("--keep-limits", action="store_true", help="leave LLM_RPM/LLM_TPM limits enabled")
+    ap.add_argument("--json", help="write results to this file")
+    add_config_args(ap)
+    args = ap.parse_args(argv)
+
+    # environment must be settled before core.* is imported
+    os.environ["USE_STUB"] = "false"
+    if not args.keep_cache:
+        os.environ["LLM_CACHE"] = "false"
+    if not args.keep_limits:
+        os.environ.setdefault("LLM_RPM", "0")
+        os.environ.setdefault("LLM_TPM", "0")
+    config = config_from_args(args)
+    server = None
+    if args.http:
+        server = serve(args.port, config)
+        os.environ["GROQ_BASE_URL"] = f"http://127.0.0.1:{args.port}"
+        os.environ.setdefault("GROQ_API_KEY", "fake-key")
+
+    import core.clients as clients
+
+    if server is not None:
+        fake = server.llm
+    else:
+        fake = FakeLLM(config)
+        clients.set_llm_client(fake)
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(
+        args.per_size, tuple(s for s in args.sizes.split(",") if s in SIZES), args.seed)
+    print(f"corpus: {len(corpus)} files, mode={args.mode}, transport={'http' if args.http else 'in-process'}")
+
+    results = []
+    for level in (int(c) for c in args.concurrency.split(",") if c.strip()):
+        r = run_level(args, corpus, level, fake)
+        _print_level(r)
+        results.append(r)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump({"config": vars(args), "results": results}, fh, indent=2)
+    if server is not None:
+        server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,6 @@
 # config/settings.py
 import os
+import sys
 from pathlib import Path
 
 # --- load local .env only if present (safe for dev)
@@ -9,21 +10,25 @@ if _env_path.exists():
     from dotenv import load_dotenv
     load_dotenv(_env_path)
 
-# --- helper: try Streamlit secrets if available
+# --- helper: Streamlit secrets, only when already running under Streamlit
+# (importing streamlit just to look for secrets costs workers and CLIs ~1s of startup)
 def _streamlit_secrets():
+    st = sys.modules.get("streamlit")
+    if st is None:
+        return {}
     try:
-        import streamlit as st
         return st.secrets or {}
     except Exception:
         return {}
 
-_stream_secrets = _streamlit_secrets()
-
 def _get_secret(name, default=None):
     # priority: environment variable -> streamlit secrets -> default
-    return os.getenv(name) or _stream_secrets.get(name) or default
+    return os.getenv(name) or _streamlit_secrets().get(name) or default
+
+# --- config values, resolved on access: `from config.settings import GROQ_API_KEY`
+_SECRETS = ("GROQ_API_KEY", "TAVILY_API_KEY", "OPENAI_API_KEY")
 
-# --- config values
-GROQ_API_KEY = _get_secret("GROQ_API_KEY")
-TAVILY_API_KEY = _get_secret("TAVILY_API_KEY")
-OPENAI_API_KEY = _get_secret("OPENAI_API_KEY")
+def __getattr__(name):
+    if name in _SECRETS:
+        return _get_secret(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,384 @@
+# core/cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# -----------------------
+# CONFIG — tweak these (env overrides)
+# -----------------------
+CACHE_ENABLED = os.getenv("LLM_CACHE", "true").lower() in ("1", "true", "yes")
+CACHE_PATH = os.getenv(
+    "LLM_CACHE_PATH", str(Path(__file__).parent.parent / ".cache" / "llm_cache.sqlite")
+)
+CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "512"))
+CACHE_DISK_ENTRIES = int(os.getenv("LLM_CACHE_DISK_ENTRIES", "50000"))
+CACHE_TTL = float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 3600)))  # seconds; 0 = never expire
+
+# method-level findings cache (core/units.py): one row per unit x guideline, same SQLite file
+FINDINGS_CACHE_ENABLED = os.getenv("FINDINGS_CACHE", "false").lower() in ("1", "true", "yes")
+FINDINGS_CACHE_ENTRIES = int(os.getenv("FINDINGS_CACHE_ENTRIES", "200000"))
+FINDINGS_CACHE_TTL = float(os.getenv("FINDINGS_CACHE_TTL", str(30 * 24 * 3600)))
+
+# run the disk eviction sweep once every N writes (cheap enough, keeps the file bounded)
+_EVICT_EVERY = 200
+# LRU bookkeeping for disk hits: a row read again within _TOUCH_AFTER_S keeps its accessed_at,
+# and new access times are written in batches of _TOUCH_BATCH (or with the next write)
+_TOUCH_AFTER_S = 600
+_TOUCH_BATCH = 64
+
+
+def make_key(*parts: Any) -> str:
+    """Content-address a request: sha256 over the JSON encoding of all parts."""
+    raw = json.dumps(parts, ensure_ascii=False, separators=(",", ":"), default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+# -----------------------
+# Tiers
+# -----------------------
+class LRUCache:
+    """Small thread-safe in-process LRU with optional TTL."""
+
+    def __init__(self, maxsize: int = CACHE_MEMORY_ENTRIES, ttl: float = CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self.ttl and time.time() - stored_at > self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def put(self, key: str, value: Any) -> int:
+        """Store value; returns the number of entries evicted."""
+        if self.maxsize <= 0:
+            return 0
+        evicted = 0
+        with self._lock:
+            self._data[key] = (value, time.time())
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SqliteStore:
+    """
+    On-disk key/value tier backed by a single SQLite file (WAL mode, so several
+    worker processes can share it). Values are JSON. Eviction: expired rows
+    first, then least-recently-accessed rows beyond max_entries. Reads do not
+    write: access times are coarse (_TOUCH_AFTER_S) and flushed in batches.
+    """
+
+    def __init__(self, path: str = CACHE_PATH, table: str = "llm_cache",
+                 max_entries: int = CACHE_DISK_ENTRIES, ttl: float = CACHE_TTL):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._touches: Dict[str, float] = {}  # key -> access time not yet written
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS {table}_accessed ON {table}(accessed_at)"
+            )
+            self._conn.commit()
+
+    def get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT value, created_at, accessed_at FROM {self.table} WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, created_at, accessed_at = row
+            if self.ttl and now - created_at > self.ttl:
+                self._conn.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+            self._touch_locked({key: accessed_at}, now)
+        return json.loads(value)
+
+    def put(self, key: str, value: Any) -> int:
+        now = time.time()
+        evicted = 0
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table}(key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value, ensure_ascii=False), now, now),
+            )
+            self._touches.pop(key, None)
+            self._writes += 1
+            self._flush_touches_locked()
+            if self._writes % _EVICT_EVERY == 0:
+                evicted = self._evict_locked(now)
+            self._conn.commit()
+        return evicted
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Several keys in one transaction (expired rows are skipped and left to eviction)."""
+        now = time.time()
+        out: Dict[str, Any] = {}
+        seen: Dict[str, float] = {}  # key -> stored accessed_at
+        with self._lock:
+            for start in range(0, len(keys), 500):  # stay under SQLite's bound-variable limit
+                part = keys[start:start + 500]
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at, accessed_at FROM {self.table} "
+                    f"WHERE key IN ({','.join('?' * len(part))})", part
+                ).fetchall()
+                for key, value, created_at, accessed_at in rows:
+                    if not (self.ttl and now - created_at > self.ttl):
+                        out[key] = value
+                        seen[key] = accessed_at
+            self._touch_locked(seen, now)
+        return {k: json.loads(v) for k, v in out.items()}
+
+    def put_many(self, items: List[Tuple[str, Any]]) -> int:
+        now = time.time()
+        evicted = 0
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table}(key, value, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False), now, now) for k, v in items],
+            )
+            for k, _ in items:
+                self._touches.pop(k, None)
+            before = self._writes
+            self._writes += len(items)
+            self._flush_touches_locked()
+            if self._writes // _EVICT_EVERY != before // _EVICT_EVERY:
+                evicted = self._evict_locked(now)
+            self._conn.commit()
+        return evicted
+
+    def _touch_locked(self, accessed: Dict[str, float], now: float) -> None:
+        """Queue new access times for rows last touched over _TOUCH_AFTER_S ago; flush a full batch."""
+        for key, accessed_at in accessed.items():
+            if now - accessed_at >= _TOUCH_AFTER_S:
+                self._touches[key] = now
+        if len(self._touches) >= _TOUCH_BATCH:
+            self._flush_touches_locked()
+            self._conn.commit()
+
+    def _flush_touches_locked(self) -> None:
+        if self._touches:
+            self._conn.executemany(
+                f"UPDATE {self.table} SET accessed_at = ? WHERE key = ?",
+                [(t, k) for k, t in self._touches.items()],
+            )
+            self._touches.clear()
+
+    def evict(self) -> int:
+        with self._lock:
+            self._flush_touches_locked()
+            evicted = self._evict_locked(time.time())
+            self._conn.commit()
+        return evicted
+
+    def _evict_locked(self, now: float) -> int:
+        evicted = 0
+        if self.ttl:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE created_at < ?", (now - self.ttl,)
+            )
+            evicted += cur.rowcount or 0
+        (count,) = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()
+        overflow = count - self.max_entries
+        if overflow > 0:
+            cur = self._conn.execute(
+                f"DELETE FROM {self.table} WHERE key IN ("
+                f"SELECT key FROM {self.table} ORDER BY accessed_at ASC LIMIT ?)",
+                (overflow,),
+            )
+            evicted += cur.rowcount or 0
+        return evicted
+
+    def clear(self) -> None:
+        with self._lock:
+            self._touches.clear()
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+
+# -----------------------
+# Two-tier cache
+# -----------------------
+class TieredCache:
+    """Memory LRU in front of a SqliteStore, with hit/miss counters."""
+
+    def __init__(self, memory: LRUCache, disk: Optional[SqliteStore]):
+        self.memory = memory
+        self.disk = disk
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+
+    def _count(self, name: str, n: int = 1) -> None:
+        with self._lock:
+            self._stats[name] += n
+
+    def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits")
+            return value
+        if self.disk is not None:
+            try:
+                value = self.disk.get(key)
+            except sqlite3.Error as e:
+                print("cache disk read failed:", e)
+                value = None
+            if value is not None:
+                self._count("disk_hits")
+                self._count("evictions", self.memory.put(key, value))
+                return value
+        self._count("misses")
+        return None
+
+    def get_many(self, keys: List[str], count: bool = True) -> Dict[str, Any]:
+        """{key: value} for the cached keys; count=False leaves the hit/miss counters alone."""
+        keys = list(dict.fromkeys(keys))
+        out: Dict[str, Any] = {}
+        missing = []
+        for key in keys:
+            value = self.memory.get(key)
+            if value is not None:
+                out[key] = value
+            else:
+                missing.append(key)
+        memory_hits = len(out)
+        if self.disk is not None and missing:
+            try:
+                found = self.disk.get_many(missing)
+            except sqlite3.Error as e:
+                print("cache disk read failed:", e)
+                found = {}
+            for key, value in found.items():
+                out[key] = value
+                self._count("evictions", self.memory.put(key, value))
+        if count:
+            self._count("memory_hits", memory_hits)
+            self._count("disk_hits", len(out) - memory_hits)
+            self._count("misses", len(keys) - len(out))
+        return out
+
+    def put_many(self, items: Iterable[Tuple[str, Any]]) -> None:
+        items = list(items)
+        evicted = sum(self.memory.put(key, value) for key, value in items)
+        if self.disk is not None and items:
+            try:
+                evicted += self.disk.put_many(items)
+            except sqlite3.Error as e:
+                print("cache disk write failed:", e)
+        self._count("writes", len(items))
+        self._count("evictions", evicted)
+
+    def put(self, key: str, value: Any) -> None:
+        evicted = self.memory.put(key, value)
+        if self.disk is not None:
+            try:
+                evicted += self.disk.put(key, value)
+            except sqlite3.Error as e:
+                print("cache disk write failed:", e)
+        self._count("writes")
+        self._count("evictions", evicted)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+        hits = out["memory_hits"] + out["disk_hits"]
+        lookups = hits + out["misses"]
+        out["hit_rate"] = round(hits / lookups, 4) if lookups else 0.0
+        out["memory_entries"] = len(self.memory)
+        return out
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+
+_response_cache: Optional[TieredCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> Optional[TieredCache]:
+    """Process-wide LLM response cache (None when LLM_CACHE=false)."""
+    global _response_cache
+    if not CACHE_ENABLED:
+        return None
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                disk = None
+                try:
+                    disk = SqliteStore(CACHE_PATH)
+                except Exception as e:
+                    print("LLM disk cache unavailable, using memory only:", e)
+                _response_cache = TieredCache(LRUCache(), disk)
+    return _response_cache
+
+
+def cache_stats() -> Dict[str, Any]:
+    cache = _response_cache
+    return cache.stats() if cache is not None else {}
+
+
+_findings_cache: Optional[TieredCache] = None
+
+
+def get_findings_cache() -> Optional[TieredCache]:
+    """Process-wide per-unit findings cache (None when FINDINGS_CACHE=false)."""
+    global _findings_cache
+    if not FINDINGS_CACHE_ENABLED:
+        return None
+    if _findings_cache is None:
+        with _response_cache_lock:
+            if _findings_cache is None:
+                disk = None
+                try:
+                    disk = SqliteStore(CACHE_PATH, table="unit_findings",
+                                       max_entries=FINDINGS_CACHE_ENTRIES, ttl=FINDINGS_CACHE_TTL)
+                except Exception as e:
+                    print("findings disk cache unavailable, using memory only:", e)
+                _findings_cache = TieredCache(LRUCache(CACHE_MEMORY_ENTRIES * 8, FINDINGS_CACHE_TTL), disk)
+    return _findings_cache
+
+
+def findings_cache_stats() -> Dict[str, Any]:
+    cache = _findings_cache
+    return cache.stats() if cache is not None else {}
@@ -1,35 +1,152 @@
 # core/clients.py
+import asyncio
+import contextvars
 import os
+import threading
 import time
 import traceback
-from typing import Any, Dict, Optional
+import weakref
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Optional, Tuple
 
-from config.settings import GROQ_API_KEY
+from core.cache import get_response_cache, make_key
+from core.ratelimit import estimate_tokens, get_limiter, is_rate_limited
+from core.routing import (
+    DEFAULT_TIER, FAILOVER_BASE_URL, FAILOVER_RPM, FAILOVER_TPM, GROQ_MODEL, TIERS, Tier,
+    failover_model, record, tier_for,
+)
+from core.telemetry import Span, span
 
 USE_STUB = os.getenv("USE_STUB", "false").lower() in ("1", "true", "yes")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL")  # e.g. the local fake server in benchmarks/fake_llm.py
 RETRY_ATTEMPTS = int(os.getenv("LLM_RETRIES", "3"))
-RETRY_BACKOFF = float(os.getenv("LLM_BACKOFF", "1.0"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))  # async in-flight calls per event loop
+
+# Hedged requests: when a call has been running longer than this percentile of recent
+# call latencies (same kind of node), fire one duplicate and take whichever answers first.
+HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0"))   # e.g. 95; 0 = off
+HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))  # no hedging until this many samples
+HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1.0"))   # never hedge sooner than this (s)
+
+# process-wide counters of real provider calls (attempts, including retries)
+_stats_lock = threading.Lock()
+_call_stats = {"calls": 0, "failures": 0}
+
+def _count_call(failed: bool = False) -> None:
+    with _stats_lock:
+        _call_stats["calls"] += 1
+        if failed:
+            _call_stats["failures"] += 1
+
+def call_stats() -> Dict[str, int]:
+    """Snapshot of provider calls made by this process (cache hits excluded)."""
+    with _stats_lock:
+        return dict(_call_stats)
 
 def invoke_stub(prompt: str, max_tokens: int = 1500, temperature: float = 0.0) -> Dict[str, Any]:
     return {"content": f"[stub] preview: {prompt[:200]}"}
 
-_llm_client = None
-if not USE_STUB:
+# -----------------------
+# Clients (built lazily on first use, shared by every thread / event loop)
+# -----------------------
+LLM_POOL_CONNECTIONS = int(os.getenv("LLM_POOL_CONNECTIONS", "32"))  # pooled HTTP connections
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "120"))                  # per-request timeout (s)
+
+_UNSET = object()
+_override: Any = _UNSET  # set_llm_client(): replaces every primary client
+_clients: Dict[Tuple[str, str, Optional[float]], Any] = {}  # (backend, model, timeout) -> client
+_http_pool: Optional[Tuple[Any, Any]] = None
+_client_lock = threading.Lock()
+
+def _http_clients():
+    """One keep-alive pool each for sync and async calls (instead of a client per request)."""
+    import httpx
+
+    limits = httpx.Limits(max_connections=LLM_POOL_CONNECTIONS,
+                          max_keepalive_connections=LLM_POOL_CONNECTIONS)
+    return (httpx.Client(limits=limits, timeout=LLM_TIMEOUT),
+            httpx.AsyncClient(limits=limits, timeout=LLM_TIMEOUT))
+
+def _base_kwargs(model: str, timeout: Optional[float]) -> Dict[str, Any]:
+    """Shared by every backend. Call with _client_lock held."""
+    global _http_pool
+    # max_retries=0: retries/backoff are owned by invoke() + core.ratelimit
+    kwargs: Dict[str, Any] = {"model": model, "max_retries": 0}
+    if timeout:
+        kwargs["timeout"] = timeout
+    try:
+        if _http_pool is None:
+            _http_pool = _http_clients()
+        kwargs["http_client"], kwargs["http_async_client"] = _http_pool
+    except Exception as e:  # older langchain / no httpx: library default clients
+        print("shared HTTP pool unavailable:", e)
+    return kwargs
+
+def _build_client(model: str = GROQ_MODEL, timeout: Optional[float] = None) -> Any:
     try:
         from langchain_groq import ChatGroq
-        
-        GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
-        try:
-            _llm_client = ChatGroq(model=GROQ_MODEL, api_key=GROQ_API_KEY)
-        except Exception:
-            try:
-                _llm_client = ChatGroq(model=GROQ_MODEL)
-            except Exception as e:
-                print("ChatGroq constructor failed:", e)
-                _llm_client = None
     except Exception as e:
         print("langchain_groq import failed:", e)
-        _llm_client = None
+        return None
+    from config.settings import GROQ_API_KEY
+
+    kwargs = _base_kwargs(model, timeout)
+    if GROQ_BASE_URL:
+        kwargs["base_url"] = GROQ_BASE_URL
+    try:
+        return ChatGroq(api_key=GROQ_API_KEY, **kwargs)
+    except Exception:
+        try:
+            return ChatGroq(**kwargs)
+        except Exception as e:
+            print("ChatGroq constructor failed:", e)
+            return None
+
+def _build_failover_client(model: str, timeout: Optional[float] = None) -> Any:
+    """ChatOpenAI against FAILOVER_BASE_URL (local endpoints usually ignore the key)."""
+    try:
+        from langchain_openai import ChatOpenAI
+    except Exception as e:
+        print("langchain_openai import failed:", e)
+        return None
+    from config.settings import OPENAI_API_KEY
+
+    api_key = os.getenv("FAILOVER_API_KEY") or OPENAI_API_KEY or "not-needed"
+    try:
+        return ChatOpenAI(base_url=FAILOVER_BASE_URL, api_key=api_key, **_base_kwargs(model, timeout))
+    except Exception as e:
+        print("ChatOpenAI constructor failed:", e)
+        return None
+
+def client_for(tier: Tier, backend: str = "primary") -> Any:
+    """Chat client for a tier's primary (Groq) or failover backend; None in stub mode or on failure."""
+    if backend == "primary" and _override is not _UNSET:
+        return _override
+    if USE_STUB:
+        return None
+    model = tier.model if backend == "primary" else failover_model(tier)
+    key = (backend, model, tier.timeout)
+    client = _clients.get(key, _UNSET)
+    if client is _UNSET:
+        with _client_lock:
+            client = _clients.get(key, _UNSET)
+            if client is _UNSET:
+                build = _build_client if backend == "primary" else _build_failover_client
+                client = _clients[key] = build(model, tier.timeout) if model else None
+    return client
+
+def get_llm_client() -> Any:
+    """The default tier's chat client, constructed on first call (None in stub mode or on failure)."""
+    return client_for(TIERS[DEFAULT_TIER])
+
+def set_llm_client(client: Any) -> Any:
+    """Swap the chat client of every tier (anything with invoke/ainvoke(input=..., max_tokens=...,
+    temperature=...)). Used by benchmarks to plug in a fake model; returns the previous override."""
+    global _override
+    with _client_lock:
+        previous, _override = _override, client
+    return None if previous is _UNSET else previous
 
 def _extract_text(resp: Any) -> Optional[str]:
     """
@@ -87,37 +204,458 @@ def _extract_text(resp: Any) -> Optional[str]:
     
 
 
-def invoke(prompt: str, max_tokens: int = 1500, temperature: float = 0.0) -> Dict[str, Any]:
+def _extract_usage(resp: Any) -> Dict[str, int]:
+    """Provider token usage from a LangChain message (usage_metadata / response_metadata) or raw dict."""
+    usage = getattr(resp, "usage_metadata", None)
+    if isinstance(usage, dict) and usage:
+        return {"prompt_tokens": int(usage.get("input_tokens") or 0),
+                "completion_tokens": int(usage.get("output_tokens") or 0)}
+    meta = resp if isinstance(resp, dict) else getattr(resp, "response_metadata", None)
+    if not isinstance(meta, dict):
+        return {}
+    usage = meta.get("token_usage") or meta.get("usage")
+    if isinstance(usage, dict):
+        return {"prompt_tokens": int(usage.get("prompt_tokens") or 0),
+                "completion_tokens": int(usage.get("completion_tokens") or 0)}
+    return {}
+
+def _used_tokens(resp: Any) -> int:
+    """Real tokens of a reply (0 when the provider did not report usage)."""
+    return sum(_extract_usage(resp).values())
+
+def _cache_lookup(prompt: str, max_tokens: int, temperature: float, model: str = GROQ_MODEL):
+    """Return (cache, key, cached_text) for a request; cache is None when disabled."""
+    cache = get_response_cache()
+    cache_key = make_key(model, prompt, max_tokens, temperature)
+    cached = cache.get(cache_key) if cache is not None else None
+    return cache, cache_key, cached
+
+def _to_result(resp: Any, cache, cache_key: str, sp) -> Dict[str, Any]:
+    text = _extract_text(resp)
+    sp.set(outcome="ok", **_extract_usage(resp))
+    if text is None:
+        # if extraction failed, at least return stringified resp
+        sp.set(outcome="unparsed")
+        return {"content": f"[llm-invoke-failed] Could not extract text. raw: {str(resp)[:1000]}"}
+    sp.set(response_chars=len(text))
+    if cache is not None and not sp.attrs.get("failover"):  # secondary-model replies are not cached
+        cache.put(cache_key, text)
+    return {"content": text}
+
+_NO_CLIENT_MSG = "LLM client not initialized. Set USE_STUB=true or configure GROQ_API_KEY/GROQ_MODEL."
+
+class DeadlineExceeded(TimeoutError):
+    """The caller's deadline passed before any attempt succeeded."""
+
+def _failure(sp, exc: Optional[BaseException]) -> Dict[str, Any]:
+    if isinstance(exc, DeadlineExceeded):
+        sp.set(outcome="deadline")
+        return {"content": f"[llm-invoke-failed] {exc}"}
+    sp.set(outcome="error", last_error=str(exc)[:300])
+    return {"content": f"[llm-invoke-failed] All retries failed. Last error: {exc}"}
+
+# -----------------------
+# Latency samples (hedge delay)
+# -----------------------
+_latency_lock = threading.Lock()
+_latencies: Dict[str, deque] = {}
+
+def _latency_kind(sp) -> str:
+    """Guideline/group calls share one distribution; merge and final each have their own."""
+    return sp.node if sp.node in ("llm_node", "final_updated_node") else "guideline"
+
+def _record_latency(kind: str, seconds: float) -> None:
+    with _latency_lock:
+        _latencies.setdefault(kind, deque(maxlen=200)).append(seconds)
+
+def hedge_delay(kind: str) -> Optional[float]:
+    """Seconds after which a duplicate request is sent, or None (hedging off / too few samples)."""
+    if HEDGE_PERCENTILE <= 0:
+        return None
+    with _latency_lock:
+        samples = sorted(_latencies.get(kind, ()))
+    if len(samples) < HEDGE_MIN_SAMPLES:
+        return None
+    k = min(len(samples) - 1, int(len(samples) * HEDGE_PERCENTILE / 100))
+    return max(HEDGE_MIN_DELAY, samples[k])
+
+def _expired(deadline: Optional[float]) -> Optional[DeadlineExceeded]:
+    if deadline is not None and time.time() >= deadline:
+        return DeadlineExceeded("deadline exceeded")
+    return None
+
+# -----------------------
+# Sync path (ChatGroq.invoke)
+# -----------------------
+def _has_failover(tier: Tier) -> bool:
+    """A failover model is configured and its client could be built; otherwise a paused or
+    rate-limited primary is retried as usual rather than skipped."""
+    return failover_model(tier) is not None and client_for(tier, "failover") is not None
+
+def _attempts(prompt: str, max_tokens: int, temperature: float, sp,
+              deadline: Optional[float] = None, tier: Optional[Tier] = None) -> Tuple[Any, Optional[BaseException]]:
+    """Retry loop for one request: (response, None) or (None, last error). With a failover
+    backend, a rate-limited primary (429 or limiter paused) or exhausted retries go there."""
+    tier = tier or TIERS[DEFAULT_TIER]
+    limiter = get_limiter(tier.limiter_key)
+    failover = _has_failover(tier)
+    est_tokens = estimate_tokens(prompt, max_tokens)
+    last_exc = None
+    for attempt in range(RETRY_ATTEMPTS):
+        if failover and limiter.snapshot()["paused_for_s"] > 0:
+            break  # primary is cooling down after a 429: don't queue behind it
+        sp.add("queue_s", limiter.acquire(est_tokens))
+        sent = time.monotonic()
+        try:
+            # IMPORTANT: call the single method pattern your ChatGroq supports
+            resp = client_for(tier).invoke(input=prompt, max_tokens=max_tokens, temperature=temperature)
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                limiter.release(success=False)
+                raise
+            limiter.release(e)
+            _count_call(failed=True)
+            record(tier.name, "primary", None, ok=False, rate_limited=is_rate_limited(e))
+            last_exc = e
+            if attempt + 1 >= RETRY_ATTEMPTS or (failover and is_rate_limited(e)):
+                break
+            wait_s = limiter.backoff(attempt, e)
+            if deadline is not None and time.time() + wait_s >= deadline:
+                print(f"Invoke attempt {attempt+1} failed: {e}. No retry: deadline is closer than {wait_s:.2f}s")
+                return None, DeadlineExceeded(f"deadline exceeded after: {e}")
+            print(f"Invoke attempt {attempt+1} failed: {e}. Retrying in {wait_s:.2f}s")
+            if not is_rate_limited(e):
+                traceback.print_exc()
+            time.sleep(wait_s)
+            sp.set(retries=attempt + 1)
+            continue
+        limiter.release(booked=est_tokens, used=_used_tokens(resp))
+        _count_call()
+        seconds = time.monotonic() - sent
+        _record_latency(_latency_kind(sp), seconds)
+        record(tier.name, "primary", seconds, ok=True)
+        return resp, None
+    if failover:
+        return _failover(prompt, max_tokens, temperature, sp, tier, deadline, last_exc)
+    return None, last_exc
+
+def _failover(prompt: str, max_tokens: int, temperature: float, sp, tier: Tier,
+              deadline: Optional[float], primary_exc: Optional[BaseException]) -> Tuple[Any, Optional[BaseException]]:
+    """One attempt on the secondary backend (its own limiter, FAILOVER_RPM/TPM)."""
+    client = client_for(tier, "failover")
+    if client is None:
+        return None, primary_exc
+    expired = _expired(deadline)
+    if expired:
+        return None, expired
+    limiter = get_limiter("failover", rpm=FAILOVER_RPM, tpm=FAILOVER_TPM)
+    sp.set(failover=True, failover_model=failover_model(tier))
+    est_tokens = estimate_tokens(prompt, max_tokens)
+    sp.add("queue_s", limiter.acquire(est_tokens))
+    sent = time.monotonic()
+    try:
+        resp = client.invoke(input=prompt, max_tokens=max_tokens, temperature=temperature)
+    except BaseException as e:
+        if not isinstance(e, Exception):
+            limiter.release(success=False)
+            raise
+        limiter.release(e)
+        _count_call(failed=True)
+        record(tier.name, "failover", None, ok=False, rate_limited=is_rate_limited(e))
+        print(f"Failover attempt failed: {e}")
+        return None, e
+    limiter.release(booked=est_tokens, used=_used_tokens(resp))
+    _count_call()
+    record(tier.name, "failover", time.monotonic() - sent, ok=True)
+    return resp, None
+
+_hedge_pool: Optional[ThreadPoolExecutor] = None
+_hedge_pool_lock = threading.Lock()
+
+def _get_hedge_pool() -> ThreadPoolExecutor:
+    global _hedge_pool
+    with _hedge_pool_lock:
+        if _hedge_pool is None:
+            _hedge_pool = ThreadPoolExecutor(max_workers=max(4, 4 * LLM_MAX_CONCURRENCY), thread_name_prefix="llm")
+        return _hedge_pool
+
+def _attempt_span(sp: Span) -> Span:
+    # each hedged request counts its own queue time, retries and failover on a detached
+    # span; only the winner's are copied onto the call's span
+    return Span("llm.attempt", "internal", sp, {})
+
+def _merge_attempt(sp: Span, attempt: Span) -> None:
+    attrs = dict(attempt.attrs)
+    sp.add("queue_s", attrs.pop("queue_s", 0.0))
+    sp.set(**attrs)
+
+def _hedged(prompt: str, max_tokens: int, temperature: float, sp,
+            deadline: Optional[float], tier: Optional[Tier] = None,
+            cache=None, cache_key: Optional[str] = None) -> Tuple[Any, Optional[BaseException]]:
+    """
+    Run _attempts on a worker so the caller can stop waiting at `deadline`, and after
+    hedge_delay() launch one duplicate; the first successful response wins. A running
+    request cannot be cancelled: one abandoned at the deadline, or a losing duplicate,
+    finishes on the pool, and a successful late reply is written to `cache` so its
+    tokens are not wasted (the caller has already moved on).
+    """
+    delay = hedge_delay(_latency_kind(sp))
+    attempts: Dict[Any, Span] = {}
+
+    def keep_late(fut) -> None:
+        try:
+            resp, _ = fut.result()
+        except BaseException:
+            return
+        text = _extract_text(resp) if resp is not None else None
+        if text is None or cache is None or attempts[fut].attrs.get("failover"):
+            return
+        if cache.get(cache_key) is None:  # a winner's reply, already cached, stays
+            cache.put(cache_key, text)
+
+    def launch():
+        ctx, att = contextvars.copy_context(), _attempt_span(sp)
+        fut = _get_hedge_pool().submit(ctx.run, _attempts, prompt, max_tokens, temperature, att, deadline, tier)
+        attempts[fut] = att
+        return fut
+
+    first = launch()
+    pending, hedged, last_exc = {first}, False, None
+    try:
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            if not hedged and delay is not None:
+                timeout = delay if timeout is None else min(delay, timeout)
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for fut in done:
+                resp, exc = fut.result()
+                if resp is not None:
+                    _merge_attempt(sp, attempts[fut])
+                    if hedged:
+                        sp.set(hedge_won=fut is not first)
+                    return resp, None
+                last_exc, last_att = exc, attempts[fut]
+            expired = _expired(deadline)
+            if expired:
+                return None, expired
+            if not done and not hedged and delay is not None:
+                hedged = True
+                sp.set(hedged=True)
+                pending.add(launch())
+        _merge_attempt(sp, last_att)
+        return None, last_exc
+    finally:
+        for fut in pending:
+            fut.add_done_callback(keep_late)
+
+def invoke(prompt: str, max_tokens: int = 1500, temperature: float = 0.0,
+           deadline: Optional[float] = None, route: Optional[str] = None) -> Dict[str, Any]:
     """
     Simple, single-pattern LLM invoke using ChatGroq.invoke(input=...).
     Returns: {"content": "<string reply>"}
+    Successful replies are served from / stored in the response cache (core/cache.py),
+    keyed on model, prompt, max_tokens and temperature. Each call is recorded as an
+    "llm" span (core/telemetry.py) under the graph node that made it.
+    deadline (epoch seconds) bounds the wait including retries; once it passes the
+    reply is "[llm-invoke-failed] deadline exceeded". Slow calls may be hedged
+    (LLM_HEDGE_PERCENTILE). route ("G09", "G09+G10", "merge", "final") picks the model
+    tier (core/routing.py), which may cap max_tokens and set the request timeout.
     """
-    if USE_STUB:
-        return invoke_stub(prompt, max_tokens=max_tokens, temperature=temperature)
+    tier = tier_for(route)
+    max_tokens = tier.cap(max_tokens)
+    with span("llm.invoke", kind="llm", prompt_chars=len(prompt), max_tokens=max_tokens,
+              queue_s=0.0, retries=0, tier=tier.name, model=tier.model) as sp:
+        if USE_STUB:
+            sp.set(outcome="stub")
+            return invoke_stub(prompt, max_tokens=max_tokens, temperature=temperature)
+
+        cache, cache_key, cached = _cache_lookup(prompt, max_tokens, temperature, tier.model)
+        if cached is not None:
+            sp.set(outcome="cache", response_chars=len(cached))
+            return {"content": cached}
+
+        if client_for(tier) is None:
+            print(_NO_CLIENT_MSG)
+            sp.set(outcome="no_client")
+            return {"content": f"[llm-invoke-failed] {_NO_CLIENT_MSG}"}
+
+        expired = _expired(deadline)
+        if expired:
+            return _failure(sp, expired)
+        if deadline is None and hedge_delay(_latency_kind(sp)) is None:
+            resp, exc = _attempts(prompt, max_tokens, temperature, sp, tier=tier)
+        else:
+            resp, exc = _hedged(prompt, max_tokens, temperature, sp, deadline, tier, cache, cache_key)
+        if resp is None:
+            return _failure(sp, exc)
+        return _to_result(resp, cache, cache_key, sp)
 
-    if _llm_client is None:
-        msg = "LLM client not initialized. Set USE_STUB=true or configure GROQ_API_KEY/GROQ_MODEL."
-        print(msg)
-        return {"content": f"[llm-invoke-failed] {msg}"}
+# -----------------------
+# Async path (ChatGroq.ainvoke)
+# -----------------------
+# one semaphore per running event loop: asyncio primitives must not be shared across loops
+_async_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
 
-    attempt = 0
+def _get_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _async_semaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+        _async_semaphores[loop] = sem
+    return sem
+
+async def _aattempts(prompt: str, max_tokens: int, temperature: float, sp,
+                     deadline: Optional[float] = None, tier: Optional[Tier] = None) -> Tuple[Any, Optional[BaseException]]:
+    tier = tier or TIERS[DEFAULT_TIER]
+    limiter = get_limiter(tier.limiter_key)
+    failover = _has_failover(tier)
+    est_tokens = estimate_tokens(prompt, max_tokens)
     last_exc = None
-    while attempt < RETRY_ATTEMPTS:
+    for attempt in range(RETRY_ATTEMPTS):
+        if failover and limiter.snapshot()["paused_for_s"] > 0:
+            break  # primary is cooling down after a 429: don't queue behind it
+        queued = time.monotonic()
+        async with _get_semaphore():
+            await limiter.aacquire(est_tokens)
+            sent = time.monotonic()
+            sp.add("queue_s", sent - queued)  # semaphore + limiter wait
+            try:
+                resp = await client_for(tier).ainvoke(input=prompt, max_tokens=max_tokens, temperature=temperature)
+            except BaseException as e:
+                if not isinstance(e, Exception):  # cancelled / interrupted
+                    limiter.release(success=False)
+                    raise
+                limiter.release(e)
+                _count_call(failed=True)
+                record(tier.name, "primary", None, ok=False, rate_limited=is_rate_limited(e))
+                last_exc = e
+                wait_s = limiter.backoff(attempt, e)
+            else:
+                limiter.release(booked=est_tokens, used=_used_tokens(resp))
+                _count_call()
+                seconds = time.monotonic() - sent
+                _record_latency(_latency_kind(sp), seconds)
+                record(tier.name, "primary", seconds, ok=True)
+                return resp, None
+        if attempt + 1 >= RETRY_ATTEMPTS or (failover and is_rate_limited(last_exc)):
+            break
+        if deadline is not None and time.time() + wait_s >= deadline:
+            print(f"Async invoke attempt {attempt+1} failed: {last_exc}. No retry: deadline is closer than {wait_s:.2f}s")
+            return None, DeadlineExceeded(f"deadline exceeded after: {last_exc}")
+        print(f"Async invoke attempt {attempt+1} failed: {last_exc}. Retrying in {wait_s:.2f}s")
+        await asyncio.sleep(wait_s)
+        sp.set(retries=attempt + 1)
+    if failover:
+        return await _afailover(prompt, max_tokens, temperature, sp, tier, deadline, last_exc)
+    return None, last_exc
+
+async def _afailover(prompt: str, max_tokens: int, temperature: float, sp, tier: Tier,
+                     deadline: Optional[float], primary_exc: Optional[BaseException]) -> Tuple[Any, Optional[BaseException]]:
+    client = client_for(tier, "failover")
+    if client is None:
+        return None, primary_exc
+    expired = _expired(deadline)
+    if expired:
+        return None, expired
+    limiter = get_limiter("failover", rpm=FAILOVER_RPM, tpm=FAILOVER_TPM)
+    sp.set(failover=True, failover_model=failover_model(tier))
+    queued = time.monotonic()
+    async with _get_semaphore():
+        est_tokens = estimate_tokens(prompt, max_tokens)
+        await limiter.aacquire(est_tokens)
+        sent = time.monotonic()
+        sp.add("queue_s", sent - queued)
         try:
-            # IMPORTANT: call the single method pattern your ChatGroq supports
-            resp = _llm_client.invoke(input=prompt, max_tokens=max_tokens, temperature=temperature)
-            text = _extract_text(resp)
-            
-            if text is None:
-                # if extraction failed, at least return stringified resp
-                return {"content": f"[llm-invoke-failed] Could not extract text. raw: {str(resp)[:1000]}"}
-            return {"content": text}
-        except Exception as e:
-            last_exc = e
-            wait = RETRY_BACKOFF * (2 ** attempt)
-            print(f"Invoke attempt {attempt+1} failed: {e}. Retrying in {wait}s")
-            traceback.print_exc()
-            time.sleep(wait)
-            attempt += 1
+            resp = await client.ainvoke(input=prompt, max_tokens=max_tokens, temperature=temperature)
+        except BaseException as e:
+            if not isinstance(e, Exception):
+                limiter.release(success=False)
+                raise
+            limiter.release(e)
+            _count_call(failed=True)
+            record(tier.name, "failover", None, ok=False, rate_limited=is_rate_limited(e))
+            print(f"Async failover attempt failed: {e}")
+            return None, e
+        limiter.release(booked=est_tokens, used=_used_tokens(resp))
+        _count_call()
+        record(tier.name, "failover", time.monotonic() - sent, ok=True)
+        return resp, None
+
+async def _ahedged(prompt: str, max_tokens: int, temperature: float, sp,
+                   deadline: Optional[float], tier: Optional[Tier] = None) -> Tuple[Any, Optional[BaseException]]:
+    """Async twin of _hedged; losing and abandoned requests are cancelled."""
+    delay = hedge_delay(_latency_kind(sp))
+    attempts: Dict[Any, Span] = {}
+
+    def launch():
+        att = _attempt_span(sp)
+        task = asyncio.ensure_future(_aattempts(prompt, max_tokens, temperature, att, deadline, tier))
+        attempts[task] = att
+        return task
+
+    first = launch()
+    pending, hedged, last_exc = {first}, False, None
+    try:
+        while pending:
+            timeout = None if deadline is None else max(0.0, deadline - time.time())
+            if not hedged and delay is not None:
+                timeout = delay if timeout is None else min(delay, timeout)
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                resp, exc = task.result()
+                if resp is not None:
+                    _merge_attempt(sp, attempts[task])
+                    if hedged:
+                        sp.set(hedge_won=task is not first)
+                    return resp, None
+                last_exc, last_att = exc, attempts[task]
+            expired = _expired(deadline)
+            if expired:
+                return None, expired
+            if not done and not hedged and delay is not None:
+                hedged = True
+                sp.set(hedged=True)
+                pending.add(launch())
+        _merge_attempt(sp, last_att)
+        return None, last_exc
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+
+async def ainvoke(prompt: str, max_tokens: int = 1500, temperature: float = 0.0,
+                  deadline: Optional[float] = None, route: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Async twin of invoke() built on ChatGroq.ainvoke. In-flight calls per event loop
+    are bounded by LLM_MAX_CONCURRENCY; retries back off with asyncio.sleep so the
+    loop keeps serving other reviews meanwhile.
+    """
+    tier = tier_for(route)
+    max_tokens = tier.cap(max_tokens)
+    with span("llm.ainvoke", kind="llm", prompt_chars=len(prompt), max_tokens=max_tokens,
+              queue_s=0.0, retries=0, tier=tier.name, model=tier.model) as sp:
+        if USE_STUB:
+            sp.set(outcome="stub")
+            return invoke_stub(prompt, max_tokens=max_tokens, temperature=temperature)
+
+        cache, cache_key, cached = _cache_lookup(prompt, max_tokens, temperature, tier.model)
+        if cached is not None:
+            sp.set(outcome="cache", response_chars=len(cached))
+            return {"content": cached}
+
+        if client_for(tier) is None:
+            print(_NO_CLIENT_MSG)
+            sp.set(outcome="no_client")
+            return {"content": f"[llm-invoke-failed] {_NO_CLIENT_MSG}"}
 
-    return {"content": f"[llm-invoke-failed] All retries failed. Last error: {last_exc}"}
+        expired = _expired(deadline)
+        if expired:
+            return _failure(sp, expired)
+        if deadline is None and hedge_delay(_latency_kind(sp)) is None:
+            resp, exc = await _aattempts(prompt, max_tokens, temperature, sp, tier=tier)
+        else:
+            resp, exc = await _ahedged(prompt, max_tokens, temperature, sp, deadline, tier)
+        if resp is None:
+            return _failure(sp, exc)
+        return _to_result(resp, cache, cache_key, sp)
@@ -0,0 +1,216 @@
+# core/compaction.py
+"""
+Guideline-aware source compaction for the review prompts.
+
+License headers, comments, imports, blank lines and indentation are paid for on every
+guideline call but rarely matter to the guideline being checked. compact_source()
+removes or condenses them according to a per-guideline policy. G01 (conventions and
+formatting) keeps Javadoc, imports and indentation. G02/G06/G08 keep the imports on
+one line because they decide which types are in play. Everything else gets the
+minimal form.
+
+Only the agent prompts are compacted. The final transform still works on the original
+file, so edits land on the original text. Every compacted line remembers the original
+line it came from: `Compacted.line_map`, and remap_line_refs() for agent replies that
+cite line numbers.
+"""
+import os
+import re
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Dict, Iterable, List, Tuple
+
+from core.java_source import estimate_tokens, scan_literals
+
+# -----------------------
+# CONFIG
+# -----------------------
+COMPACTION = os.getenv("COMPACTION", "true").lower() in ("1", "true", "yes")
+
+# comments: "all" keep | "javadoc" keep /** */ only | "none"
+# imports:  "keep" | "join" (one line) | "drop"
+# indent:   "keep" | "level" (one space per nesting level)
+# blanks:   "single" (collapse runs) | "drop"
+DEFAULT_POLICY = {"comments": "none", "imports": "drop", "indent": "level", "blanks": "drop"}
+GUIDELINE_POLICY: Dict[str, Dict[str, str]] = {
+    "G01": {"comments": "javadoc", "imports": "keep", "indent": "keep", "blanks": "single"},
+    "G02": {"imports": "join"},
+    "G06": {"imports": "join"},
+    "G08": {"imports": "join"},
+}
+# most conservative first; a group prompt uses the most conservative setting of its members
+_RANK = {
+    "comments": ("all", "javadoc", "none"),
+    "imports": ("keep", "join", "drop"),
+    "indent": ("keep", "level"),
+    "blanks": ("single", "drop"),
+}
+
+_IMPORT_RE = re.compile(r"^\s*import\s+(static\s+)?[\w.]+(\.\*)?\s*;\s*$")
+_HEADER_END_RE = re.compile(r"(package|import)\b")
+_COMMENT_KINDS = ("line_comment", "block_comment", "javadoc")
+_LINE_REF_RE = re.compile(r"\b([Ll]ines?)\s+(\d+)(?:\s*(?:-|–|to)\s*(\d+))?")
+
+
+@dataclass
+class Compacted:
+    text: str
+    line_map: List[int] = field(default_factory=list)  # compact line k (0-based) -> original line (1-based)
+    original_tokens: int = 0
+    compact_tokens: int = 0
+
+    def original_line(self, line: int) -> int:
+        """Original 1-based line for a 1-based line of the compact text (clamped)."""
+        if not self.line_map:
+            return line
+        return self.line_map[min(max(line, 1), len(self.line_map)) - 1]
+
+
+def policy_for(guid_ids: Iterable[str]) -> Tuple[Tuple[str, str], ...]:
+    """Merged policy for one prompt (hashable, so compaction results can be cached)."""
+    merged: Dict[str, str] = {}
+    for g in guid_ids:
+        pol = dict(DEFAULT_POLICY, **GUIDELINE_POLICY.get(g, {}))
+        for key, value in pol.items():
+            order = _RANK[key]
+            if key not in merged or order.index(value) < order.index(merged[key]):
+                merged[key] = value
+    return tuple(sorted((merged or DEFAULT_POLICY).items()))
+
+
+# -----------------------
+# Compaction
+# -----------------------
+def _removed_spans(code: str, comments: str) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
+    """(comment spans to remove, text-block spans to leave verbatim)."""
+    literals = list(scan_literals(code))
+    # leading comments followed by `package`/`import` are a license header: always removed
+    pos = 0
+    for kind, a, b in literals:
+        if kind not in _COMMENT_KINDS or code[pos:a].strip():
+            break
+        pos = b
+    code_start = pos + len(code[pos:]) - len(code[pos:].lstrip())
+    has_header = bool(_HEADER_END_RE.match(code, code_start))
+
+    remove, verbatim = [], []
+    for kind, a, b in literals:
+        if kind == "text_block":
+            verbatim.append((a, b))
+        elif kind in _COMMENT_KINDS:
+            if (has_header and b <= code_start) or comments == "none" or (comments == "javadoc" and kind != "javadoc"):
+                remove.append((a, b))
+    return remove, verbatim
+
+
+def _strip_spans(code: str, spans: List[Tuple[int, int]]) -> str:
+    """Remove spans but keep their newlines, so line k of the result is line k of `code`."""
+    out, prev = [], 0
+    for a, b in spans:
+        out.append(code[prev:a])
+        out.append("\n" * code.count("\n", a, b))
+        prev = b
+    out.append(code[prev:])
+    return "".join(out)
+
+
+def _indent_level(ws: str) -> int:
+    cols = len(ws.expandtabs(4))
+    return (cols + 3) // 4
+
+
+def _verbatim_lines(code: str, spans: List[Tuple[int, int]]) -> set:
+    """0-based lines strictly inside a text block (their whitespace is significant)."""
+    lines = set()
+    for a, b in spans:
+        first, last = code.count("\n", 0, a), code.count("\n", 0, b)
+        lines.update(range(first + 1, last + 1))
+    return lines
+
+
+def _compact(code: str, policy: Tuple[Tuple[str, str], ...]) -> Compacted:
+    pol = dict(policy)
+    remove, verbatim = _removed_spans(code, pol["comments"])
+    raw_lines = code.split("\n")
+    stripped = _strip_spans(code, remove).split("\n")
+    keep_as_is = _verbatim_lines(code, verbatim)
+
+    out: List[str] = []
+    line_map: List[int] = []
+    imports: List[str] = []
+    import_line = 0
+    blank_line = 0  # last original blank line not yet emitted (0 = none)
+
+    def flush_imports() -> None:
+        nonlocal imports
+        if imports:
+            out.append(" ".join(imports))
+            line_map.append(import_line)
+            imports = []
+
+    for k, line in enumerate(stripped):
+        if k in keep_as_is:
+            flush_imports()
+            out.append(line)
+            line_map.append(k + 1)
+            continue
+        line = line.rstrip()
+        if not line.strip():
+            # only lines that were blank in the original count as blank lines
+            if not raw_lines[k].strip():
+                blank_line = k + 1
+            continue
+        if _IMPORT_RE.match(line) and pol["imports"] != "keep":
+            if pol["imports"] == "join":
+                if not imports:
+                    import_line = k + 1
+                imports.append(line.strip())
+            continue
+        flush_imports()
+        if blank_line and pol["blanks"] == "single" and out:
+            out.append("")
+            line_map.append(blank_line)
+        blank_line = 0
+        if pol["indent"] == "level":
+            body = line.lstrip()
+            line = " " * _indent_level(line[: len(line) - len(body)]) + body
+        out.append(line)
+        line_map.append(k + 1)
+    flush_imports()
+
+    text = "\n".join(out) + ("\n" if out and code.endswith("\n") else "")
+    return Compacted(text, line_map, estimate_tokens(code), estimate_tokens(text))
+
+
+@lru_cache(maxsize=256)
+def compact_source(code: str, policy: Tuple[Tuple[str, str], ...] = ()) -> Compacted:
+    """Compacted copy of `code` for one prompt (identity when COMPACTION is off)."""
+    if not COMPACTION or not code:
+        n = len(code.splitlines()) if code else 0
+        tokens = estimate_tokens(code)
+        return Compacted(code or "", list(range(1, n + 1)), tokens, tokens)
+    return _compact(code, policy or policy_for(()))
+
+
+def remap_line_refs(text: str, compacted: Compacted, first_line: int = 1) -> str:
+    """
+    Rewrite 'line N' / 'lines N-M' in an agent reply from compact to original numbering
+    (first_line: where the compacted text starts in the file). Numbers beyond the compact
+    text are left alone - the model was already counting in file lines.
+    """
+    if not text or not COMPACTION:
+        return text
+    size = len(compacted.line_map)
+
+    def to_file(n: int) -> int:
+        return compacted.original_line(n) + first_line - 1
+
+    def sub(m: "re.Match") -> str:
+        start, end = int(m.group(2)), int(m.group(3) or m.group(2))
+        if not 1 <= start <= end <= size:
+            return m.group(0)
+        if not m.group(3):
+            return f"{m.group(1)} {to_file(start)}"
+        return f"{m.group(1)} {to_file(start)}-{to_file(end)}"
+
+    return _LINE_REF_RE.sub(sub, text)
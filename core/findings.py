@@ -0,0 +1,337 @@
+# core/findings.py
+"""
+Typed view of the guideline agents' output.
+
+Agents (and core/static_checks.py) answer in the Finding template from
+build_guideline_prompt. parse_findings turns that text into compact Finding
+records; dedupe_findings folds findings that describe the same change (same area and
+a similar patch, or similar wording within one guideline); and
+render_compact prints the survivors, ranked, as the integrator's input.
+"""
+import difflib
+import re
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+SEVERITY_RANK = {"High": 3, "Medium": 2, "Low": 1}
+PATCH_SIMILARITY = 0.8     # difflib ratio above which two patches are the same change
+TEXT_SIMILARITY = 0.85     # same for title + fix wording
+MAX_PATCH_LINES = 12       # patch lines kept per finding in the merge input
+
+# titles of filler findings (APPLY_ALL_GUIDELINES stubs, static "Not applicable")
+FILLER_TITLES = {"minimal suggestion", "best-practice suggestion", "not applicable"}
+
+
+@dataclass(slots=True)
+class Finding:
+    guideline: str
+    title: str
+    area: str = "approximate"
+    severity: str = "Low"
+    confidence: int = 3
+    issue: str = ""
+    fix: str = ""
+    patch: Optional[str] = None
+    lines: Optional[str] = None                          # "a-b" when it came from a chunk
+    related: List[str] = field(default_factory=list)     # other guidelines folded into this one
+
+    @property
+    def filler(self) -> bool:
+        return self.title.strip().lower() in FILLER_TITLES
+
+    def rank(self) -> Tuple[int, int, int, int]:
+        """Sort key (ascending = most important first)."""
+        return (int(self.filler), -SEVERITY_RANK.get(self.severity, 1), -self.confidence, -int(bool(self.patch)))
+
+
+# -----------------------
+# Parsing
+# -----------------------
+_FIELD_RE = re.compile(
+    r"^\s*(?:[-*•]|\d+[.)])?\s*\**\s*(finding|title|area|severity|confidence|issue|fix|patch)"
+    r"(?:\s*\(optional\))?\s*\**\s*:\s*\**\s*(.*?)\s*$",
+    re.I,
+)
+_LINES_TAG_RE = re.compile(r"^\s*\[lines (\d+)-(\d+)\]\s*$")
+_FENCE_RE = re.compile(r"^\s*```")
+
+
+def _clean_patch(lines: List[str]) -> Optional[str]:
+    body = [ln for ln in lines if not _FENCE_RE.match(ln)]
+    # strip the two-space indent the template asks for
+    indent = min((len(ln) - len(ln.lstrip()) for ln in body if ln.strip()), default=0)
+    body = [ln[indent:].rstrip() for ln in body]
+    while body and not body[-1]:
+        body.pop()
+    while body and not body[0]:
+        body.pop(0)
+    # template placeholders ("// minimal snippet") are not patches
+    if not any(ln.strip() and not ln.strip().startswith("//") for ln in body):
+        return None
+    return "\n".join(body)
+
+
+def _severity(value: str) -> str:
+    word = (value.split() or ["Low"])[0].strip("*.,").capitalize()
+    return word if word in SEVERITY_RANK else "Low"
+
+
+def _confidence(value: str) -> int:
+    m = re.search(r"\d", value)
+    return min(5, max(1, int(m.group()))) if m else 3
+
+
+def parse_findings(text: str, guideline: str) -> List[Finding]:
+    """Findings in `text` (agent template, optional '[lines a-b]' chunk tags); [] if none parse."""
+    out: List[Finding] = []
+    cur: Optional[Dict[str, str]] = None
+    patch: List[str] = []
+    in_patch = in_fence = False
+    lines_tag: Optional[str] = None
+
+    def flush():
+        nonlocal cur, patch, in_patch, in_fence
+        if cur and (cur.get("title") or cur.get("issue") or cur.get("fix")):
+            out.append(Finding(
+                guideline=guideline,
+                title=cur.get("title") or cur.get("issue", "")[:60],
+                area=cur.get("area") or "approximate",
+                severity=_severity(cur.get("severity", "")),
+                confidence=_confidence(cur.get("confidence", "")),
+                issue=cur.get("issue", ""),
+                fix=cur.get("fix", ""),
+                patch=_clean_patch(patch) if patch else None,
+                lines=cur.get("lines"),
+            ))
+        cur, patch, in_patch, in_fence = None, [], False, False
+
+    for ln in (text or "").splitlines():
+        if in_fence:
+            patch.append(ln)
+            if _FENCE_RE.match(ln) and len(patch) > 1:
+                in_fence = in_patch = False
+            continue
+        tag = _LINES_TAG_RE.match(ln)
+        if tag:
+            flush()
+            lines_tag = f"{tag.group(1)}-{tag.group(2)}"
+            continue
+        m = _FIELD_RE.match(ln)
+        if m:
+            key, value = m.group(1).lower(), m.group(2)
+            key = "title" if key == "finding" else key
+            if key == "title" or cur is None or (key in cur and key != "patch"):
+                flush()
+                cur = {"lines": lines_tag} if lines_tag else {}
+            if key == "patch":
+                in_patch = True
+                if "```" in value:
+                    patch.append(value[value.index("```"):])
+                    in_fence = value.count("```") == 1
+                elif value:
+                    patch.append(value)
+            else:
+                in_patch = False
+                cur[key] = value.strip("* ")
+            continue
+        if cur is not None and (in_patch or _FENCE_RE.match(ln)):
+            # unlabelled fenced block after a finding counts as its patch
+            in_patch = True
+            patch.append(ln)
+            if _FENCE_RE.match(ln):
+                in_fence = True
+    flush()
+    return out
+
+
+# -----------------------
+# Dedup + ranking
+# -----------------------
+def _norm(text: str) -> str:
+    return re.sub(r"\s+", " ", (text or "").lower()).strip()
+
+
+def area_key(area: str) -> str:
+    """Normalized area: drop '(line ...)' notes, 'method'/'in Class' noise; '' when approximate."""
+    a = re.sub(r"\(.*?\)", "", (area or "").lower())
+    a = re.sub(r"\b(method|constructor|field|class)\b", "", a)
+    a = re.sub(r"[^a-z0-9_.#]+", " ", a).strip()
+    return "" if a in ("", "approximate", "n a", "na") else a
+
+
+def _similar(a: Optional[str], b: Optional[str], threshold: float) -> bool:
+    if not a or not b:
+        return False
+    a, b = _norm(a), _norm(b)
+    if a == b:
+        return True
+    sm = difflib.SequenceMatcher(None, a, b, autojunk=False)
+    return sm.real_quick_ratio() >= threshold and sm.quick_ratio() >= threshold and sm.ratio() >= threshold
+
+
+def is_duplicate(a: Finding, b: Finding) -> bool:
+    if a.filler or b.filler:
+        return False
+    if _similar(a.patch, b.patch, PATCH_SIMILARITY):
+        return True
+    # wording alone only folds repeats within one guideline (e.g. the same finding from two chunks);
+    # across guidelines it takes the same patch
+    return a.guideline == b.guideline and _similar(a.title + " " + a.fix, b.title + " " + b.fix, TEXT_SIMILARITY)
+
+
+def dedupe_findings(findings: Iterable[Finding]) -> List[Finding]:
+    """Fold duplicates into the highest-ranked copy; compared only within the same area bucket."""
+    buckets: Dict[str, List[Finding]] = {}
+    kept: List[Finding] = []
+    for f in sorted(findings, key=Finding.rank):
+        bucket = buckets.setdefault(area_key(f.area), [])
+        twin = next((k for k in bucket if is_duplicate(k, f)), None)
+        if twin is None:
+            bucket.append(f)
+            kept.append(f)
+        elif f.guideline != twin.guideline and f.guideline not in twin.related:
+            twin.related.append(f.guideline)
+    return kept
+
+
+def group_by_guideline(findings: Iterable[Finding], guidelines: Iterable[str],
+                       per_guideline: int) -> Dict[str, List[Finding]]:
+    """Ranked findings per guideline (capped), in guideline order."""
+    out: Dict[str, List[Finding]] = {g: [] for g in guidelines}
+    for f in sorted(findings, key=Finding.rank):
+        bucket = out.setdefault(f.guideline, [])
+        if len(bucket) < per_guideline:
+            bucket.append(f)
+    return out
+
+
+# -----------------------
+# Rendering
+# -----------------------
+def format_compact(f: Finding) -> str:
+    where = f.area + (f" (lines {f.lines})" if f.lines else "")
+    also = f" (also {', '.join(f.related)})" if f.related else ""
+    text = f"- [{f.severity}/{f.confidence}] {f.title} @ {where}{also}\n"
+    if f.issue:
+        text += f"  Issue: {f.issue}\n"
+    if f.fix:
+        text += f"  Fix: {f.fix}\n"
+    if f.patch:
+        lines = f.patch.splitlines()
+        if len(lines) > MAX_PATCH_LINES:
+            lines = lines[:MAX_PATCH_LINES] + ["// ..."]
+        text += "  Patch:\n" + "".join(f"    {ln}\n" for ln in lines)
+    return text
+
+
+def _folded(by_guideline: Dict[str, List[Finding]]) -> Dict[str, List[Finding]]:
+    """Guideline -> surviving findings from other guidelines that also cover it."""
+    out: Dict[str, List[Finding]] = {}
+    for items in by_guideline.values():
+        for f in items:
+            for g in f.related:
+                out.setdefault(g, []).append(f)
+    return out
+
+
+def _section_order(by_guideline: Dict[str, List[Finding]]) -> List[str]:
+    """Guidelines with the most severe real findings first, then by id."""
+    def key(g: str):
+        items = [f for f in by_guideline.get(g) or [] if not f.filler]
+        return (min((f.rank() for f in items), default=(1, 0, 0, 0)), g)
+    return sorted(by_guideline, key=key)
+
+
+def render_compact(by_guideline: Dict[str, List[Finding]], titles: Dict[str, str],
+                   raw: Optional[Dict[str, str]] = None) -> str:
+    """
+    Merge input: one section per guideline, sections with the most severe findings first.
+    `raw` holds agent text that did not parse, passed through as-is.
+    """
+    raw = raw or {}
+    folded = _folded(by_guideline)
+    parts = []
+    for g in _section_order(by_guideline):
+        items = by_guideline[g]
+        head = f"{g} | {titles.get(g, g)}\n"
+        if items and all(f.filler for f in items):
+            parts.append(head + f"- {items[0].title}: {items[0].issue or 'no findings'}\n")
+        elif items:
+            parts.append(head + "".join(format_compact(f) for f in items if not f.filler))
+        elif g in raw:
+            parts.append(head + raw[g].strip() + "\n")
+        elif g in folded:
+            parts.append(head + "".join(f"- same change as {f.guideline}: {f.title} @ {f.area}\n" for f in folded[g]))
+        else:
+            parts.append(head + "- no findings: propose one minimal best-practice change\n")
+    return "\n".join(parts)
+
+
+# -----------------------
+# Local merge (MERGE_MODE=local)
+# -----------------------
+def _least_risky(items: List[Finding]) -> Finding:
+    """Most severe / confident finding; among equals the one with the smallest concrete patch."""
+    def key(f: Finding):
+        size = len(f.patch.splitlines()) if f.patch else MAX_PATCH_LINES + 1
+        return (-SEVERITY_RANK.get(f.severity, 1), -f.confidence, size)
+    return min(items, key=key)
+
+
+def format_merge_item(guideline: str, title: str, area: str, severity: str, rationale: str,
+                      change: str, patch: Optional[str] = None) -> str:
+    """One consolidated suggestion in the integrator template (build_merge_prompt)."""
+    text = (
+        f"- Title: {title}\n"
+        f"- Trigger: {guideline}\n"
+        f"- Area: {area}\n"
+        f"- Severity: {severity}\n"
+        f"- Rationale: {rationale}\n"
+        f"- Change: {change}\n"
+    )
+    if patch:
+        text += "- Patch (optional): ```java\n  " + patch.replace("\n", "\n  ") + "\n  ```\n"
+    return text
+
+
+def render_merge(by_guideline: Dict[str, List[Finding]], titles: Dict[str, str]) -> str:
+    """
+    Deterministic stand-in for the integrator call: one suggestion per guideline,
+    High severity first, least-risky fix chosen, other findings listed in the Change
+    line, then a 'Minimal Patch' built from the chosen patches.
+    """
+    folded = _folded(by_guideline)
+    items, patch_lines = [], []
+    for g in _section_order(by_guideline):
+        real = [f for f in by_guideline[g] if not f.filler]
+        if real:
+            best = _least_risky(real)
+            where = best.area + (f" (lines {best.lines})" if best.lines else "")
+            change = best.fix or best.title
+            others = [f for f in real if f is not best]
+            if others:
+                change += " Also: " + "; ".join(f"{f.title} @ {f.area}" for f in others) + "."
+            if best.related:
+                change += f" (Also covers {', '.join(best.related)}.)"
+            items.append(format_merge_item(g, best.title, where, best.severity,
+                                           best.issue or best.title, change, best.patch))
+            if best.patch:
+                patch_lines.append(f"// {g}: {best.title}")
+                patch_lines.extend(best.patch.splitlines())
+        elif g in folded:
+            f = folded[g][0]
+            items.append(format_merge_item(g, f"Covered by {f.guideline}: {f.title}", f.area, f.severity,
+                                           f"The {f.guideline} change also addresses {g}.",
+                                           f"Apply the {f.guideline} change; nothing extra for {g}."))
+        elif by_guideline[g]:  # only filler, e.g. static "Not applicable"
+            f = by_guideline[g][0]
+            items.append(format_merge_item(g, f.title, f.area, f.severity, f.issue or "No findings.",
+                                           f.fix or f"No change needed for {g}."))
+        else:
+            items.append(format_merge_item(g, f"Best practice for {g}", "approximate", "Low",
+                                           f"No specific findings for {titles.get(g, g)}.",
+                                           f"Apply guideline {g} minimal edit where it is cheap and safe."))
+    if len(patch_lines) > MAX_PATCH_LINES:
+        patch_lines = patch_lines[:MAX_PATCH_LINES] + ["// ... (see per-item patches above)"]
+    minimal = "```java\n" + "\n".join(patch_lines) + "\n```" if patch_lines else "(no concrete patches; apply the Change lines)"
+    return "\n".join(items) + "\nMinimal Patch:\n" + minimal + "\n"
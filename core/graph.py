@@ -1,35 +1,137 @@
 # graph.py
+import functools
+import inspect
+import os
+import time
+import uuid
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
 from langgraph.graph import StateGraph, START, END
 from core.schema import Response
+from core.telemetry import span
 from core.node import (
-    guide1_node, guide2_node, guide3_node, guide4_node, guide5_node,
-    guide6_node, guide7_node, guide8_node, guide9_node, guide10_node,
-    llm_node, final_updated_node
+    REVIEW_BUDGET_S, precheck_node, guideline_nodes,
+    llm_node, final_updated_node,
+    allm_node, afinal_updated_node,
 )
 
-graph = StateGraph(Response)
-
-# add nodes
-graph.add_node("guide1_node", guide1_node)
-graph.add_node("guide2_node", guide2_node)
-graph.add_node("guide3_node", guide3_node)
-graph.add_node("guide4_node", guide4_node)
-graph.add_node("guide5_node", guide5_node)
-graph.add_node("guide6_node", guide6_node)
-graph.add_node("guide7_node", guide7_node)
-graph.add_node("guide8_node", guide8_node)
-graph.add_node("guide9_node", guide9_node)
-graph.add_node("guide10_node", guide10_node)
-graph.add_node("llm_node", llm_node)
-graph.add_node("final_updated_node", final_updated_node)
-
-# parallel fan-out
-for i in range(1, 11):
-    graph.add_edge(START, f"guide{i}_node")
-    graph.add_edge(f"guide{i}_node", "llm_node")
-
-graph.add_edge("llm_node", "final_updated_node")
-graph.add_edge("final_updated_node", END)
-
-# compile workflow
-workflow = graph.compile()
+# SQLite file for LangGraph checkpoints (one thread per review); empty = no checkpointing
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", str(Path(__file__).parent.parent / ".cache" / "checkpoints.sqlite"))
+
+def traced(name: str, fn):
+    """Wrap a node so it runs inside a "node" span (LLM calls it makes nest under it)."""
+    if inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def anode(state):
+            with span(name, kind="node"):
+                return await fn(state)
+        return anode
+
+    @functools.wraps(fn)
+    def node(state):
+        with span(name, kind="node"):
+            return fn(state)
+    return node
+
+def build_graph(guide_nodes, merge_node, final_node) -> StateGraph:
+    """guide_nodes: [(name, callable)] — one per guideline, or per GUIDELINE_GROUPS group."""
+    graph = StateGraph(Response)
+
+    # add nodes
+    graph.add_node("precheck_node", traced("precheck_node", precheck_node))
+    for name, fn in guide_nodes:
+        graph.add_node(name, traced(name, fn))
+    graph.add_node("llm_node", traced("llm_node", merge_node))
+    graph.add_node("final_updated_node", traced("final_updated_node", final_node))
+
+    # static pre-analysis, then parallel fan-out
+    graph.add_edge(START, "precheck_node")
+    for name, _ in guide_nodes:
+        graph.add_edge("precheck_node", name)
+        graph.add_edge(name, "llm_node")
+
+    graph.add_edge("llm_node", "final_updated_node")
+    graph.add_edge("final_updated_node", END)
+    return graph
+
+@functools.lru_cache(maxsize=None)
+def get_workflow():
+    """Compiled sync graph (thread per node), built on first use."""
+    return build_graph(guideline_nodes(), llm_node, final_updated_node).compile()
+
+@functools.lru_cache(maxsize=None)
+def get_async_workflow():
+    """Compiled async graph for .ainvoke / .astream, built on first use."""
+    return build_graph(guideline_nodes(async_nodes=True), allm_node, afinal_updated_node).compile()
+
+# -----------------------
+# Checkpointed runs
+# -----------------------
+def new_thread_id() -> str:
+    return uuid.uuid4().hex
+
+def thread_config(thread_id: str) -> Dict[str, Any]:
+    return {"configurable": {"thread_id": thread_id}}
+
+@asynccontextmanager
+async def checkpointed_async_workflow(path: str = CHECKPOINT_PATH):
+    """
+    The async graph with an AsyncSqliteSaver on the running event loop: every finished
+    node is persisted under the run's thread id, so a failed or interrupted run can
+    resume (aprepare_resume) instead of starting over. Yields the plain graph when
+    checkpointing is off (path == "").
+    """
+    if not path:
+        yield get_async_workflow()
+        return
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    async with AsyncSqliteSaver.from_conn_string(path) as saver:
+        yield get_async_workflow().copy(update={"checkpointer": saver})
+
+# node whose (re-)completion leads to the given pending node, for update_state(as_node=...)
+def _writer_before(next_node: str) -> str:
+    if next_node == "final_updated_node":
+        return "llm_node"
+    if next_node == "llm_node":
+        return next(name for name, _ in guideline_nodes(async_nodes=True))
+    return "precheck_node"
+
+async def aprepare_resume(graph, config: Dict[str, Any]) -> bool:
+    """
+    True when the thread has an unfinished run; `graph.astream(None, config)` then continues
+    from the last completed node (finished guideline calls are not repeated). The latency
+    budget (REVIEW_BUDGET_S) restarts from now.
+    """
+    snapshot = await graph.aget_state(config)
+    if not snapshot.values or not snapshot.next:
+        return False
+    if REVIEW_BUDGET_S:
+        # stage deadlines are measured from started_at; a resumed run gets a fresh budget.
+        # (Resuming inside the guideline fan-out this way re-runs all of it; finished
+        # calls are then answered by the response cache.)
+        await graph.aupdate_state(config, {"started_at": time.time()}, as_node=_writer_before(snapshot.next[0]))
+    return True
+
+async def aprepare_final_rerun(graph, config: Dict[str, Any], merge_guide_res: Optional[str] = None) -> bool:
+    """
+    Fork the thread right after the merge so `graph.astream(None, config)` runs only the
+    final transform, with the stored merge_guide_res (or an edited one). False when the
+    thread has no merged suggestions yet.
+    """
+    snapshot = await graph.aget_state(config)
+    merged = merge_guide_res if merge_guide_res is not None else (snapshot.values or {}).get("merge_guide_res")
+    if not merged:
+        return False
+    await graph.aupdate_state(config, {"merge_guide_res": merged, "started_at": time.time()}, as_node="llm_node")
+    return True
+
+# `from core.graph import workflow` / `async_workflow` keep working, but only the one
+# that is used gets compiled
+_LAZY = {"workflow": get_workflow, "async_workflow": get_async_workflow}
+
+def __getattr__(name):
+    if name in _LAZY:
+        return _LAZY[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
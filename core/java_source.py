@@ -0,0 +1,521 @@
+# core/java_source.py
+"""
+Lightweight, dependency-free structure scanning for Java source.
+
+Not a parser: it masks comments and string/char literals, tracks brace depth and
+uses that to find type and member boundaries, which is enough to cut a file into
+reviewable pieces without splitting a method in half.
+"""
+import re
+from functools import lru_cache
+from typing import Iterator, List, NamedTuple, Optional, Tuple
+
+CHARS_PER_TOKEN = 4
+
+_TYPE_DECL_RE = re.compile(r"\b(class|interface|enum|record)\s+[A-Za-z_$][\w$]*")
+
+
+class Chunk(NamedTuple):
+    index: int          # 0-based position in the file
+    start_line: int     # 1-based, inclusive
+    end_line: int       # 1-based, inclusive
+    text: str           # exact slice of the original source (chunks concatenate back to the file)
+    context: str        # enclosing type declaration(s), e.g. "public class Foo extends Bar"
+
+
+def scan_literals(code: str) -> Iterator[Tuple[str, int, int]]:
+    """
+    (kind, start, end) for every comment and literal, in order. kind is one of
+    "line_comment", "block_comment", "javadoc", "text_block", "string", "char" or
+    "unclosed_literal"; the span covers delimiters (a line comment stops before its newline).
+    """
+    i, n = 0, len(code)
+    while i < n:
+        c = code[i]
+        nxt = code[i + 1] if i + 1 < n else ""
+        if c == "/" and nxt == "/":
+            end = code.find("\n", i)
+            end = n if end < 0 else end
+            yield "line_comment", i, end
+            i = end
+        elif c == "/" and nxt == "*":
+            end = code.find("*/", i + 2)
+            end = n if end < 0 else end + 2
+            javadoc = code.startswith("/**", i) and not code.startswith("/**/", i)
+            yield ("javadoc" if javadoc else "block_comment"), i, end
+            i = end
+        elif code.startswith('"""', i):
+            end = code.find('"""', i + 3)
+            end = n if end < 0 else end + 3
+            yield "text_block", i, end
+            i = end
+        elif c in ('"', "'"):
+            j = i + 1
+            while j < n and code[j] != c and code[j] != "\n":
+                j += 2 if code[j] == "\\" else 1
+            if j < n and code[j] == c:
+                yield ("string" if c == '"' else "char"), i, j + 1
+            else:  # runs into a newline / end of file
+                yield "unclosed_literal", i, min(j, n)
+            i = j + 1
+        else:
+            i += 1
+
+
+@lru_cache(maxsize=16)
+def mask_source(code: str) -> str:
+    """
+    Same-length copy of `code` with comments, string, text-block and char literals
+    blanked to spaces (newlines kept), so braces/semicolons inside them are ignored.
+    """
+    out = list(code)
+    n = len(code)
+
+    def blank(a: int, b: int) -> None:
+        for k in range(a, min(b, n)):
+            if out[k] != "\n":
+                out[k] = " "
+
+    for kind, a, b in scan_literals(code):
+        if kind.endswith("comment") or kind == "javadoc":
+            blank(a, b)
+        elif kind == "text_block":
+            blank(a + 1, b - 1)
+        elif kind == "unclosed_literal":
+            blank(a + 1, b)
+        else:
+            blank(a + 1, b - 1)
+    return "".join(out)
+
+
+def _line_starts(code: str) -> List[int]:
+    starts = [0]
+    for m in re.finditer("\n", code):
+        starts.append(m.end())
+    return starts
+
+
+def _line_of(starts: List[int], offset: int) -> int:
+    """1-based line number of a character offset."""
+    lo, hi = 0, len(starts) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if starts[mid] <= offset:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo + 1
+
+
+def _declaration_before(masked: str, brace: int) -> str:
+    """Text of the declaration that opens the block at `brace` (back to the previous ; { or })."""
+    k = brace - 1
+    while k >= 0 and masked[k] not in ";{}":
+        k -= 1
+    return " ".join(masked[k + 1:brace].split())
+
+
+def boundaries(code: str) -> List[Tuple[int, int, str]]:
+    """
+    Candidate cut points as (line, depth, context): the 1-based line after which
+    the file can be split because a top-level type (depth 0) or a member of a type
+    (depth 1, or deeper for nested types) just ended on that line.
+    """
+    masked = mask_source(code)
+    starts = _line_starts(code)
+    cuts: List[Tuple[int, int, str]] = []
+    stack: List[Tuple[bool, str]] = []  # (is_type_body, declaration)
+
+    def type_depth() -> int:
+        return sum(1 for is_type, _ in stack if is_type)
+
+    def context() -> str:
+        return " > ".join(d for is_type, d in stack if is_type)
+
+    for i, c in enumerate(masked):
+        if c == "{":
+            decl = _declaration_before(masked, i)
+            # a block is a type body if its declaration names a type (anonymous bodies are not cut)
+            stack.append((bool(_TYPE_DECL_RE.search(decl)), decl))
+        elif c == "}":
+            if stack:
+                stack.pop()
+            # closing a member body directly inside a type body, or a top-level type
+            if not stack or stack[-1][0]:
+                cuts.append((_line_of(starts, i), type_depth(), context()))
+        elif c == ";" and (not stack or stack[-1][0]):
+            # field / abstract method / import / package statement
+            cuts.append((_line_of(starts, i), type_depth(), context()))
+    return cuts
+
+
+def _contexts_at(masked: str, offsets: List[int]) -> List[str]:
+    """Enclosing type declarations at each (sorted) offset, in a single scan."""
+    out: List[str] = []
+    stack: List[Tuple[bool, str]] = []
+    pos = 0
+    for target in offsets:
+        for i in range(pos, min(target, len(masked))):
+            c = masked[i]
+            if c == "{":
+                decl = _declaration_before(masked, i)
+                stack.append((bool(_TYPE_DECL_RE.search(decl)), decl))
+            elif c == "}" and stack:
+                stack.pop()
+        pos = max(pos, target)
+        out.append(" > ".join(d for is_type, d in stack if is_type))
+    return out
+
+
+def enclosing_types(code: str, line: int) -> str:
+    """Declarations of the types open at the start of `line` (outermost first)."""
+    starts = _line_starts(code)
+    offset = starts[line - 1] if 0 < line <= len(starts) else len(code)
+    return _contexts_at(mask_source(code), [offset])[0]
+
+
+def enclosing_types_at(code: str, lines: List[int]) -> List[str]:
+    """enclosing_types() for several lines (ascending) in a single scan."""
+    starts = _line_starts(code)
+    offsets = [starts[line - 1] if 0 < line <= len(starts) else len(code) for line in lines]
+    return _contexts_at(mask_source(code), offsets)
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or "") // CHARS_PER_TOKEN + 1
+
+
+def chunk_source(code: str, token_budget: int) -> List[Chunk]:
+    """
+    Split `code` into contiguous whole-line chunks of at most ~token_budget tokens,
+    cutting only after type/member boundaries. A single member larger than the
+    budget is split at line boundaries as a last resort. Joining the chunk texts
+    reproduces `code` exactly.
+    """
+    if not code:
+        return []
+    lines = code.splitlines(keepends=True)
+    max_chars = max(1, token_budget) * CHARS_PER_TOKEN
+    if len(code) <= max_chars:
+        return [Chunk(0, 1, len(lines), code, "")]
+
+    cut_lines = sorted({ln for ln, _, _ in boundaries(code)} | {len(lines)})
+    # segments between consecutive cut lines: (start_line, end_line), 1-based inclusive
+    segments: List[Tuple[int, int]] = []
+    prev = 0
+    for ln in cut_lines:
+        if ln > prev:
+            segments.append((prev + 1, ln))
+            prev = ln
+
+    def seg_chars(a: int, b: int) -> int:
+        return sum(len(lines[k]) for k in range(a - 1, b))
+
+    # break oversized segments (a huge method) at line boundaries
+    pieces: List[Tuple[int, int]] = []
+    for a, b in segments:
+        if seg_chars(a, b) <= max_chars:
+            pieces.append((a, b))
+            continue
+        start, size = a, 0
+        for ln in range(a, b + 1):
+            size += len(lines[ln - 1])
+            if size > max_chars and ln > start:
+                pieces.append((start, ln - 1))
+                start, size = ln, len(lines[ln - 1])
+        pieces.append((start, b))
+
+    # greedy packing of pieces into chunks
+    spans: List[Tuple[int, int]] = []
+    cur_start, cur_end, cur_size = None, None, 0
+    for a, b in pieces:
+        size = seg_chars(a, b)
+        if cur_start is not None and cur_size + size > max_chars:
+            spans.append((cur_start, cur_end))
+            cur_start, cur_size = None, 0
+        if cur_start is None:
+            cur_start = a
+        cur_end = b
+        cur_size += size
+    if cur_start is not None:
+        spans.append((cur_start, cur_end))
+
+    starts = _line_starts(code)
+    contexts = _contexts_at(mask_source(code), [starts[a - 1] for a, _ in spans])
+    return [
+        Chunk(idx, a, b, "".join(lines[a - 1:b]), ctx)
+        for idx, ((a, b), ctx) in enumerate(zip(spans, contexts))
+    ]
+
+
+# -----------------------
+# Tokens and declarations
+# -----------------------
+_TOKEN_RE = re.compile(
+    r'(?P<text_block>"""[\s\S]*?""")'
+    r'|(?P<string>"(?:[^"\\\n]|\\.)*")'
+    r"|(?P<char>'(?:[^'\\\n]|\\.)*')"
+    r"|(?P<ident>[A-Za-z_$][\w$]*)"
+    r"|(?P<number>\d[\w.]*)"
+    r"|(?P<op>->|::|\.\.\.|[{}()\[\];,.<>=@?:!~+\-*/&|^%])"
+)
+
+JAVA_MODIFIERS = {
+    "public", "protected", "private", "static", "final", "abstract", "synchronized",
+    "native", "transient", "volatile", "strictfp", "default", "sealed", "non-sealed",
+}
+
+
+class Token(NamedTuple):
+    kind: str   # ident | string | char | number | op
+    text: str
+    line: int   # 1-based
+
+
+class Member(NamedTuple):
+    kind: str             # field | method | constructor | initializer
+    name: str
+    modifiers: frozenset
+    type_text: str        # field type / method return type ("" for constructors)
+    params_text: str      # raw parameter list for methods/constructors
+    line: int             # first line of the declaration
+    end_line: int         # last line (end of body or ';')
+    owner: str            # simple name of the declaring type
+
+
+class TypeDecl(NamedTuple):
+    kind: str             # class | interface | enum | record
+    name: str
+    modifiers: frozenset
+    line: int
+    end_line: int
+    members: List[Member]
+
+
+def tokenize(code: str) -> List[Token]:
+    """Java tokens with comments dropped (string/char literal contents are preserved)."""
+    masked = mask_source(code)
+    starts = _line_starts(code)
+    tokens: List[Token] = []
+    pos, n = 0, len(code)
+    while pos < n:
+        if masked[pos].isspace():
+            pos += 1
+            continue
+        m = _TOKEN_RE.match(code, pos)
+        if not m or m.end() == pos:
+            pos += 1
+            continue
+        kind = "string" if m.lastgroup == "text_block" else m.lastgroup
+        tokens.append(Token(kind, m.group(), _line_of(starts, pos)))
+        pos = m.end()
+    return tokens
+
+
+def _skip_annotation(tokens: List[Token], i: int) -> int:
+    """Index just past an annotation starting at tokens[i] == '@'."""
+    i += 2  # '@' Name
+    while i + 1 < len(tokens) and tokens[i].text == "." and tokens[i + 1].kind == "ident":
+        i += 2
+    if i < len(tokens) and tokens[i].text == "(":
+        depth = 0
+        while i < len(tokens):
+            if tokens[i].text == "(":
+                depth += 1
+            elif tokens[i].text == ")":
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+            i += 1
+    return i
+
+
+def _matching(tokens: List[Token], i: int, open_: str, close: str) -> int:
+    """Index of the token closing the bracket opened at tokens[i]."""
+    depth = 0
+    for k in range(i, len(tokens)):
+        if tokens[k].text == open_:
+            depth += 1
+        elif tokens[k].text == close:
+            depth -= 1
+            if depth == 0:
+                return k
+    return len(tokens) - 1
+
+
+def _join(tokens: List[Token]) -> str:
+    """Re-join tokens into readable source ("Map<String, List<Integer>>", "String... rest")."""
+    words = ("ident", "number", "string", "char")
+    out: List[str] = []
+    prev = None
+    for t in tokens:
+        if prev is not None and (
+            (t.kind in words and (prev.kind in words or prev.text in (",", "...", ">", "]", "=", "?", "&", "|", "->")))
+            or t.text in ("=", "->", "&", "|")
+        ):
+            out.append(" ")
+        out.append(t.text)
+        prev = t
+    return "".join(out)
+
+
+def _parse_header(tokens: List[Token]):
+    """Split a member header (tokens before '{' / ';') into modifiers, annotations and the rest."""
+    mods, rest, i = set(), [], 0
+    while i < len(tokens):
+        t = tokens[i]
+        if t.text == "@" and i + 1 < len(tokens) and tokens[i + 1].text != "interface":
+            i = _skip_annotation(tokens, i)
+            continue
+        if t.text in JAVA_MODIFIERS and not rest:
+            mods.add(t.text)
+        else:
+            rest.append(t)
+        i += 1
+    return mods, rest
+
+
+def _member_from_header(header: List[Token], end_line: int, owner: str, is_block: bool) -> List[Member]:
+    mods, rest = _parse_header(header)
+    line = header[0].line if header else end_line
+    if not rest:
+        return [Member("initializer", "", frozenset(mods), "", "", line, end_line, owner)] if is_block else []
+    paren = next((k for k, t in enumerate(rest) if t.text == "("), None)
+    eq = next((k for k, t in enumerate(rest) if t.text == "="), None)
+    if paren is not None and (eq is None or paren < eq) and paren > 0 and rest[paren - 1].kind == "ident":
+        name = rest[paren - 1].text
+        close = _matching(rest, paren, "(", ")")
+        params = _join(rest[paren + 1:close])
+        type_tokens = rest[:paren - 1]
+        # drop method type parameters: <T extends Foo> void m()
+        if type_tokens and type_tokens[0].text == "<":
+            type_tokens = type_tokens[_matching(type_tokens, 0, "<", ">") + 1:]
+        kind = "method" if type_tokens else "constructor"
+        return [Member(kind, name, frozenset(mods), _join(type_tokens), params, line, end_line, owner)]
+    # field(s): Type a = 1, b;
+    decl = rest[:eq] if eq is not None else rest
+    names, depth, type_end = [], 0, None
+    for k, t in enumerate(rest):
+        if t.text in ("<", "(", "[", "{"):
+            depth += 1
+        elif t.text in (">", ")", "]", "}"):
+            depth -= 1
+        elif depth == 0 and t.kind == "ident" and k + 1 <= len(rest):
+            nxt = rest[k + 1].text if k + 1 < len(rest) else ";"
+            prev = rest[k - 1].text if k > 0 else ""
+            if nxt in ("=", ",", ";", "[") and (prev == "," or type_end is None) and k > 0:
+                if type_end is None:
+                    type_end = k
+                names.append(t.text)
+    if not names and len(decl) >= 2 and decl[-1].kind == "ident":
+        names, type_end = [decl[-1].text], len(decl) - 1
+    type_text = _join(rest[:type_end]) if type_end else ""
+    return [Member("field", n, frozenset(mods), type_text, "", line, end_line, owner) for n in names]
+
+
+def parse_types(code: str, tokens: Optional[List[Token]] = None) -> List[TypeDecl]:
+    """
+    Flat list of every type declared in `code` (nested types included) with its
+    fields, methods, constructors and initializers. Bodies are skipped, so local
+    and anonymous classes are not reported.
+    """
+    tokens = tokenize(code) if tokens is None else tokens
+    types: List[TypeDecl] = []
+
+    def parse_body(i: int, owner: TypeDecl) -> int:
+        """Parse members from tokens[i] (just after '{') to the matching '}'; returns index after it."""
+        header: List[Token] = []
+        while i < len(tokens):
+            t = tokens[i]
+            if t.text == "}":
+                return i + 1
+            if t.text == ";":
+                if header:
+                    owner.members.extend(_member_from_header(header, t.line, owner.name, False))
+                header = []
+                i += 1
+                continue
+            if t.text == "(":
+                # keep parenthesised groups (params, annotation args) in the header as-is
+                close = _matching(tokens, i, "(", ")")
+                header.extend(tokens[i:close + 1])
+                i = close + 1
+                continue
+            if t.text == "{":
+                kind = _type_keyword(header)
+                if kind:
+                    i = parse_type(header, i, kind)
+                else:
+                    close = _matching(tokens, i, "{", "}")
+                    if "=" in [h.text for h in header]:
+                        # field initialised with an array literal / anonymous class: wait for ';'
+                        header.extend(tokens[i:close + 1])
+                        i = close + 1
+                        continue
+                    owner.members.extend(_member_from_header(header, tokens[close].line, owner.name, True))
+                    i = close + 1
+                header = []
+                continue
+            header.append(t)
+            i += 1
+        return i
+
+    def parse_type(header: List[Token], brace: int, kind: str) -> int:
+        mods, rest = _parse_header(header)
+        names = [t.text for k, t in enumerate(rest) if k > 0 and rest[k - 1].text == kind and t.kind == "ident"]
+        decl = TypeDecl(kind, names[0] if names else "?", frozenset(mods),
+                        header[0].line if header else tokens[brace].line, tokens[brace].line, [])
+        types.append(decl)
+        start = brace + 1
+        if kind == "enum":
+            start = _skip_enum_constants(brace + 1)
+        end = parse_body(start, decl)
+        end_line = tokens[min(end, len(tokens)) - 1].line
+        types[types.index(decl)] = decl._replace(end_line=end_line)
+        return end
+
+    def _skip_enum_constants(i: int) -> int:
+        """Index just past the constant list (`A(1), B { ... };`), or at the closing '}'."""
+        while i < len(tokens):
+            t = tokens[i]
+            if t.text == ";":
+                return i + 1
+            if t.text == "}":
+                return i
+            if t.text in ("(", "{"):
+                i = _matching(tokens, i, t.text, ")" if t.text == "(" else "}")
+            i += 1
+        return i
+
+    i, header = 0, []
+    while i < len(tokens):
+        t = tokens[i]
+        if t.text == ";":
+            header = []
+        elif t.text == "{":
+            kind = _type_keyword(header)
+            if kind:
+                i = parse_type(header, i, kind)
+            else:
+                i = _matching(tokens, i, "{", "}") + 1
+            header = []
+            continue
+        else:
+            header.append(t)
+        i += 1
+    return types
+
+
+@lru_cache(maxsize=16)
+def parse_source(code: str) -> Tuple[List[Token], List[TypeDecl]]:
+    """tokenize() and parse_types() of `code`, computed once for the pre-passes of a review (read-only)."""
+    tokens = tokenize(code)
+    return tokens, parse_types(code, tokens)
+
+
+def _type_keyword(header: List[Token]) -> str:
+    for k, t in enumerate(header):
+        if t.text in ("class", "interface", "enum", "record") and (k == 0 or header[k - 1].text != "."):
+            if k + 1 < len(header) and header[k + 1].kind == "ident":
+                return t.text
+    return ""
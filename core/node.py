@@ -1,8 +1,26 @@
 # core/node.py
+import asyncio
+import contextvars
+import os
 import re
-from typing import Dict
-from core.clients import invoke
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from core.cache import FINDINGS_CACHE_ENABLED, get_findings_cache, make_key
+from core.clients import ainvoke, invoke
+from core.compaction import COMPACTION, compact_source, policy_for, remap_line_refs
+from core.findings import (
+    Finding, dedupe_findings, group_by_guideline, parse_findings, render_compact, render_merge,
+)
+from core.java_source import Chunk, chunk_source, estimate_tokens
+from core.patching import apply_patch, looks_like_diff
+from core.review_scope import CHANGED_MARK, mark_changed, restrict_edits, scope_chunks, splice
+from core.routing import tier_for
 from core.schema import Response
+from core.slicing import SLICING, empty_slices, slice_chunks, slice_lines
+from core.static_checks import run_static_checks
+from core.units import Unit, code_units
 
 # -----------------------
 # CONFIG — tweak these
@@ -12,6 +30,44 @@ MAX_AGENT_OUTPUT_CHARS = 5_000
 MAX_MERGE_OUTPUT_CHARS = 30_000
 MAX_FINDINGS = 4
 
+# Files larger than this (estimated tokens) are split at type/method boundaries and
+# each guideline / the final transform runs once per chunk, in parallel.
+CHUNK_TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "3000"))
+CHUNK_PARALLELISM = int(os.getenv("CHUNK_PARALLELISM", "4"))  # sync threads per node
+MAX_CHUNKED_AGENT_OUTPUT_CHARS = 12_000
+NO_FINDINGS = "NONE"
+
+# Guideline grouping: send several guidelines in one prompt instead of one call each.
+#   ""   -> one call per guideline (default)
+#   "all" -> a single call for all ten
+#   "G01,G02,G03;G04,G05:2500" -> ';'-separated groups, optional ':<max_tokens>' per group
+# Guidelines not listed keep their own node.
+GUIDELINE_GROUPS = os.getenv("GUIDELINE_GROUPS", "").strip()
+GROUP_TOKENS_PER_GUIDELINE = int(os.getenv("GROUP_TOKENS_PER_GUIDELINE", "800"))
+DEFAULT_MAX_TOKENS = 1500
+
+# Merge step: "llm" asks the integrator model; "local" builds merge_guide_res from the
+# parsed findings in Python (no LLM round trip) and falls back to the LLM only when
+# some agent reply could not be parsed.
+MERGE_MODE = os.getenv("MERGE_MODE", "llm").strip().lower()
+
+# Final transform: "full" asks for the whole rewritten file; "diff" asks for a unified
+# diff that is applied locally (core/patching.py), so output tokens scale with the change.
+FINAL_MODE = os.getenv("FINAL_MODE", "full").strip().lower()
+
+# Latency budget per review (seconds from precheck_node, 0 = unbounded). Each stage must
+# finish by its share of the budget; calls still running then are abandoned and the node
+# degrades (stub finding / local merge / original code). Hedging: LLM_HEDGE_PERCENTILE.
+REVIEW_BUDGET_S = float(os.getenv("REVIEW_BUDGET_S", "0"))
+STAGE_BUDGET = {"guidelines": 0.6, "merge": 0.8, "final": 1.0}
+
+# Method-level findings cache (FINDINGS_CACHE=true): single-guideline nodes review the file
+# per unit (core/units.py) and send only units whose findings are not cached, batched up to
+# CHUNK_TOKEN_BUDGET. Bump the version whenever build_unit_prompt or GUIDES change.
+FINDINGS_PROMPT_VERSION = "2"
+MAX_UNITS_PER_PROMPT = 16
+UNIT_TOKENS = 200  # reply budget per unit in a batch (most units answer NONE)
+
 # Strict mode: require a suggestion for EVERY guideline (even if agent replied "code is fine for that guideline")
 APPLY_ALL_GUIDELINES = True
 
@@ -25,10 +81,11 @@ def _truncate_code(code: str, max_chars: int = MAX_CODE_CHARS) -> str:
         return code
     return f"/* TRUNCATED: original_length={len(code)} chars */\n" + code[:max_chars]
 
-def _safe_invoke(prompt: str) -> Dict[str, str]:
-    """Call invoke(prompt) and normalize result to dict with 'content' key."""
+def _safe_invoke(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                 deadline: Optional[float] = None, route: Optional[str] = None) -> Dict[str, str]:
+    """Call invoke(prompt) and normalize result to dict with 'content' key (route: see core/routing.py)."""
     try:
-        resp = invoke(prompt)
+        resp = invoke(prompt, max_tokens=max_tokens, deadline=deadline, route=route)
         if isinstance(resp, dict) and "content" in resp:
             return resp
         if isinstance(resp, dict) and "text" in resp:
@@ -37,6 +94,57 @@ def _safe_invoke(prompt: str) -> Dict[str, str]:
     except Exception as e:
         return {"content": f"[llm-invoke-failed] {e}"}
 
+async def _safe_ainvoke(prompt: str, max_tokens: int = DEFAULT_MAX_TOKENS,
+                        deadline: Optional[float] = None, route: Optional[str] = None) -> Dict[str, str]:
+    """Async twin of _safe_invoke built on clients.ainvoke."""
+    try:
+        resp = await ainvoke(prompt, max_tokens=max_tokens, deadline=deadline, route=route)
+        if isinstance(resp, dict) and "content" in resp:
+            return resp
+        if isinstance(resp, dict) and "text" in resp:
+            return {"content": resp.get("text", "")}
+        return {"content": str(resp)}
+    except Exception as e:
+        return {"content": f"[llm-invoke-failed] {e}"}
+
+def _invoke_many(prompts: List[str], max_tokens: int = DEFAULT_MAX_TOKENS,
+                 deadline: Optional[float] = None, route: Optional[str] = None) -> List[Dict[str, str]]:
+    """_safe_invoke over several prompts, in parallel threads when there is more than one."""
+    if len(prompts) <= 1:
+        return [_safe_invoke(p, max_tokens, deadline, route) for p in prompts]
+    with ThreadPoolExecutor(max_workers=max(1, min(CHUNK_PARALLELISM, len(prompts)))) as pool:
+        # copy the context per call so LLM spans stay children of this node's span
+        futures = [pool.submit(contextvars.copy_context().run, _safe_invoke, p, max_tokens, deadline, route)
+                   for p in prompts]
+        return [f.result() for f in futures]
+
+async def _ainvoke_many(prompts: List[str], max_tokens: int = DEFAULT_MAX_TOKENS,
+                        deadline: Optional[float] = None, route: Optional[str] = None) -> List[Dict[str, str]]:
+    return list(await asyncio.gather(*(_safe_ainvoke(p, max_tokens, deadline, route) for p in prompts)))
+
+def _deadline(state, stage: str) -> Optional[float]:
+    """Epoch deadline for a stage under REVIEW_BUDGET_S (None when unbounded)."""
+    started = _state_value(state, "started_at")
+    if REVIEW_BUDGET_S <= 0 or not started:
+        return None
+    return started + REVIEW_BUDGET_S * STAGE_BUDGET[stage]
+
+def _strip_code_fences(text: str) -> str:
+    """Drop a surrounding ```java ... ``` fence if the model added one."""
+    m = re.match(r"^\s*```[\w-]*\n(.*?)\n?```\s*$", text or "", re.S)
+    return m.group(1) if m else (text or "")
+
+def _chunk_label(chunk: Chunk, total: int, kind: str = "chunk", lines: bool = True) -> str:
+    where = f", inside {chunk.context}" if chunk.context else ""
+    span = f", lines {chunk.start_line}-{chunk.end_line}" if lines else ""
+    return f"{kind} {chunk.index + 1}/{total}{span}{where}"
+
+def _state_value(state, key: str, default=None):
+    """Read a field from the graph state (pydantic Response or plain dict)."""
+    if isinstance(state, dict):
+        return state.get(key, default)
+    return getattr(state, key, default)
+
 def _ensure_short(text: str, max_chars: int) -> str:
     if not text:
         return ""
@@ -79,15 +187,26 @@ GUIDES = {
 # -----------------------
 # Prompt builders (strict & compact)
 # -----------------------
-def build_guideline_prompt(guid_id: str, guid_title: str, guid_desc: str, code_text: str) -> str:
+def build_guideline_prompt(guid_id: str, guid_title: str, guid_desc: str, code_text: str,
+                           chunk_label: Optional[str] = None, scoped: bool = False, sliced: bool = False) -> str:
     """
     Strict per-guideline prompt. Ask for 0..MAX_FINDINGS concise findings.
     If APPLY_ALL_GUIDELINES is True, instruct the agent to provide at least
     one suggestion even if the code looks fine (prefer minimal best-practice).
+    With chunk_label the code is one piece of a larger file: a clean chunk answers
+    NONE and the best-practice fallback is applied once, after all chunks.
+    scoped: the piece is a changed region of a pull request (see _scope_line).
+    sliced: only the declarations this guideline needs are shown (core/slicing.py).
     """
     code_text = _truncate_code(code_text)
+    slice_line = ""
+    if sliced:
+        slice_line = "Only the declarations relevant to this guideline are shown; do not report code that is not shown.\n"
     mandatory_line = ""
-    if APPLY_ALL_GUIDELINES:
+    if chunk_label:
+        mandatory_line = f"This is {chunk_label} of a larger file. If this chunk has no issues for this guideline, respond with exactly: {NO_FINDINGS}\n"
+        mandatory_line += _scope_line(scoped)
+    elif APPLY_ALL_GUIDELINES:
         mandatory_line = "If no issues, still propose ONE minimal best-practice change for this guideline.\n"
     return (
         f"GUIDELINE:{guid_id} | {guid_title}\n{guid_desc}\n\n"
@@ -100,19 +219,108 @@ def build_guideline_prompt(guid_id: str, guid_title: str, guid_desc: str, code_t
         "- Issue: <one short sentence>\n"
         "- Fix: <one short sentence>\n"
         "- Patch (optional): ```java\n  // minimal snippet\n  ```\n\n"
-        "RULES: Do NOT invent line numbers. Use 'approximate' when unsure. Respond ONLY with findings (no commentary).\n\n"
+        "RULES: Do NOT invent line numbers. Use 'approximate' when unsure. Respond ONLY with findings (no commentary).\n"
+        f"{slice_line}\n"
         f"CODE:\n{code_text}\n"
     )
 
-def build_merge_prompt(agent_responses: str) -> str:
+def build_group_prompt(guid_ids: List[str], code_text: str, chunk_label: Optional[str] = None,
+                       scoped: bool = False) -> str:
+    """
+    Several guidelines in one call. The reply must contain one '### Gxx' section per
+    guideline (same Finding template inside) so split_group_response can route each
+    section back to its guideline_N field.
+    """
+    code_text = _truncate_code(code_text)
+    specs = "\n".join(f"{g} | {GUIDES[g][0]}: {GUIDES[g][1]}" for g in guid_ids)
+    if chunk_label:
+        mandatory_line = f"This is {chunk_label} of a larger file. If a guideline has no issues in this chunk, its section must contain exactly: {NO_FINDINGS}\n"
+        mandatory_line += _scope_line(scoped)
+    elif APPLY_ALL_GUIDELINES:
+        mandatory_line = "If a guideline has no issues, still propose ONE minimal best-practice change in its section.\n"
+    else:
+        mandatory_line = ""
+    return (
+        f"GUIDELINES:\n{specs}\n\n"
+        f"You are a senior Java reviewer. Review the code against EACH guideline above independently. "
+        f"Provide up to {MAX_FINDINGS} concise findings per guideline. {mandatory_line}"
+        "Start each guideline's section with a header line exactly like '### G01' (one section per guideline, in the order listed).\n"
+        "FOR EACH finding use THIS TEMPLATE (plain text only):\n"
+        "- Finding: <short title>\n"
+        "- Area: <method name or 'approximate'>\n"
+        "- Severity: <High|Medium|Low>\n"
+        "- Confidence: <1-5>\n"
+        "- Issue: <one short sentence>\n"
+        "- Fix: <one short sentence>\n"
+        "- Patch (optional): ```java\n  // minimal snippet\n  ```\n\n"
+        "RULES: Do NOT invent line numbers. Use 'approximate' when unsure. Respond ONLY with the sections (no commentary).\n\n"
+        f"CODE:\n{code_text}\n"
+    )
+
+def _scope_line(scoped: bool) -> str:
+    if not scoped:
+        return ""
+    return (f"Lines ending in '{CHANGED_MARK}' were changed by a pull request; the rest is context. "
+            "Report ONLY issues in changed lines.\n")
+
+def build_unit_prompt(guid_id: str, guid_title: str, guid_desc: str, units: List[Tuple[str, str]]) -> str:
+    """
+    One guideline over several review units (header, code) of one file. Every unit gets
+    its own '### Un' section in the reply, so its findings can be cached on their own.
+    """
+    blocks = "\n".join(f"### {header}\n{_truncate_code(code)}" for header, code in units)
+    return (
+        f"GUIDELINE:{guid_id} | {guid_title}\n{guid_desc}\n\n"
+        "You are a senior Java reviewer. The code below is split into UNITS: methods of one file, and its "
+        "declarations with method bodies shown as { ... }. Review each unit on its own. "
+        f"Provide up to {MAX_FINDINGS} concise findings per unit. If a unit has no issues for this guideline, "
+        f"its section must contain exactly: {NO_FINDINGS}\n"
+        "Start each unit's section with a header line exactly like '### U1' (one section per unit, in the order listed).\n"
+        "FOR EACH finding use THIS TEMPLATE (plain text only):\n"
+        "- Finding: <short title>\n"
+        "- Area: <method name or 'approximate'>\n"
+        "- Severity: <High|Medium|Low>\n"
+        "- Confidence: <1-5>\n"
+        "- Issue: <one short sentence>\n"
+        "- Fix: <one short sentence>\n"
+        "- Patch (optional): ```java\n  // minimal snippet\n  ```\n\n"
+        "RULES: Do NOT invent line numbers. Use 'approximate' when unsure. Respond ONLY with the sections (no commentary).\n\n"
+        f"UNITS:\n{blocks}\n"
+    )
+
+def split_group_response(text: str, guid_ids: List[str]) -> Dict[str, str]:
+    """Route '### Gxx' sections of a grouped reply back to their guidelines ('' when missing)."""
+    return split_sections(text, guid_ids, r"G\d{2}")
+
+def split_sections(text: str, ids: List[str], id_pattern: str) -> Dict[str, str]:
+    """'### <id>' sections of a reply by id ('' when missing)."""
+    out = {g: "" for g in ids}
+    if not text or _is_failed(text):
+        return out
+    marks = list(re.finditer(rf"^\s*(?:#+|\*\*)?\s*({id_pattern})\b[^\n]*$", text, re.M))
+    for k, m in enumerate(marks):
+        g = m.group(1)
+        if g in out:
+            end = marks[k + 1].start() if k + 1 < len(marks) else len(text)
+            out[g] = (out[g] + "\n" + text[m.end():end].strip()).strip()
+    return out
+
+def build_merge_prompt(agent_responses: str, scoped: bool = False) -> str:
     """
     Strict integrator: MUST include an item for each guideline G01..G10.
     The integrator must prioritize High severity, but still output one entry per guideline.
     End with a 'Minimal Patch' section (3-12 lines).
+    scoped (pull request review): only the guidelines present in the findings.
     """
+    if scoped:
+        coverage = "one consolidated suggestion for each guideline listed in AGENT_FINDINGS"
+        rule1 = "1) The findings concern lines changed by a pull request: do NOT add suggestions for guidelines that are not listed.\n"
+    else:
+        coverage = "exactly one consolidated suggestion for each guideline from G01 to G10"
+        rule1 = "1) MUST output one consolidated suggestion for each G01..G10. If an agent said 'code is fine for that guideline', still produce a minimal best-practice change.\n"
     return (
         "You are a strict integrator. Given the agents' findings below, produce a FINAL prioritized list\n"
-        "with exactly one consolidated suggestion for each guideline from G01 to G10 (include the guideline code in Trigger).\n"
+        f"with {coverage} (include the guideline code in Trigger).\n"
         "Use THIS TEMPLATE for every suggestion (plain text only):\n\n"
         "- Title: <short>\n"
         "- Trigger: <Gxx>\n"
@@ -122,16 +330,28 @@ def build_merge_prompt(agent_responses: str) -> str:
         "- Change: <one-line action>\n"
         "- Patch (optional): ```java\n  // minimal snippet\n  ```\n\n"
         "RULES:\n"
-        "1) MUST output one consolidated suggestion for each G01..G10. If an agent said 'code is fine for that guideline', still produce a minimal best-practice change.\n"
+        f"{rule1}"
         "2) Prioritize correctness/security (High) first when ordering. 3) If conflict between agents, pick the least-risky correct fix. 4) At the end produce a 'Minimal Patch' of 3-12 concrete edit lines.\n\n"
+        "AGENT_FINDINGS are pre-parsed and deduplicated, one section per guideline, most severe first. Each line reads\n"
+        "'[Severity/Confidence] title @ area'; '(also Gxx)' means the same change also covers that guideline.\n\n"
         "AGENT_FINDINGS:\n" + agent_responses + "\n\nRespond ONLY with the consolidated suggestions and the Minimal Patch."
     )
 
-def build_final_transform_prompt(merged_suggestions: str, original_code: str) -> str:
+def build_final_transform_prompt(merged_suggestions: str, original_code: str,
+                                 chunk_label: Optional[str] = None) -> str:
     """
     Instructs to apply ALL merged suggestions. Must include comment header listing applied guidelines.
+    With chunk_label only one fragment of a large file is rewritten; the header is added after reassembly.
     """
     original_code = _truncate_code(original_code)
+    if chunk_label:
+        return (
+            f"Task: ORIGINAL_FRAGMENT is {chunk_label} of a larger Java file; other fragments are handled separately.\n"
+            "Apply the changes in MERGED_SUGGESTIONS that concern code in this fragment and leave everything else untouched.\n"
+            "Return ONLY the updated fragment: no header comment, no commentary, no code fences. "
+            "Do not add or remove braces that open or close outside the fragment.\n\n"
+            f"MERGED_SUGGESTIONS:\n{merged_suggestions}\n\nORIGINAL_FRAGMENT:\n{original_code}\n\nRespond only with the updated fragment."
+        )
     return (
         "Task: Apply ALL changes listed in MERGED_SUGGESTIONS to ORIGINAL_CODE. You MUST apply each guideline's fix.\n"
         "Return ONLY a single updated Java file (no commentary). At the very top include a one-line comment:\n"
@@ -140,19 +360,176 @@ def build_final_transform_prompt(merged_suggestions: str, original_code: str) ->
         f"MERGED_SUGGESTIONS:\n{merged_suggestions}\n\nORIGINAL_CODE:\n{original_code}\n\nRespond only with the updated file."
     )
 
+def build_final_diff_prompt(merged_suggestions: str, original_code: str,
+                            chunk_label: Optional[str] = None) -> str:
+    """
+    FINAL_MODE=diff: same task as build_final_transform_prompt, but the model returns
+    only a unified diff against ORIGINAL_CODE, which core/patching.py applies.
+    """
+    original_code = _truncate_code(original_code)
+    scope = ""
+    if chunk_label:
+        scope = (f"ORIGINAL_CODE is {chunk_label} of a larger Java file; only change code inside it "
+                 "and number lines from 1 at its first line.\n")
+    return (
+        "Task: Apply the changes in MERGED_SUGGESTIONS to ORIGINAL_CODE. Do NOT return the file.\n"
+        f"{scope}"
+        "Return ONLY a unified diff of your edits (like `diff -u`), no commentary and no code fences:\n"
+        "--- a/Original.java\n+++ b/Original.java\n@@ -<start>,<count> +<start>,<count> @@\n"
+        " <unchanged context line>\n-<removed line>\n+<added line>\n\n"
+        "Rules: 1) Copy 3 unchanged context lines before and after each change exactly as they appear. "
+        "2) One hunk per contiguous change, hunks in file order, never overlapping. "
+        "3) Make minimal safe edits that implement the suggested changes; preserve unrelated code. "
+        "4) Do not add an Applied header comment.\n\n"
+        f"MERGED_SUGGESTIONS:\n{merged_suggestions}\n\nORIGINAL_CODE:\n{original_code}\n\nRespond only with the diff."
+    )
+
 # -----------------------
 # Nodes
 # -----------------------
-def run_guideline_node_dict(state: Response, guid_key: str, field_name: str) -> Dict[str, str]:
-    code_text = getattr(state, "code_snippet", "") or ""
+# Each node is split into a pure "prompt" step and a pure "result" step so the
+# sync and async variants below share everything except the LLM call itself.
+
+@lru_cache(maxsize=16)
+def _chunks_for(code_text: str) -> Tuple[Chunk, ...]:
+    # every node of a review asks for the same split; compute it once per file
+    return tuple(chunk_source(code_text, CHUNK_TOKEN_BUDGET)) or (Chunk(0, 1, 1, code_text, ""),)
+
+def _prompt_units(static: Dict[str, Dict[str, str]]) -> List[List[str]]:
+    """Guideline ids per LLM prompt (groups and single guidelines) left after the static checks."""
+    decided = {g for g, v in (static or {}).items() if v.get("content")}
+    groups = [ids for ids, _ in parse_guideline_groups()]
+    grouped = {g for ids in groups for g in ids}
+    units = [[g for g in ids if g not in decided] for ids in groups]
+    units += [[g] for g in GUIDES if g not in grouped and g not in decided]
+    return [ids for ids in units if ids]
+
+def _compaction_report(code: str, static: Dict[str, Dict[str, str]], chunks: List[Chunk]) -> Dict[str, Any]:
+    """Estimated code tokens sent to the guideline prompts, before/after compaction and slicing."""
+    by_prompt = {}
+    for ids in _prompt_units(static):
+        policy = policy_for(ids)
+        # single-guideline prompts only get their slice (core/slicing.py)
+        sent = (slice_chunks(code, chunks, ids[0]) if len(ids) == 1 else None) or chunks
+        by_prompt["+".join(ids)] = [
+            sum(estimate_tokens(c.text) for c in chunks),
+            sum(compact_source(c.text, policy).compact_tokens for c in sent if c is not None),
+        ]
+    before = sum(b for b, _ in by_prompt.values())
+    after = sum(a for _, a in by_prompt.values())
+    return {
+        "enabled": COMPACTION, "slicing": SLICING, "file_tokens": estimate_tokens(code),
+        "tokens_before": before, "tokens_after": after, "saved_tokens": before - after,
+        "saved_pct": round(100 * (before - after) / before, 1) if before else 0.0,
+        "by_prompt": by_prompt,
+    }
+
+def precheck_node(state: Response) -> Dict[str, Any]:
+    """Runs before the fan-out: deterministic findings / not-applicable marks per guideline."""
+    # the review budget starts here, before static checks, chunking and slicing
+    started_at = _state_value(state, "started_at") or time.time()
+    code = _state_value(state, "code_snippet", "") or ""
+    static = run_static_checks(code)
+    if _scoped(state):
+        # static findings cover the whole file; only "not applicable" holds for a diff too
+        static = {g: v for g, v in static.items() if v.get("status") == "not_applicable"}
+    chunks = _code_chunks(state)
+    # a guideline with nothing in its slice (no try/catch for G05, ...) skips its call
+    static.update(empty_slices(code, chunks, static))
+    return {
+        "started_at": started_at,
+        "static_checks": static,
+        "compaction_report": _compaction_report(code, static, chunks),
+        "unit_cache_report": _unit_cache_report(code, static) if _use_units(state) else None,
+    }
+
+def _static_result(state: Response, guid_key: str, field_name: str) -> Optional[Dict[str, str]]:
+    decided = (_state_value(state, "static_checks") or {}).get(guid_key)
+    if decided and decided.get("content"):
+        return {field_name: decided["content"]}
+    return None
+
+def _scoped(state: Response) -> bool:
+    return bool(_state_value(state, "review_scope"))
+
+def _code_chunks(state: Response) -> List[Chunk]:
+    """The file's chunks, or only its changed regions for a diff-scoped review."""
+    code = _state_value(state, "code_snippet", "") or ""
+    scope = _state_value(state, "review_scope")
+    if scope:
+        return scope_chunks(code, scope, CHUNK_TOKEN_BUDGET)
+    return list(_chunks_for(code))
+
+def _chunk_labels(state: Response, chunks: List[Chunk], lines: bool = True) -> List[Optional[str]]:
+    if _scoped(state):
+        return [_chunk_label(c, len(chunks), "changed region", lines) for c in chunks]
+    if len(chunks) == 1:
+        return [None]
+    return [_chunk_label(c, len(chunks), lines=lines) for c in chunks]
+
+def _review_labels(state: Response, chunks: List[Chunk]) -> List[Optional[str]]:
+    # compacted code carries no file line numbers: a file range in the label would make the
+    # model cite file lines that _remap_raws then maps again as compact lines
+    return _chunk_labels(state, chunks, lines=not COMPACTION)
+
+def _compact_text(state: Response, chunk: Chunk, guid_ids: List[str]) -> str:
+    compacted = compact_source(chunk.text, policy_for(guid_ids))
+    scope = _state_value(state, "review_scope")
+    if scope:
+        return mark_changed(compacted.text, compacted.line_map, chunk.start_line, scope)
+    return compacted.text
+
+def _remap_raws(raws: List[str], chunks: List[Chunk], guid_ids: List[str]) -> List[str]:
+    """Line numbers cited against the compacted prompt code -> original file lines."""
+    policy = policy_for(guid_ids)
+    return [remap_line_refs(raw, compact_source(c.text, policy), c.start_line) for raw, c in zip(raws, chunks)]
+
+def _sliced_chunks(state: Response, guid_key: str) -> Tuple[List[Chunk], List[Optional[Chunk]]]:
+    """The review chunks, and each cut down to guid_key's slice (None: nothing to review there)."""
+    chunks = _code_chunks(state)
+    sliced = slice_chunks(_state_value(state, "code_snippet", "") or "", chunks, guid_key)
+    return chunks, (list(chunks) if sliced is None else sliced)
+
+def _guideline_prompts(state: Response, guid_key: str, chunks: List[Chunk],
+                       sliced: List[Optional[Chunk]]) -> List[str]:
+    """One prompt per chunk with a non-empty slice."""
     title, desc = GUIDES.get(guid_key, (guid_key, ""))
-    prompt = build_guideline_prompt(guid_key, title, desc, code_text)
-    resp = _safe_invoke(prompt)
-    content = _normalize_agent_text(resp.get("content", ""))
-    # ensure not too long
-    content = _ensure_short(content, MAX_AGENT_OUTPUT_CHARS)
+    return [build_guideline_prompt(guid_key, title, desc, _compact_text(state, s, [guid_key]),
+                                   chunk_label=label, scoped=_scoped(state), sliced=s.text != c.text)
+            for c, s, label in zip(chunks, sliced, _review_labels(state, chunks)) if s is not None]
+
+def _sliced_raws(guid_key: str, chunks: List[Chunk], sliced: List[Optional[Chunk]],
+                 replies: List[str]) -> List[str]:
+    """One remapped reply per chunk; chunks outside the slice were not sent and count as clean."""
+    it = iter(replies)
+    raws = [next(it, "") if s is not None else NO_FINDINGS for s in sliced]
+    return _remap_raws(raws, [s or c for s, c in zip(sliced, chunks)], [guid_key])
+
+def _is_failed(text: str) -> bool:
+    return not text.strip() or text.strip().lower().startswith("[llm-invoke-failed]")
+
+def _with_failures(out: Dict[str, Any], label: str, replies: List[str]) -> Dict[str, Any]:
+    """`out` plus a "degraded" mark for `label` when one of its calls failed or timed out."""
+    if any(r.strip().lower().startswith("[llm-invoke-failed]") for r in replies):
+        return dict(out, degraded=[label])
+    return out
+
+def _guideline_result(raws: List[str], chunks: List[Chunk], guid_key: str, field_name: str,
+                      scoped: bool = False) -> Dict[str, str]:
+    if len(raws) == 1 and not scoped:
+        content = _ensure_short(_normalize_agent_text(raws[0]), MAX_AGENT_OUTPUT_CHARS)
+    else:
+        # reduce per-chunk findings: drop clean/failed chunks, tag the rest with their line range
+        parts = []
+        for raw, chunk in zip(raws, chunks):
+            text = _normalize_agent_text(raw)
+            if _is_failed(text) or text.strip().upper().rstrip(".") == NO_FINDINGS:
+                continue
+            parts.append(f"[lines {chunk.start_line}-{chunk.end_line}]\n" + _ensure_short(text, MAX_AGENT_OUTPUT_CHARS))
+        content = _ensure_short("\n".join(parts), MAX_CHUNKED_AGENT_OUTPUT_CHARS)
     # If agent returned nothing, and strict mode is on, create a minimal best-practice suggestion stub
-    if APPLY_ALL_GUIDELINES and (not content.strip() or content.strip().lower().startswith("[llm-invoke-failed]")):
+    # (not for a diff-scoped review: a clean change has no findings)
+    if APPLY_ALL_GUIDELINES and not scoped and _is_failed(content):
         # minimal template for missing agent reply
         content = (
             "- Finding: Minimal suggestion\n"
@@ -165,6 +542,232 @@ def run_guideline_node_dict(state: Response, guid_key: str, field_name: str) ->
         )
     return {field_name: content}
 
+# -----------------------
+# Per-unit findings (FINDINGS_CACHE)
+# -----------------------
+def _use_units(state: Response) -> bool:
+    # diff-scoped reviews already send only the changed regions
+    return FINDINGS_CACHE_ENABLED and not _scoped(state)
+
+def _unit_key(unit: Unit, guid_key: str) -> str:
+    return make_key("unit-findings", FINDINGS_PROMPT_VERSION, guid_key, tier_for(guid_key).model, unit.digest)
+
+def _review_units(code: str, guid_key: str) -> List[Unit]:
+    """code_units() without the member bodies outside guid_key's slice (the declarations unit stays)."""
+    units = code_units(code)
+    lines = slice_lines(code, guid_key)
+    if lines is None:
+        return units
+    return [u for u in units
+            if u.kind == "declarations" or any(k in lines for k in range(u.chunk.start_line, u.chunk.end_line + 1))]
+
+def _unit_header(n: int, unit: Unit) -> str:
+    c = unit.chunk
+    what = f"{unit.kind} {unit.name}" if unit.name else "declarations (method bodies collapsed)"
+    # no file range when the unit's code is compacted (see _review_labels)
+    return f"U{n} | {what}" if COMPACTION else f"U{n} | {what}, lines {c.start_line}-{c.end_line}"
+
+def _unit_plan(state: Response, guid_key: str) -> Tuple[List[Unit], Dict[int, str], List[List[int]], List[str]]:
+    """(units, cached replies by unit index, batches of unit indexes to review, one prompt per batch)."""
+    units = _review_units(_state_value(state, "code_snippet", "") or "", guid_key)
+    cache = get_findings_cache()
+    cached = cache.get_many([_unit_key(u, guid_key) for u in units]) if cache is not None else {}
+    texts: Dict[int, str] = {}
+    todo: List[int] = []
+    seen = set()
+    for k, u in enumerate(units):
+        hit = cached.get(_unit_key(u, guid_key))
+        if hit is not None:
+            texts[k] = hit
+        elif u.digest not in seen:  # identical units in this file are reviewed once
+            seen.add(u.digest)
+            todo.append(k)
+    # pack the uncached units into prompts of about CHUNK_TOKEN_BUDGET code tokens / MAX_UNITS_PER_PROMPT units
+    batches: List[List[int]] = []
+    size = 0
+    for k in todo:
+        tokens = estimate_tokens(_compact_text(state, units[k].chunk, [guid_key]))
+        if not batches or size + tokens > CHUNK_TOKEN_BUDGET or len(batches[-1]) >= MAX_UNITS_PER_PROMPT:
+            batches.append([])
+            size = 0
+        batches[-1].append(k)
+        size += tokens
+    title, desc = GUIDES.get(guid_key, (guid_key, ""))
+    prompts = [
+        build_unit_prompt(guid_key, title, desc, [
+            (_unit_header(n, units[k]), _compact_text(state, units[k].chunk, [guid_key]))
+            for n, k in enumerate(batch, start=1)
+        ])
+        for batch in batches
+    ]
+    return units, texts, batches, prompts
+
+def _unit_max_tokens(batches: List[List[int]]) -> int:
+    return max([DEFAULT_MAX_TOKENS] + [UNIT_TOKENS * len(b) for b in batches])
+
+def _unit_result(units: List[Unit], texts: Dict[int, str], batches: List[List[int]], raws: List[str],
+                 guid_key: str, field_name: str) -> Dict[str, str]:
+    """Cache the fresh per-unit sections, then reduce all units like chunks of one file."""
+    fresh: Dict[str, str] = {}  # digest -> reply section
+    for batch, raw in zip(batches, raws):
+        sections = split_sections(raw, [f"U{n}" for n in range(1, len(batch) + 1)], r"U\d+")
+        for n, k in enumerate(batch, start=1):
+            if sections[f"U{n}"]:  # failed calls and skipped sections are not cached
+                fresh[units[k].digest] = sections[f"U{n}"]
+    cache = get_findings_cache()
+    if cache is not None and fresh:
+        by_digest = {u.digest: u for u in units}  # the key depends on the digest only
+        cache.put_many((_unit_key(by_digest[d], guid_key), text) for d, text in fresh.items())
+    replies = [texts.get(k) or fresh.get(u.digest, "") for k, u in enumerate(units)]
+    replies = ["" if r.strip().upper().rstrip(".") == NO_FINDINGS else r for r in replies]
+    chunks = [u.chunk for u in units]
+    return _guideline_result(_remap_raws(replies, chunks, [guid_key]), chunks, guid_key, field_name)
+
+def _unit_cache_report(code: str, static: Dict[str, Dict[str, str]]) -> Optional[Dict[str, Any]]:
+    """Per-unit cache hits expected for this review's single-guideline prompts."""
+    cache = get_findings_cache()
+    if cache is None:
+        return None
+    units = code_units(code)
+    grouped = {g for ids, _ in parse_guideline_groups() for g in ids}
+    decided = {g for g, v in (static or {}).items() if v.get("content")}
+    by_guideline = {}
+    for g in GUIDES:
+        if g in grouped or g in decided:
+            continue
+        keys = [_unit_key(u, g) for u in _review_units(code, g)]
+        found = cache.get_many(keys, count=False)
+        by_guideline[g] = [sum(1 for k in keys if k in found), len(keys)]
+    hits = sum(h for h, _ in by_guideline.values())
+    lookups = sum(n for _, n in by_guideline.values())
+    return {
+        "units": len(units), "distinct_units": len({u.digest for u in units}),
+        "lookups": lookups, "hits": hits, "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        "by_guideline": by_guideline,
+    }
+
+def run_guideline_node_dict(state: Response, guid_key: str, field_name: str) -> Dict[str, str]:
+    static = _static_result(state, guid_key, field_name)
+    if static is not None:
+        return static
+    if _use_units(state):
+        units, texts, batches, prompts = _unit_plan(state, guid_key)
+        resps = _invoke_many(prompts, _unit_max_tokens(batches), _deadline(state, "guidelines"), guid_key)
+        replies = [r.get("content", "") for r in resps]
+        return _with_failures(_unit_result(units, texts, batches, replies, guid_key, field_name), guid_key, replies)
+    chunks, sliced = _sliced_chunks(state, guid_key)
+    resps = _invoke_many(_guideline_prompts(state, guid_key, chunks, sliced),
+                         deadline=_deadline(state, "guidelines"), route=guid_key)
+    replies = [r.get("content", "") for r in resps]
+    raws = _sliced_raws(guid_key, chunks, sliced, replies)
+    return _with_failures(_guideline_result(raws, chunks, guid_key, field_name, _scoped(state)), guid_key, replies)
+
+async def arun_guideline_node_dict(state: Response, guid_key: str, field_name: str) -> Dict[str, str]:
+    static = _static_result(state, guid_key, field_name)
+    if static is not None:
+        return static
+    if _use_units(state):
+        units, texts, batches, prompts = _unit_plan(state, guid_key)
+        resps = await _ainvoke_many(prompts, _unit_max_tokens(batches), _deadline(state, "guidelines"), guid_key)
+        replies = [r.get("content", "") for r in resps]
+        return _with_failures(_unit_result(units, texts, batches, replies, guid_key, field_name), guid_key, replies)
+    chunks, sliced = _sliced_chunks(state, guid_key)
+    resps = await _ainvoke_many(_guideline_prompts(state, guid_key, chunks, sliced),
+                                deadline=_deadline(state, "guidelines"), route=guid_key)
+    replies = [r.get("content", "") for r in resps]
+    raws = _sliced_raws(guid_key, chunks, sliced, replies)
+    return _with_failures(_guideline_result(raws, chunks, guid_key, field_name, _scoped(state)), guid_key, replies)
+
+def parse_guideline_groups(spec: str = GUIDELINE_GROUPS) -> List[Tuple[List[str], int]]:
+    """GUIDELINE_GROUPS -> [(guid_ids, max_tokens)] for every group of 2+ guidelines."""
+    if not spec:
+        return []
+    if spec.lower() == "all":
+        spec = ",".join(GUIDES)
+    groups, seen = [], set()
+    for part in spec.split(";"):
+        ids_part, _, tokens_part = part.partition(":")
+        ids = []
+        for g in ids_part.split(","):
+            g = g.strip().upper()
+            if g in GUIDES and g not in seen:
+                ids.append(g)
+                seen.add(g)
+        if len(ids) < 2:
+            seen.difference_update(ids)  # a one-guideline "group" is just the normal node
+            continue
+        max_tokens = int(tokens_part) if tokens_part.strip().isdigit() else GROUP_TOKENS_PER_GUIDELINE * len(ids)
+        groups.append((ids, max_tokens))
+    return groups
+
+def _field_for(guid_key: str) -> str:
+    return f"guideline_{int(guid_key[1:])}"
+
+def _group_plan(state: Response, guid_ids: List[str]):
+    """(static results, ids still needing the LLM, prompts) for a group node."""
+    out: Dict[str, str] = {}
+    pending = []
+    for g in guid_ids:
+        static = _static_result(state, g, _field_for(g))
+        if static is not None:
+            out.update(static)
+        else:
+            pending.append(g)
+    prompts: List[str] = []
+    if pending:
+        chunks = _code_chunks(state)
+        prompts = [build_group_prompt(pending, _compact_text(state, c, pending), chunk_label=label, scoped=_scoped(state))
+                   for c, label in zip(chunks, _review_labels(state, chunks))]
+    return out, pending, prompts
+
+def _group_result(state: Response, out: Dict[str, str], pending: List[str], raws: List[str]) -> Dict[str, str]:
+    chunks = _code_chunks(state)
+    per_chunk = [split_group_response(raw, pending) for raw in _remap_raws(raws, chunks, pending)]
+    for g in pending:
+        out.update(_guideline_result([sections[g] for sections in per_chunk], chunks, g, _field_for(g), _scoped(state)))
+    return out
+
+def run_group_node_dict(state: Response, guid_ids: List[str], max_tokens: int) -> Dict[str, str]:
+    out, pending, prompts = _group_plan(state, guid_ids)
+    if not prompts:
+        return out
+    resps = _invoke_many(prompts, max_tokens, _deadline(state, "guidelines"), "+".join(pending))
+    replies = [r.get("content", "") for r in resps]
+    return _with_failures(_group_result(state, out, pending, replies), "+".join(pending), replies)
+
+async def arun_group_node_dict(state: Response, guid_ids: List[str], max_tokens: int) -> Dict[str, str]:
+    out, pending, prompts = _group_plan(state, guid_ids)
+    if not prompts:
+        return out
+    resps = await _ainvoke_many(prompts, max_tokens, _deadline(state, "guidelines"), "+".join(pending))
+    replies = [r.get("content", "") for r in resps]
+    return _with_failures(_group_result(state, out, pending, replies), "+".join(pending), replies)
+
+def _make_group_node(guid_ids: List[str], max_tokens: int, async_nodes: bool):
+    if async_nodes:
+        async def node(state: Response):
+            return await arun_group_node_dict(state, guid_ids, max_tokens)
+    else:
+        def node(state: Response):
+            return run_group_node_dict(state, guid_ids, max_tokens)
+    node.__name__ = "group_" + "_".join(g.lower() for g in guid_ids) + "_node"
+    return node
+
+def guideline_nodes(async_nodes: bool = False) -> List[Tuple[str, object]]:
+    """(node name, callable) for the fan-out, honouring GUIDELINE_GROUPS."""
+    singles = ASYNC_GUIDE_NODES if async_nodes else SYNC_GUIDE_NODES
+    groups = parse_guideline_groups()
+    grouped = {g for ids, _ in groups for g in ids}
+    nodes = [
+        (f"guide{i}_node", fn)
+        for i, fn in enumerate(singles, start=1)
+        if f"G{str(i).zfill(2)}" not in grouped
+    ]
+    for ids, max_tokens in groups:
+        fn = _make_group_node(ids, max_tokens, async_nodes)
+        nodes.append((fn.__name__, fn))
+    return nodes
+
 # wrapper helpers
 def guide1_node(state: Response): return run_guideline_node_dict(state, "G01", "guideline_1")
 def guide2_node(state: Response): return run_guideline_node_dict(state, "G02", "guideline_2")
@@ -177,30 +780,62 @@ def guide8_node(state: Response): return run_guideline_node_dict(state, "G08", "
 def guide9_node(state: Response): return run_guideline_node_dict(state, "G09", "guideline_9")
 def guide10_node(state: Response): return run_guideline_node_dict(state, "G10", "guideline_10")
 
-def llm_node(state: Response) -> Dict[str, str]:
-    # gather agent outputs
-    parts = []
+async def aguide1_node(state: Response): return await arun_guideline_node_dict(state, "G01", "guideline_1")
+async def aguide2_node(state: Response): return await arun_guideline_node_dict(state, "G02", "guideline_2")
+async def aguide3_node(state: Response): return await arun_guideline_node_dict(state, "G03", "guideline_3")
+async def aguide4_node(state: Response): return await arun_guideline_node_dict(state, "G04", "guideline_4")
+async def aguide5_node(state: Response): return await arun_guideline_node_dict(state, "G05", "guideline_5")
+async def aguide6_node(state: Response): return await arun_guideline_node_dict(state, "G06", "guideline_6")
+async def aguide7_node(state: Response): return await arun_guideline_node_dict(state, "G07", "guideline_7")
+async def aguide8_node(state: Response): return await arun_guideline_node_dict(state, "G08", "guideline_8")
+async def aguide9_node(state: Response): return await arun_guideline_node_dict(state, "G09", "guideline_9")
+async def aguide10_node(state: Response): return await arun_guideline_node_dict(state, "G10", "guideline_10")
+
+SYNC_GUIDE_NODES = [
+    guide1_node, guide2_node, guide3_node, guide4_node, guide5_node,
+    guide6_node, guide7_node, guide8_node, guide9_node, guide10_node,
+]
+ASYNC_GUIDE_NODES = [
+    aguide1_node, aguide2_node, aguide3_node, aguide4_node, aguide5_node,
+    aguide6_node, aguide7_node, aguide8_node, aguide9_node, aguide10_node,
+]
+
+def collect_findings(state: Response) -> Tuple[Dict[str, List[Finding]], Dict[str, str]]:
+    """
+    Parse every guideline_N into Finding records, fold duplicates across guidelines and
+    rank them. Returns ({Gxx: ranked findings}, {Gxx: raw text that did not parse}).
+    """
+    parsed: List[Finding] = []
+    raw: Dict[str, str] = {}
     for i in range(1, 11):
-        key = f"guideline_{i}"
-        val = None
-        if isinstance(state, dict):
-            val = state.get(key)
-        else:
-            val = getattr(state, key, None)
-        if not val:
-            # add empty placeholder if strict mode
-            if APPLY_ALL_GUIDELINES:
-                parts.append(f"GUIDELINE_{i}:\n- Finding: Minimal suggestion\n- Area: approximate\n- Severity: Low\n- Confidence: 3\n- Issue: no agent output\n- Fix: apply guideline G{str(i).zfill(2)} best-practice.\n")
+        gid = f"G{str(i).zfill(2)}"
+        val = _state_value(state, f"guideline_{i}") or ""
+        if _is_failed(val):
             continue
-        # skip exact noop? No — in strict mode we still want a fix. If agent replied exact noop, create minimal suggestion
-        if APPLY_ALL_GUIDELINES and val.strip() == "code is fine for that guideline":
-            parts.append(f"GUIDELINE_{i}:\n- Finding: Best-practice suggestion\n- Area: approximate\n- Severity: Low\n- Confidence: 4\n- Issue: agent indicated code is fine; propose best-practice change.\n- Fix: apply guideline G{str(i).zfill(2)} minimal change.\n")
-            continue
-        parts.append(f"GUIDELINE_{i}:\n{val.strip()}\n")
-    agent_texts = "\n".join(parts)
-    prompt = build_merge_prompt(agent_texts)
-    resp = _safe_invoke(prompt)
-    merged = _ensure_short(resp.get("content", ""), MAX_MERGE_OUTPUT_CHARS)
+        found = parse_findings(val, gid)
+        if found:
+            parsed.extend(found)
+        else:
+            raw[gid] = _ensure_short(val.strip(), MAX_AGENT_OUTPUT_CHARS)
+    return group_by_guideline(dedupe_findings(parsed), GUIDES, MAX_FINDINGS), raw
+
+def _merge_findings(state: Response) -> Tuple[Dict[str, List[Finding]], Dict[str, str]]:
+    """collect_findings; a diff-scoped review keeps only guidelines with something to report."""
+    by_guideline, raw = collect_findings(state)
+    if _scoped(state):
+        by_guideline = {g: items for g, items in by_guideline.items()
+                        if g in raw or any(not f.filler for f in items)}
+    return by_guideline, raw
+
+def _merge_prompt(state: Response) -> str:
+    by_guideline, raw = _merge_findings(state)
+    titles = {g: spec[0] for g, spec in GUIDES.items()}
+    return build_merge_prompt(render_compact(by_guideline, titles, raw), scoped=_scoped(state))
+
+def _merge_result(raw: str, scoped: bool = False) -> Dict[str, str]:
+    merged = _ensure_short(raw, MAX_MERGE_OUTPUT_CHARS)
+    if scoped:
+        return {"merge_guide_res": merged}
     # If the integrator failed to include all Gxx items (safety), add stubs
     missing = []
     for i in range(1, 11):
@@ -223,21 +858,42 @@ def llm_node(state: Response) -> Dict[str, str]:
         merged = merged + "\n\n" + "\n".join(stubs)
     return {"merge_guide_res": merged}
 
-def final_updated_node(state: Response) -> Dict[str, str]:
-    code_text = getattr(state, "code_snippet", "") or ""
-    merged = None
-    if isinstance(state, dict):
-        merged = state.get("merge_guide_res", "")
-    else:
-        merged = getattr(state, "merge_guide_res", "") or ""
-    if not merged:
-        return {"final_updated_code": code_text or "No original code provided."}
+def _local_merge(state: Response) -> Optional[Dict[str, str]]:
+    """MERGE_MODE=local: deterministic merge, or None to use the integrator LLM."""
+    by_guideline, raw = _merge_findings(state)
+    if _scoped(state) and not by_guideline:
+        return {"merge_guide_res": ""}  # nothing on the changed lines: no merge, no final transform
+    if MERGE_MODE != "local":
+        return None
+    if raw:  # some agent ignored the template; let the integrator read it
+        return None
+    titles = {g: spec[0] for g, spec in GUIDES.items()}
+    return _merge_result(render_merge(by_guideline, titles), _scoped(state))
 
-    # final transformer prompt requires applying ALL guidelines present in merged suggestions
-    prompt = build_final_transform_prompt(merged, code_text)
-    resp = _safe_invoke(prompt)
-    updated = resp.get("content", "")
+def _merge_or_fallback(state: Response, raw: str) -> Dict[str, str]:
+    """Integrator reply, or (call failed / deadline) the local merge of whatever parsed."""
+    if _is_failed(raw):
+        by_guideline, _ = _merge_findings(state)
+        return _merge_result(render_merge(by_guideline, {g: spec[0] for g, spec in GUIDES.items()}), _scoped(state))
+    return _merge_result(raw, _scoped(state))
 
+def llm_node(state: Response) -> Dict[str, str]:
+    local = _local_merge(state)
+    if local is not None:
+        return local
+    resp = _safe_invoke(_merge_prompt(state), deadline=_deadline(state, "merge"), route="merge")
+    raw = resp.get("content", "")
+    return _with_failures(_merge_or_fallback(state, raw), "merge", [raw])
+
+async def allm_node(state: Response) -> Dict[str, str]:
+    local = _local_merge(state)
+    if local is not None:
+        return local
+    resp = await _safe_ainvoke(_merge_prompt(state), deadline=_deadline(state, "merge"), route="merge")
+    raw = resp.get("content", "")
+    return _with_failures(_merge_or_fallback(state, raw), "merge", [raw])
+
+def _final_result(updated: str, merged: str) -> Dict[str, str]:
     # Safety heuristics: ensure header lists applied guidelines. If absent, try to infer and add header.
     header_match = re.search(r"/\*\s*Applied\s*:\s*([A-Za-z0-9, ]+)\s*\*/", updated)
     if not header_match:
@@ -250,23 +906,92 @@ def final_updated_node(state: Response) -> Dict[str, str]:
 
     return {"final_updated_code": updated}
 
-# -----------------------
-# Optional helper: quick sanitizer that extracts only structured fields from agent outputs
-# (useful if agent verbosity breaks merging)
-# -----------------------
-def extract_structured(agent_text: str) -> str:
-    if not agent_text:
-        return ""
-    lines = agent_text.splitlines()
-    keep = []
-    for ln in lines:
-        if re.match(r"^\s*-\s*(Finding|Area|Severity|Confidence|Issue|Fix|Patch|Title|Trigger|Change|Rationale)\b", ln, re.I):
-            keep.append(ln)
-        elif ln.strip().startswith("```java") or ln.strip().endswith("```"):
-            keep.append(ln)
-        # keep short code-like lines
-        elif re.match(r"^\s*(public |private |protected |package |import |class |interface )", ln):
-            keep.append(ln)
-    return "\n".join(keep)
+def _final_prompts(state: Response, merged: str) -> List[str]:
+    build = build_final_diff_prompt if FINAL_MODE == "diff" else build_final_transform_prompt
+    chunks = _code_chunks(state)
+    # without a label the final transformer prompt requires applying ALL guidelines in merged suggestions
+    return [build(merged, c.text, chunk_label=label) for c, label in zip(chunks, _chunk_labels(state, chunks))]
+
+def _chunk_rewrites(raws: List[str], chunks: List[Chunk]) -> List[str]:
+    """Per-chunk rewrites; a chunk whose call failed keeps its original text."""
+    out = []
+    for raw, chunk in zip(raws, chunks):
+        text = _strip_code_fences(raw)
+        if _is_failed(text):
+            text = chunk.text
+        text = re.sub(r"^\s*/\*\s*Applied\s*:[^*]*\*/\s*\n", "", text)
+        if chunk.text.endswith("\n") and not text.endswith("\n"):
+            text += "\n"
+        out.append(text)
+    return out
+
+def _reassemble(raws: List[str], chunks: List[Chunk]) -> str:
+    """Join per-chunk rewrites back into the file."""
+    return "".join(_chunk_rewrites(raws, chunks))
+
+def _patch_chunks(raws: List[str], chunks: List[Chunk]) -> Tuple[List[str], Dict[str, Any]]:
+    """FINAL_MODE=diff: patch each chunk with its diff; failed/unusable replies keep the original."""
+    report: Dict[str, Any] = {"mode": "diff", "hunks": 0, "applied": 0, "fuzzy": 0, "rejected": []}
+    out = []
+    for raw, chunk in zip(raws, chunks):
+        where = f"lines {chunk.start_line}-{chunk.end_line}" if len(chunks) > 1 else "file"
+        if _is_failed(raw) or not looks_like_diff(raw):
+            reason = "call failed" if _is_failed(raw) else "reply contained no diff hunks"
+            report["rejected"].append({"chunk": where, "hunk": 0, "header": "", "reason": reason})
+            out.append(chunk.text)
+            continue
+        patched, rep = apply_patch(chunk.text, raw)
+        for key in ("hunks", "applied", "fuzzy"):
+            report[key] += rep[key]
+        report["rejected"].extend(dict(r, chunk=where) for r in rep["rejected"])
+        out.append(patched)
+    return out, report
+
+def _apply_diffs(raws: List[str], chunks: List[Chunk]) -> Tuple[str, Dict[str, Any]]:
+    texts, report = _patch_chunks(raws, chunks)
+    return "".join(texts), report
+
+def _scoped_final(state: Response, raws: List[str], chunks: List[Chunk]) -> Dict[str, Any]:
+    """Diff-scoped review: splice the rewritten regions back and keep only edits on changed lines."""
+    code = _state_value(state, "code_snippet", "") or ""
+    if FINAL_MODE == "diff":
+        texts, report = _patch_chunks(raws, chunks)
+    else:
+        texts, report = _chunk_rewrites(raws, chunks), {"mode": "full"}
+    updated, edits = restrict_edits(code, splice(code, chunks, texts), _state_value(state, "review_scope"))
+    return {"final_updated_code": updated, "final_patch_report": dict(report, scope=dict(edits, regions=len(chunks)))}
+
+def _final_from_raws(state: Response, raws: List[str], merged: str) -> Dict[str, Any]:
+    chunks = _code_chunks(state)
+    if _scoped(state):
+        return _scoped_final(state, raws, chunks)
+    if FINAL_MODE == "diff":
+        updated, report = _apply_diffs(raws, chunks)
+        return dict(_final_result(updated, merged), final_patch_report=report)
+    if len(raws) == 1 and _is_failed(raws[0]):
+        # failed / timed out: keep the original code rather than the error text
+        return {"final_updated_code": chunks[0].text}
+    updated = raws[0] if len(raws) == 1 else _reassemble(raws, chunks)
+    return _final_result(updated, merged)
+
+def final_updated_node(state: Response) -> Dict[str, Any]:
+    code_text = _state_value(state, "code_snippet", "") or ""
+    merged = _state_value(state, "merge_guide_res", "") or ""
+    if not merged:
+        return {"final_updated_code": code_text or "No original code provided."}
+
+    resps = _invoke_many(_final_prompts(state, merged), deadline=_deadline(state, "final"), route="final")
+    raws = [r.get("content", "") for r in resps]
+    return _with_failures(_final_from_raws(state, raws, merged), "final", raws)
+
+async def afinal_updated_node(state: Response) -> Dict[str, Any]:
+    code_text = _state_value(state, "code_snippet", "") or ""
+    merged = _state_value(state, "merge_guide_res", "") or ""
+    if not merged:
+        return {"final_updated_code": code_text or "No original code provided."}
+
+    resps = await _ainvoke_many(_final_prompts(state, merged), deadline=_deadline(state, "final"), route="final")
+    raws = [r.get("content", "") for r in resps]
+    return _with_failures(_final_from_raws(state, raws, merged), "final", raws)
 
 # End of file
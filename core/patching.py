@@ -0,0 +1,190 @@
+# core/patching.py
+"""
+Apply LLM-written unified diffs to the original source (FINAL_MODE=diff).
+
+Models get hunk line numbers and counts wrong far more often than the context
+lines themselves, so hunks are located by content: exact match nearest the
+claimed position first, then whitespace-insensitive, then with up to MAX_FUZZ
+context lines dropped at each end (like `patch --fuzz`). Each hunk is placed on
+its own, then all are applied in file order; hunks that cannot be placed, or that
+overlap another one, are rejected and reported instead of failing the whole patch.
+"""
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+MAX_FUZZ = 2  # context lines that may be dropped from each end of a hunk
+
+_HUNK_RE = re.compile(r"^@@+\s*(?:-(\d+)(?:,(\d+))?)?\s*(?:\+(\d+)(?:,(\d+))?)?\s*@@+")
+
+
+@dataclass
+class Hunk:
+    header: str
+    old_start: Optional[int] = None                        # 1-based, None if the header had no numbers
+    lines: List[Tuple[str, str]] = field(default_factory=list)  # (' ' | '-' | '+', text)
+
+    @property
+    def changes(self) -> bool:
+        return any(op != " " for op, _ in self.lines)
+
+
+def _strip_fences(text: str) -> str:
+    text = (text or "").strip("\n")
+    text = re.sub(r"^\s*```[a-zA-Z]*\s*\n", "", text)
+    return re.sub(r"\n\s*```\s*$", "", text)
+
+
+def parse_unified_diff(text: str) -> List[Hunk]:
+    """Hunks from a unified diff; file headers, 'diff'/'index' lines and '\\ No newline' are ignored."""
+    hunks: List[Hunk] = []
+    cur: Optional[Hunk] = None
+    lines = _strip_fences(text).splitlines()
+    for k, ln in enumerate(lines):
+        m = _HUNK_RE.match(ln)
+        if m:
+            cur = Hunk(header=ln.strip(), old_start=int(m.group(1)) if m.group(1) else None)
+            hunks.append(cur)
+            continue
+        nxt = lines[k + 1] if k + 1 < len(lines) else ""
+        if ln.startswith("--- ") and nxt.startswith("+++ "):
+            cur = None  # file header (also starts a new file section)
+            continue
+        if cur is None:
+            continue
+        if ln.startswith("\\"):
+            continue
+        if ln[:1] in ("+", "-", " "):
+            cur.lines.append((ln[0], ln[1:]))
+        else:  # models often drop the leading space of context (and blank) lines
+            cur.lines.append((" ", ln))
+    return [h for h in hunks if h.changes]
+
+
+# -----------------------
+# Locating hunks
+# -----------------------
+def _loose(line: str) -> str:
+    return re.sub(r"\s+", "", line)
+
+
+def _trimmed(hunk: Hunk, fuzz: int) -> Optional[List[Tuple[str, str]]]:
+    """Hunk lines minus up to `fuzz` leading/trailing context lines (None if nothing to trim)."""
+    lines = list(hunk.lines)
+    lead = trail = 0
+    while lead < fuzz and lines and lines[0][0] == " ":
+        lines.pop(0)
+        lead += 1
+    while trail < fuzz and lines and lines[-1][0] == " ":
+        lines.pop()
+        trail += 1
+    if fuzz and not lead and not trail:
+        return None
+    return lines
+
+
+def _matches(src: List[str], pos: int, before: List[str], loose: bool) -> bool:
+    if pos < 0 or pos + len(before) > len(src):
+        return False
+    if loose:
+        return all(_loose(src[pos + i]) == _loose(b) for i, b in enumerate(before))
+    return all(src[pos + i].rstrip() == b.rstrip() for i, b in enumerate(before))
+
+
+class _Locator:
+    def __init__(self, src: List[str]):
+        self.src = src
+        self.index: Dict[str, List[int]] = {}
+        for i, ln in enumerate(src):
+            key = _loose(ln)
+            if key:
+                self.index.setdefault(key, []).append(i)
+
+    def find(self, before: List[str], expected: int) -> Optional[Tuple[int, bool]]:
+        """(position, loose) of `before` nearest to `expected`."""
+        anchor = next((k for k, b in enumerate(before) if _loose(b)), None)
+        if anchor is None:
+            return None  # only blank lines: too ambiguous to place
+        starts = [p - anchor for p in self.index.get(_loose(before[anchor]), []) if p >= anchor]
+        starts.sort(key=lambda p: abs(p - expected))
+        for loose in (False, True):
+            for pos in starts:
+                if _matches(self.src, pos, before, loose):
+                    return pos, loose
+        return None
+
+
+# -----------------------
+# Applying
+# -----------------------
+def _place(hunk: Hunk, src: List[str], locator: _Locator) -> Optional[Tuple[int, List[Tuple[str, str]], bool, int]]:
+    """(position, lines, loose, fuzz) of one hunk in the original source, or None."""
+    # old-side line numbers refer to the original source, which is what we search
+    expected = hunk.old_start - 1 if hunk.old_start else 0
+    for fuzz in range(MAX_FUZZ + 1):
+        lines = _trimmed(hunk, fuzz)
+        if lines is None:
+            continue
+        before = [t for op, t in lines if op != "+"]
+        if not before:  # pure insertion without context: trust the line number
+            if fuzz == 0 and hunk.old_start is not None and 0 <= hunk.old_start <= len(src):
+                return hunk.old_start, lines, False, fuzz
+            return None
+        found = locator.find(before, expected)
+        if found:
+            return found[0], lines, found[1], fuzz
+    return None
+
+
+def apply_patch(source: str, diff_text: str) -> Tuple[str, Dict[str, Any]]:
+    """
+    Apply every hunk that can be placed. Returns (patched_source, report) where report is
+    {"hunks", "applied", "fuzzy", "rejected": [{"hunk", "header", "reason"}]}.
+    Hunks are placed first and applied in file order, whatever order the reply lists them in.
+    The source's line ending (LF or CRLF) is kept.
+    """
+    hunks = parse_unified_diff(diff_text)
+    report: Dict[str, Any] = {"hunks": len(hunks), "applied": 0, "fuzzy": 0, "rejected": []}
+    newline = "\r\n" if "\r\n" in source else "\n"
+    src = source.splitlines()
+    locator = _Locator(src)
+    placed = []
+    for n, hunk in enumerate(hunks, 1):
+        found = _place(hunk, src, locator)
+        if found is None:
+            report["rejected"].append({"hunk": n, "header": hunk.header,
+                                       "reason": "context/removed lines not found in the source"})
+        else:
+            placed.append((found[0], n, hunk, found))
+    out: List[str] = []
+    cursor = 0  # src lines before this index are already emitted
+    for pos, n, hunk, (_, lines, loose, fuzz) in sorted(placed, key=lambda p: (p[0], p[1])):
+        if pos < cursor:
+            report["rejected"].append({"hunk": n, "header": hunk.header,
+                                       "reason": "overlaps another hunk"})
+            continue
+        out.extend(src[cursor:pos])
+        # keep the source's own text for context lines (the model may have re-indented them)
+        k = pos
+        for op, text in lines:
+            if op == " ":
+                out.append(src[k])
+                k += 1
+            elif op == "-":
+                k += 1
+            else:
+                out.append(text.rstrip("\r"))
+        cursor = k
+        report["applied"] += 1
+        if loose or fuzz:
+            report["fuzzy"] += 1
+    out.extend(src[cursor:])
+    report["rejected"].sort(key=lambda r: r["hunk"])
+    patched = newline.join(out)
+    if source.endswith(("\n", "\r")) and out:
+        patched += newline
+    return patched, report
+
+
+def looks_like_diff(text: str) -> bool:
+    return bool(re.search(r"^@@", _strip_fences(text), re.M))
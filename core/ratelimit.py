@@ -0,0 +1,282 @@
+# core/ratelimit.py
+import asyncio
+import email.utils
+import os
+import random
+import re
+import threading
+import time
+import weakref
+from typing import Any, Dict, Optional
+
+# -----------------------
+# CONFIG — provider budget (defaults: Groq free tier for llama-3.3-70b-versatile)
+# -----------------------
+LLM_RPM = float(os.getenv("LLM_RPM", "30"))        # requests per minute, 0 = unlimited
+LLM_TPM = float(os.getenv("LLM_TPM", "12000"))     # tokens per minute (prompt + completion), 0 = unlimited
+# share of max_tokens booked for the completion until the call reports its real usage
+LLM_EXPECTED_OUTPUT = float(os.getenv("LLM_EXPECTED_OUTPUT", "0.5"))
+LLM_MIN_CONCURRENCY = int(os.getenv("LLM_MIN_CONCURRENCY", "1"))
+LLM_ADAPTIVE_MAX = int(os.getenv("LLM_ADAPTIVE_MAX", os.getenv("LLM_MAX_CONCURRENCY", "8")))
+RETRY_BACKOFF = float(os.getenv("LLM_BACKOFF", "1.0"))
+RETRY_MAX_WAIT = float(os.getenv("LLM_MAX_BACKOFF", "60"))
+
+CHARS_PER_TOKEN = 4  # rough estimate for English + code
+
+
+def estimate_tokens(prompt: str, max_tokens: int = 0) -> int:
+    """Tokens booked for one call: prompt estimate plus the expected share of max_tokens."""
+    expected = max(0, int(max_tokens or 0)) * min(1.0, max(0.0, LLM_EXPECTED_OUTPUT))
+    return len(prompt or "") // CHARS_PER_TOKEN + 1 + int(expected)
+
+
+# -----------------------
+# Retry hints
+# -----------------------
+_DURATION_RE = re.compile(r"(?:(\d+(?:\.\d+)?)h)?(?:(\d+(?:\.\d+)?)m(?!s))?(?:(\d+(?:\.\d+)?)s)?(?:(\d+(?:\.\d+)?)ms)?$")
+_TRY_AGAIN_RE = re.compile(r"try again in\s+([0-9hms.]+)", re.I)
+
+
+def _parse_duration(value: str) -> Optional[float]:
+    """Parse '7', '7.5s', '1m30.5s', '120ms' style durations into seconds."""
+    value = (value or "").strip()
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    m = _DURATION_RE.match(value)
+    if not m or not any(m.groups()):
+        return None
+    h, mi, s, ms = (float(g) if g else 0.0 for g in m.groups())
+    return h * 3600 + mi * 60 + s + ms / 1000
+
+
+def _status_code(exc: BaseException) -> Optional[int]:
+    for obj in (exc, getattr(exc, "response", None)):
+        code = getattr(obj, "status_code", None)
+        if isinstance(code, int):
+            return code
+    return None
+
+
+def is_rate_limited(exc: BaseException) -> bool:
+    if _status_code(exc) == 429:
+        return True
+    text = str(exc).lower()
+    return "rate limit" in text or "rate_limit" in text or "429" in text
+
+
+def retry_after(exc: BaseException) -> Optional[float]:
+    """Server retry hint (seconds) from headers or the error message, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        value = headers.get("retry-after")
+    except Exception:
+        value = None
+    if value:
+        secs = _parse_duration(value)
+        if secs is None:  # HTTP-date form
+            try:
+                secs = max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except Exception:
+                secs = None
+        if secs is not None:
+            return secs
+    hints = []
+    for name in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"):
+        try:
+            secs = _parse_duration(headers.get(name) or "")
+        except Exception:
+            secs = None
+        if secs is not None:
+            hints.append(secs)
+    if hints and is_rate_limited(exc):
+        return max(hints)
+    m = _TRY_AGAIN_RE.search(str(exc))
+    if m:
+        return _parse_duration(m.group(1).rstrip("."))
+    return None
+
+
+# -----------------------
+# Token buckets
+# -----------------------
+class TokenBucket:
+    """
+    Reservation-style bucket refilled at `per_minute / 60` units per second.
+    reserve() never blocks: it books the units (the balance may go negative) and
+    returns how long the caller must wait, so queued callers are served in order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = per_minute
+        self.balance = per_minute
+        self.updated = time.monotonic()
+
+    def reserve(self, units: float, now: float) -> float:
+        if self.rate <= 0:
+            return 0.0
+        self.balance = min(self.capacity, self.balance + (now - self.updated) * self.rate)
+        self.updated = now
+        self.balance -= min(units, self.capacity)
+        return 0.0 if self.balance >= 0 else -self.balance / self.rate
+
+    def refund(self, units: float) -> None:
+        """Give back over-booked units (negative: charge more)."""
+        if self.rate > 0:
+            self.balance = min(self.capacity, self.balance + units)
+
+    def drain(self, now: float) -> None:
+        """Empty the bucket (after a 429 the provider's view is that we are at the limit)."""
+        self.balance = min(self.balance, 0.0)
+        self.updated = now
+
+
+# -----------------------
+# Limiter
+# -----------------------
+class RateLimiter:
+    """
+    Process-wide limiter shared by every invoke/ainvoke:
+      * requests/min and tokens/min token buckets,
+      * a global pause honouring server retry hints after a 429,
+      * AIMD adaptive concurrency: +1 slot per `limit` successes, halve on 429.
+    """
+
+    def __init__(self, rpm: float = LLM_RPM, tpm: float = LLM_TPM,
+                 min_concurrency: int = LLM_MIN_CONCURRENCY, max_concurrency: int = LLM_ADAPTIVE_MAX):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.min_concurrency = max(1, min_concurrency)
+        self.max_concurrency = max(self.min_concurrency, max_concurrency)
+        self.limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._cond = threading.Condition()
+        # async waiters: one event per event loop, set (thread-safely) whenever a slot frees up
+        self._loop_events: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Event]" = \
+            weakref.WeakKeyDictionary()
+
+    # --- admission
+    def _try_admit(self) -> bool:
+        if time.monotonic() < self.paused_until or self.in_flight >= int(self.limit):
+            return False
+        self.in_flight += 1
+        return True
+
+    def _book(self, est_tokens: int) -> float:
+        now = time.monotonic()
+        return max(self.requests.reserve(1, now), self.tokens.reserve(est_tokens, now))
+
+    def acquire(self, est_tokens: int) -> float:
+        """Block until a slot and budget are available; returns seconds spent queued."""
+        start = time.monotonic()
+        with self._cond:
+            while not self._try_admit():
+                self._cond.wait(timeout=max(0.01, min(1.0, self.paused_until - time.monotonic())))
+            wait = self._book(est_tokens)
+        if wait > 0:
+            time.sleep(wait + random.uniform(0, 0.05 * wait))
+        return time.monotonic() - start
+
+    async def aacquire(self, est_tokens: int) -> float:
+        """acquire() for coroutines: waits on a per-loop event instead of blocking the thread."""
+        start = time.monotonic()
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._cond:
+                if self._try_admit():
+                    wait = self._book(est_tokens)
+                    break
+                event = self._loop_events.get(loop)
+                if event is None:
+                    event = self._loop_events[loop] = asyncio.Event()
+                event.clear()  # under the lock: a release() after this check sets it again
+                paused = self.paused_until - time.monotonic()
+            try:
+                # woken by release(); a pause ends without one, so wake up when it does
+                await asyncio.wait_for(event.wait(), timeout=paused if paused > 0 else None)
+            except asyncio.TimeoutError:
+                pass
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait + random.uniform(0, 0.05 * wait))
+            except BaseException:  # cancelled while queued: give the slot back
+                self.release(success=False)
+                raise
+        return time.monotonic() - start
+
+    # --- feedback
+    def release(self, exc: Optional[BaseException] = None, success: bool = True,
+                booked: int = 0, used: int = 0) -> None:
+        """
+        Return a slot; exc is the call's error (429s shrink the window), success=False is neutral.
+        used is the call's real token usage: the difference to the `booked` estimate is settled
+        (0 = unknown, the estimate stands).
+        """
+        with self._cond:
+            self.in_flight = max(0, self.in_flight - 1)
+            if booked and used:
+                cap = self.tokens.capacity
+                self.tokens.refund(min(booked, cap) - min(used, cap))
+            if exc is not None and is_rate_limited(exc):
+                # multiplicative decrease + global pause for the server's hint
+                self.limit = max(float(self.min_concurrency), self.limit / 2)
+                self._successes = 0
+                hint = retry_after(exc)
+                now = time.monotonic()
+                if hint:
+                    self.paused_until = max(self.paused_until, now + min(hint, RETRY_MAX_WAIT))
+                self.requests.drain(now)
+                self.tokens.drain(now)
+            elif exc is None and success:
+                # additive increase: one more slot after a full window of successes
+                self._successes += 1
+                if self._successes >= int(self.limit):
+                    self._successes = 0
+                    self.limit = min(float(self.max_concurrency), self.limit + 1)
+            self._cond.notify_all()
+            for loop, event in list(self._loop_events.items()):
+                if not loop.is_closed():
+                    loop.call_soon_threadsafe(event.set)
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        """Retry delay: server hint if given, else full-jitter exponential backoff."""
+        hint = retry_after(exc)
+        if hint is not None:
+            # spread callers over a short window so they don't all return at once
+            return min(RETRY_MAX_WAIT, hint + random.uniform(0, max(0.5, 0.25 * hint)))
+        return random.uniform(0, min(RETRY_MAX_WAIT, RETRY_BACKOFF * (2 ** attempt)))
+
+    def snapshot(self) -> dict:
+        with self._cond:
+            return {
+                "concurrency_limit": int(self.limit),
+                "in_flight": self.in_flight,
+                "paused_for_s": round(max(0.0, self.paused_until - time.monotonic()), 3),
+            }
+
+
+# one limiter per provider budget (Groq limits each model separately); "default" is GROQ_MODEL's
+_limiters: Dict[str, RateLimiter] = {}
+_limiter_lock = threading.Lock()
+
+
+def get_limiter(name: str = "default", **kwargs: Any) -> RateLimiter:
+    """Shared limiter for one budget; kwargs (rpm, tpm, ...) only apply when it is first created."""
+    limiter = _limiters.get(name)
+    if limiter is None:
+        with _limiter_lock:
+            limiter = _limiters.get(name)
+            if limiter is None:
+                limiter = _limiters[name] = RateLimiter(**kwargs)
+    return limiter
+
+
+def limiter_stats() -> Any:
+    limiter = _limiters.get("default")
+    return limiter.snapshot() if limiter is not None else {}
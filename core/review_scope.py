@@ -0,0 +1,206 @@
+# core/review_scope.py
+"""
+Diff-scoped review for pull requests.
+
+A scope is the set of lines a change touched in the new version of a file:
+
+    {"changed_lines": [[12, 14], [40, 40]], "context_lines": 3}
+
+scope_chunks() widens every changed range to the members (methods, constructors,
+fields, initializers) it touches, plus context_lines on each side, and returns
+them as Chunk regions. The guideline agents and the final transform then see
+only these regions, so review cost follows the size of the diff and not the size
+of the file. restrict_edits() drops every edit of the final transform that does
+not touch a changed line.
+
+parse_diff() reads the changed lines from a unified diff (`git diff -U0` is
+enough); pr_review.py is the command-line entry point.
+"""
+import difflib
+import os
+import re
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from core.java_source import Chunk, chunk_source, enclosing_types, parse_types
+
+# -----------------------
+# CONFIG
+# -----------------------
+SCOPE_CONTEXT_LINES = int(os.getenv("SCOPE_CONTEXT_LINES", "3"))
+CHANGED_MARK = "// @changed"  # appended to changed lines in guideline prompts
+
+_FILE_RE = re.compile(r"^\+\+\+ (?:b/)?(.+?)\s*$")
+_HUNK_RE = re.compile(r"^@@+ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@+")
+
+
+# -----------------------
+# Diff parsing
+# -----------------------
+def _merge_ranges(ranges: Iterable[Tuple[int, int]], gap: int = 0) -> List[Tuple[int, int]]:
+    """Sorted, merged ranges; ranges at most `gap` lines apart are joined."""
+    out: List[Tuple[int, int]] = []
+    for a, b in sorted(ranges):
+        if out and a <= out[-1][1] + gap + 1:
+            out[-1] = (out[-1][0], max(out[-1][1], b))
+        else:
+            out.append((a, b))
+    return out
+
+
+def parse_diff(diff_text: str) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    {path: changed new-side line ranges} from a unified diff. Added and modified lines
+    count as changed; a pure deletion marks the line after it. Deleted files are skipped.
+    """
+    files: Dict[str, List[Tuple[int, int]]] = {}
+    path: Optional[str] = None
+    old_left = new_left = 0  # lines still expected in the current hunk
+    line = 0
+    for raw in (diff_text or "").splitlines():
+        if old_left <= 0 and new_left <= 0:
+            m = _FILE_RE.match(raw)
+            if m:
+                path = None if m.group(1) == "/dev/null" else m.group(1)
+                if path is not None:
+                    files.setdefault(path, [])
+                continue
+            h = _HUNK_RE.match(raw)
+            if h:
+                old_left, new_left = int(h.group(2) or 1), int(h.group(4) or 1)
+                line = int(h.group(3)) + (1 if new_left == 0 else 0)  # -U0 deletion: "after line N"
+            continue
+        tag = raw[:1]
+        if tag == "+":
+            if path is not None:
+                files[path].append((line, line))
+            line += 1
+            new_left -= 1
+        elif tag == "-":
+            if path is not None:
+                files[path].append((max(line, 1), max(line, 1)))
+            old_left -= 1
+        elif tag == "\\":  # "\ No newline at end of file"
+            continue
+        else:
+            line += 1
+            old_left -= 1
+            new_left -= 1
+    return {p: _merge_ranges(r) for p, r in files.items() if r}
+
+
+def make_scope(changed: Iterable[Tuple[int, int]], context_lines: int = SCOPE_CONTEXT_LINES) -> Dict[str, Any]:
+    """State value for Response.review_scope."""
+    return {"changed_lines": [list(r) for r in _merge_ranges(changed)], "context_lines": context_lines}
+
+
+def changed_ranges(scope: Optional[Dict[str, Any]]) -> List[Tuple[int, int]]:
+    return [(int(a), int(b)) for a, b in (scope or {}).get("changed_lines") or []]
+
+
+def is_changed(scope: Optional[Dict[str, Any]], line: int) -> bool:
+    return any(a <= line <= b for a, b in changed_ranges(scope))
+
+
+# -----------------------
+# Regions
+# -----------------------
+def _member_spans(code: str) -> List[Tuple[int, int]]:
+    try:
+        return [(m.line, m.end_line) for t in parse_types(code) for m in t.members]
+    except Exception as e:  # fall back to plain line context
+        print("review scope: declaration scan failed:", e)
+        return []
+
+
+def _regions(code: str, changed: Tuple[Tuple[int, int], ...], context_lines: int) -> List[Tuple[int, int]]:
+    total = len(code.splitlines())
+    members = _member_spans(code)
+    spans = []
+    for a, b in changed:
+        a, b = max(1, min(a, total)), max(1, min(b, total))
+        # every member the range touches is included whole
+        for ma, mb in members:
+            if ma <= b and a <= mb:
+                a, b = min(a, ma), max(b, mb)
+        spans.append((max(1, a - context_lines), min(total, b + context_lines)))
+    return _merge_ranges(spans)
+
+
+@lru_cache(maxsize=16)
+def _scope_chunks(code: str, changed: Tuple[Tuple[int, int], ...], context_lines: int,
+                  token_budget: int) -> Tuple[Chunk, ...]:
+    lines = code.splitlines(keepends=True)
+    out: List[Chunk] = []
+    for a, b in _regions(code, changed, context_lines):
+        text = "".join(lines[a - 1:b])
+        # an oversized region (one huge method) is split like a large file
+        for piece in chunk_source(text, token_budget) or [Chunk(0, 1, b - a + 1, text, "")]:
+            start = a + piece.start_line - 1
+            out.append(Chunk(len(out), start, a + piece.end_line - 1, piece.text, enclosing_types(code, start)))
+    return tuple(out)
+
+
+def scope_chunks(code: str, scope: Dict[str, Any], token_budget: int) -> List[Chunk]:
+    """Changed regions of `code` as chunks (file line numbers, in file order)."""
+    if not code:
+        return []
+    changed = tuple(changed_ranges(scope))
+    context_lines = int(scope.get("context_lines", SCOPE_CONTEXT_LINES))
+    return list(_scope_chunks(code, changed, context_lines, token_budget))
+
+
+def mark_changed(text: str, line_map: List[int], first_line: int, scope: Dict[str, Any]) -> str:
+    """Append CHANGED_MARK to prompt lines whose original file line was changed."""
+    out = text.split("\n")
+    for k, orig in enumerate(line_map[:len(out)]):
+        if out[k].strip() and is_changed(scope, orig + first_line - 1):
+            out[k] = out[k] + "  " + CHANGED_MARK
+    return "\n".join(out)
+
+
+def splice(code: str, chunks: List[Chunk], texts: List[str]) -> str:
+    """Replace each chunk's lines of `code` with its new text (chunks in file order)."""
+    lines = code.splitlines(keepends=True)
+    out, pos = [], 0
+    for chunk, text in zip(chunks, texts):
+        out.append("".join(lines[pos:chunk.start_line - 1]))
+        out.append(text)
+        pos = chunk.end_line
+    out.append("".join(lines[pos:]))
+    return "".join(out)
+
+
+# -----------------------
+# Edits
+# -----------------------
+def restrict_edits(original: str, updated: str, scope: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+    """
+    Keep only the edits in `updated` that replace, delete or insert next to a changed
+    line of `original`; everything else reverts to the original text.
+    """
+    old, new = original.splitlines(keepends=True), updated.splitlines(keepends=True)
+    ranges = changed_ranges(scope)
+    out: List[str] = []
+    kept = dropped = 0
+    for op, i1, i2, j1, j2 in difflib.SequenceMatcher(None, old, new, autojunk=False).get_opcodes():
+        if op == "equal":
+            out.extend(old[i1:i2])
+            continue
+        # 1-based original lines touched; an insertion touches the lines around it
+        lo, hi = (i1 + 1, i2) if i2 > i1 else (i1, i1 + 1)
+        if any(a <= hi and lo <= b for a, b in ranges):
+            out.extend(new[j1:j2])
+            kept += 1
+        else:
+            out.extend(old[i1:i2])
+            dropped += 1
+    return "".join(out), {"edits_kept": kept, "edits_dropped": dropped}
+
+
+def unified_patch(original: str, updated: str, path: str = "Original.java") -> str:
+    """`diff -u` style patch from original to updated ('' when identical)."""
+    return "".join(difflib.unified_diff(
+        original.splitlines(keepends=True), updated.splitlines(keepends=True),
+        fromfile=f"a/{path}", tofile=f"b/{path}",
+    ))
@@ -0,0 +1,136 @@
+# core/routing.py
+"""
+Model tiers and provider routing.
+
+Every LLM call names a route: a guideline id ("G09"), a group ("G09+G10"), "merge" or
+"final". MODEL_ROUTES maps routes to tiers and MODEL_TIERS defines each tier's model,
+max_tokens cap and request timeout. Unrouted calls use the "large" tier (GROQ_MODEL,
+no cap), which is exactly the single-model behaviour.
+
+    MODEL_TIERS="small=llama-3.1-8b-instant:800:30;large=llama-3.3-70b-versatile::120"
+    MODEL_ROUTES="G09=small,G10=small"
+
+When FAILOVER_BASE_URL points at an OpenAI-compatible endpoint (vLLM, Ollama, LM Studio,
+...), calls whose primary is rate-limited (a 429, or the limiter paused on a retry hint)
+or has failed every retry go there instead (core/clients.py). Per-tier latency and
+outcome counters are kept here: routing_stats().
+"""
+import os
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+# -----------------------
+# CONFIG
+# -----------------------
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-versatile")
+SMALL_MODEL = os.getenv("GROQ_SMALL_MODEL", "llama-3.1-8b-instant")
+DEFAULT_TIER = "large"
+MODEL_TIERS = os.getenv("MODEL_TIERS", "").strip()
+MODEL_ROUTES = os.getenv("MODEL_ROUTES", "").strip()
+
+# secondary backend (OpenAI-compatible); empty URL = no failover
+FAILOVER_BASE_URL = os.getenv("FAILOVER_BASE_URL", "").strip()
+FAILOVER_MODEL = os.getenv("FAILOVER_MODEL", "").strip()     # empty = same model name as the tier
+FAILOVER_RPM = float(os.getenv("FAILOVER_RPM", "0"))         # 0 = unlimited
+FAILOVER_TPM = float(os.getenv("FAILOVER_TPM", "0"))
+
+
+@dataclass(frozen=True)
+class Tier:
+    name: str
+    model: str
+    max_tokens: Optional[int] = None   # cap on the caller's max_tokens (None = caller decides)
+    timeout: Optional[float] = None    # per-request timeout (None = LLM_TIMEOUT)
+
+    def cap(self, max_tokens: int) -> int:
+        return min(max_tokens, self.max_tokens) if self.max_tokens else max_tokens
+
+    @property
+    def limiter_key(self) -> str:
+        # Groq budgets are per model; the default model keeps the "default" limiter
+        return "default" if self.model == GROQ_MODEL else f"groq:{self.model}"
+
+
+def parse_tiers(spec: str = MODEL_TIERS) -> Dict[str, Tier]:
+    """'name=model[:max_tokens[:timeout]];...' on top of the built-in large/small tiers."""
+    tiers = {DEFAULT_TIER: Tier(DEFAULT_TIER, GROQ_MODEL), "small": Tier("small", SMALL_MODEL, 800, 30.0)}
+    for part in filter(None, (p.strip() for p in spec.split(";"))):
+        name, _, rest = part.partition("=")
+        model, _, limits = rest.partition(":")
+        tokens, _, timeout = limits.partition(":")
+        name = name.strip().lower()
+        if not name or not model.strip():
+            print(f"MODEL_TIERS: ignoring '{part}'")
+            continue
+        tiers[name] = Tier(name, model.strip(),
+                           int(tokens) if tokens.strip().isdigit() else None,
+                           float(timeout) if timeout.strip() else None)
+    return tiers
+
+
+def parse_routes(spec: str = MODEL_ROUTES) -> Dict[str, str]:
+    """'G09=small,G10=small,merge=large' -> {route: tier}; unknown tiers are dropped."""
+    routes = {}
+    for part in filter(None, (p.strip() for p in spec.replace(";", ",").split(","))):
+        route, _, tier = part.partition("=")
+        route, tier = route.strip(), tier.strip().lower()
+        if tier not in TIERS:
+            print(f"MODEL_ROUTES: unknown tier in '{part}'")
+            continue
+        routes[route.upper() if route[:1] in "gG" else route.lower()] = tier
+    return routes
+
+
+TIERS = parse_tiers()
+ROUTES = parse_routes()
+
+
+def tier_for(route: Optional[str]) -> Tier:
+    """Tier for a route; a group ("G09+G10") only leaves the default if all members agree."""
+    if not route:
+        return TIERS[DEFAULT_TIER]
+    names = {ROUTES.get(r, DEFAULT_TIER) for r in route.split("+")}
+    return TIERS[names.pop() if len(names) == 1 else DEFAULT_TIER]
+
+
+def failover_model(tier: Tier) -> Optional[str]:
+    if not FAILOVER_BASE_URL:
+        return None
+    return FAILOVER_MODEL or tier.model
+
+
+# -----------------------
+# Per-tier stats
+# -----------------------
+_stats_lock = threading.Lock()
+_tier_stats: Dict[str, Dict[str, Any]] = {}
+
+
+def record(tier: str, backend: str, seconds: Optional[float], ok: bool, rate_limited: bool = False) -> None:
+    """One provider attempt: backend is "primary" or "failover"; seconds only for successes."""
+    with _stats_lock:
+        st = _tier_stats.setdefault(tier, {"calls": 0, "ok": 0, "errors": 0, "rate_limited": 0,
+                                           "failover_calls": 0, "latencies": deque(maxlen=500)})
+        st["calls"] += 1
+        st["ok" if ok else "errors"] += 1
+        st["rate_limited"] += 1 if rate_limited else 0
+        st["failover_calls"] += 1 if backend == "failover" else 0
+        if ok and seconds is not None:
+            st["latencies"].append(seconds)
+
+
+def routing_stats() -> Dict[str, Dict[str, Any]]:
+    """Per tier: attempts, successes, errors, 429s, failover attempts, success rate, p50/p95 latency."""
+    out = {}
+    with _stats_lock:
+        for tier, st in _tier_stats.items():
+            lat = sorted(st["latencies"])
+            row = {k: v for k, v in st.items() if k != "latencies"}
+            row["model"] = TIERS[tier].model if tier in TIERS else None
+            row["success_rate"] = round(st["ok"] / st["calls"], 4) if st["calls"] else 0.0
+            row["p50_s"] = round(lat[len(lat) // 2], 3) if lat else None
+            row["p95_s"] = round(lat[min(len(lat) - 1, int(len(lat) * 0.95))], 3) if lat else None
+            out[tier] = row
+    return out
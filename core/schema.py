@@ -1,11 +1,31 @@
 # core/schema.py
-from typing import Optional
+from typing import Annotated, Any, Dict, List, Optional
 from pydantic import BaseModel
 
+def _union(a: Optional[List[str]], b: Optional[List[str]]) -> List[str]:
+    # parallel guideline nodes report into the same key
+    return sorted(set(a or []) | set(b or []))
+
 class Response(BaseModel):
     # original input
     code_snippet: Optional[str] = None
 
+    # diff-scoped review (core/review_scope.py): {"changed_lines": [[a, b], ...], "context_lines": n};
+    # None reviews the whole file
+    review_scope: Optional[Dict[str, Any]] = None
+
+    # epoch seconds when the review started (set by precheck_node; REVIEW_BUDGET_S deadlines)
+    started_at: Optional[float] = None
+
+    # static pre-analysis: guideline id -> {"status": "findings"|"not_applicable", "content": str}
+    static_checks: Optional[Dict[str, Dict[str, str]]] = None
+
+    # guideline-prompt code tokens before/after core/compaction.py (set by precheck_node)
+    compaction_report: Optional[Dict[str, Any]] = None
+
+    # FINDINGS_CACHE: per-unit findings cache hits expected for this review (set by precheck_node)
+    unit_cache_report: Optional[Dict[str, Any]] = None
+
     # guideline outputs: plain strings (chat-like)
     guideline_1: Optional[str] = None
     guideline_2: Optional[str] = None
@@ -21,3 +41,9 @@ class Response(BaseModel):
     # merger and final outputs (plain strings)
     merge_guide_res: Optional[str] = None
     final_updated_code: Optional[str] = None
+
+    # FINAL_MODE=diff: {"hunks", "applied", "fuzzy", "rejected": [...]} from core/patching.py
+    final_patch_report: Optional[Dict[str, Any]] = None
+
+    # stages whose LLM call failed or hit the deadline and fell back ("G03", "G04+G05", "merge", "final")
+    degraded: Annotated[List[str], _union] = []
@@ -0,0 +1,252 @@
+# core/slicing.py
+"""
+Guideline-specific code slices for the agent prompts.
+
+Most guidelines only need a small part of a file. G10 needs the classes that declare
+equals/hashCode, G05 the try/catch blocks and throws clauses, and G08 the member
+signatures. G04/G07 need the fields and the methods that read or write them. slice_lines()
+picks those lines: whole members, plus the header and closing brace of every enclosing
+type. slice_chunk() then blanks every other line of a chunk. Line numbers stay those of
+the file, so compaction drops the blank runs and line references map back as before.
+
+A guideline whose slice is empty has nothing to review. empty_slices() marks it
+"not applicable" in precheck_node, so its call is skipped like a statically decided one.
+Guidelines without a slicer always see the whole code: G01 (conventions), G02 (loops),
+G03 (null-safety), G06 (collections) and G09 (interfaces).
+"""
+import os
+import re
+from functools import lru_cache
+from typing import Callable, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from core.java_source import Chunk, Member, TypeDecl, mask_source, parse_source
+from core.static_checks import not_applicable
+
+# -----------------------
+# CONFIG
+# -----------------------
+SLICING = os.getenv("SLICING", "true").lower() in ("1", "true", "yes")
+
+_TRY_RE = re.compile(r"\btry\b")
+_THROWS_RE = re.compile(r"\bthrows\b")
+_IMPORT_RE = re.compile(r"^\s*import\b")
+
+
+class _Source(NamedTuple):
+    masked: str           # mask_source(code): literals and comments blanked
+    lines: List[str]      # masked lines
+    types: List[TypeDecl]
+
+
+# -----------------------
+# Helpers
+# -----------------------
+def _span(a: int, b: int) -> Set[int]:
+    return set(range(a, b + 1))
+
+
+def _head_end(src: _Source, line: int) -> int:
+    """Last line of the declaration header starting at `line` (the line with its '{' or ';')."""
+    for k in range(line, len(src.lines) + 1):
+        if "{" in src.lines[k - 1] or ";" in src.lines[k - 1]:
+            return k
+    return line
+
+
+def _body(src: _Source, m: Member) -> str:
+    return "\n".join(src.lines[m.line - 1:m.end_line])
+
+
+def _matching(text: str, i: int, open_: str, close: str) -> int:
+    """Index of the bracket closing text[i] (or the end of the text)."""
+    depth = 0
+    for k in range(i, len(text)):
+        if text[k] == open_:
+            depth += 1
+        elif text[k] == close:
+            depth -= 1
+            if depth == 0:
+                return k
+    return len(text) - 1
+
+
+def _skip_ws(text: str, i: int) -> int:
+    while i < len(text) and text[i].isspace():
+        i += 1
+    return i
+
+
+def _keyword_at(text: str, i: int, word: str) -> bool:
+    end = i + len(word)
+    return text.startswith(word, i) and not (end < len(text) and (text[end].isalnum() or text[end] == "_"))
+
+
+def _try_end(masked: str, i: int) -> int:
+    """Offset of the last '}' of the try statement whose keyword ends at offset i."""
+    j = _skip_ws(masked, i)
+    if j < len(masked) and masked[j] == "(":  # try-with-resources
+        j = _skip_ws(masked, _matching(masked, j, "(", ")") + 1)
+    if j >= len(masked) or masked[j] != "{":
+        return i
+    end = _matching(masked, j, "{", "}")
+    while True:
+        k = _skip_ws(masked, end + 1)
+        if _keyword_at(masked, k, "catch"):
+            k = _skip_ws(masked, k + len("catch"))
+            if k < len(masked) and masked[k] == "(":
+                k = _skip_ws(masked, _matching(masked, k, "(", ")") + 1)
+        elif _keyword_at(masked, k, "finally"):
+            k = _skip_ws(masked, k + len("finally"))
+        else:
+            return end
+        if k >= len(masked) or masked[k] != "{":
+            return end
+        end = _matching(masked, k, "{", "}")
+
+
+def _line_of(masked: str, offset: int) -> int:
+    return masked.count("\n", 0, offset) + 1
+
+
+def _frames(src: _Source, kept: Set[int]) -> Set[int]:
+    """Header and closing lines of every type that contains a kept line."""
+    out: Set[int] = set()
+    for t in src.types:
+        if any(t.line <= k <= t.end_line for k in kept):
+            out |= _span(t.line, _head_end(src, t.line))
+            out.add(t.end_line)
+    return out
+
+
+# -----------------------
+# Slicers: guideline -> relevant lines
+# -----------------------
+def _equality(src: _Source) -> Set[int]:
+    """G10: equals/hashCode and the fields they should agree on, per declaring type."""
+    out: Set[int] = set()
+    for t in src.types:
+        if not any(m.kind == "method" and m.name in ("equals", "hashCode") for m in t.members):
+            continue
+        for m in t.members:
+            if m.kind == "field" or (m.kind == "method" and m.name in ("equals", "hashCode")):
+                out |= _span(m.line, m.end_line)
+    return out
+
+
+def _exceptions(src: _Source) -> Set[int]:
+    """G05: try/catch/finally statements with their member's signature, and throws clauses."""
+    tries: Set[int] = set()
+    for m in _TRY_RE.finditer(src.masked):
+        tries |= _span(_line_of(src.masked, m.start()), _line_of(src.masked, _try_end(src.masked, m.end())))
+    out = set(tries)
+    for t in src.types:
+        for m in t.members:
+            if m.kind not in ("method", "constructor", "initializer"):
+                continue
+            head = _span(m.line, _head_end(src, m.line))
+            if any(m.line <= k <= m.end_line for k in tries):
+                out |= head | {m.end_line}
+            elif _THROWS_RE.search("\n".join(src.lines[m.line - 1:max(head)])):
+                out |= head
+    return out
+
+
+def _signatures(src: _Source) -> Set[int]:
+    """G08: imports, field declarations and method/constructor signatures."""
+    out = {k for k, line in enumerate(src.lines, start=1) if _IMPORT_RE.match(line)}
+    for t in src.types:
+        for m in t.members:
+            if m.kind == "field":
+                out |= _span(m.line, m.end_line)
+            elif m.kind in ("method", "constructor"):
+                out |= _span(m.line, _head_end(src, m.line))
+    return out
+
+
+def _state_access(src: _Source, constructors: bool = False) -> Set[int]:
+    """G04/G07: fields and the methods that return or assign them (and constructors for G04)."""
+    out: Set[int] = set()
+    for t in src.types:
+        fields = [m for m in t.members if m.kind == "field"]
+        if not fields:
+            continue
+        names = "|".join(re.escape(f.name) for f in fields)
+        touches = re.compile(rf"\breturn\s+(this\s*\.\s*)?({names})\s*;|\bthis\s*\.\s*({names})\s*=[^=]")
+        accessors = {p + f.name.lower() for f in fields for p in ("get", "is", "set", "with")}
+        for m in t.members:
+            if m.kind == "field" or (constructors and m.kind == "constructor"):
+                out |= _span(m.line, m.end_line)
+            elif m.kind == "method" and (m.name.lower() in accessors or touches.search(_body(src, m))):
+                out |= _span(m.line, m.end_line)
+    return out
+
+
+# guideline -> (slicer, "not applicable" reason for an empty slice)
+SLICERS: Dict[str, Tuple[Callable[[_Source], Set[int]], str]] = {
+    "G04": (lambda src: _state_access(src, constructors=True), "The code declares no fields, so no internal state is exposed."),
+    "G05": (_exceptions, "The code has no try/catch blocks or throws clauses."),
+    "G07": (_state_access, "The code declares no fields to encapsulate."),
+    "G08": (_signatures, "The code declares no fields, methods or constructors."),
+    "G10": (_equality, "No class declares equals or hashCode."),
+}
+
+
+# -----------------------
+# Public API
+# -----------------------
+@lru_cache(maxsize=16)
+def _source(code: str) -> _Source:
+    # parsed once per file for all slicers
+    masked = mask_source(code)
+    return _Source(masked, masked.splitlines(), parse_source(code)[1])
+
+
+@lru_cache(maxsize=64)
+def _slice_lines(code: str, guid_key: str) -> Optional[FrozenSet[int]]:
+    try:
+        src = _source(code)
+        kept = SLICERS[guid_key][0](src)
+    except Exception as e:  # never block a review on the slicer: send the whole code
+        print(f"slicing {guid_key} failed:", e)
+        return None
+    return frozenset(kept | _frames(src, kept)) if kept else frozenset()
+
+
+def slice_lines(code: str, guid_key: str) -> Optional[FrozenSet[int]]:
+    """1-based file lines `guid_key` needs to see, or None when it gets the whole code."""
+    if not SLICING or guid_key not in SLICERS or not code or not code.strip():
+        return None
+    return _slice_lines(code, guid_key)
+
+
+def slice_chunk(chunk: Chunk, lines: FrozenSet[int]) -> Optional[Chunk]:
+    """`chunk` with every line outside `lines` blanked; None when nothing is left."""
+    out, kept = [], False
+    for k, text in enumerate(chunk.text.splitlines(keepends=True), start=chunk.start_line):
+        if k in lines:
+            out.append(text)
+            kept = kept or bool(text.strip())
+        else:
+            out.append(text[len(text.rstrip("\r\n")):])  # keep only the line break
+    return chunk._replace(text="".join(out)) if kept else None
+
+
+def slice_chunks(code: str, chunks: Iterable[Chunk], guid_key: str) -> Optional[List[Optional[Chunk]]]:
+    """Each chunk (exact slices of `code`) cut down to guid_key's slice, or None when not sliced."""
+    lines = slice_lines(code, guid_key)
+    if lines is None:
+        return None
+    return [slice_chunk(c, lines) for c in chunks]
+
+
+def empty_slices(code: str, chunks: List[Chunk], decided: Iterable[str] = ()) -> Dict[str, Dict[str, str]]:
+    """'Not applicable' static results for the undecided guidelines with nothing in their slice."""
+    decided = set(decided)
+    out = {}
+    for guid_key, (_, reason) in SLICERS.items():
+        if guid_key in decided:
+            continue
+        sliced = slice_chunks(code, chunks, guid_key)
+        if sliced is not None and not any(sliced):
+            out[guid_key] = not_applicable(guid_key, reason)
+    return out
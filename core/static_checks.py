@@ -0,0 +1,233 @@
+# core/static_checks.py
+"""
+Deterministic pre-analysis for the mechanically checkable guidelines.
+
+Each detector looks at the token stream / declarations from core.java_source and
+returns one of:
+  {"status": "findings", "content": <findings in the agent Finding template>}
+  {"status": "not_applicable", "content": <a single 'Not applicable' finding>}
+or None when it cannot decide, in which case the guideline goes to the LLM.
+"""
+import os
+import re
+from typing import Callable, Dict, List, Optional
+
+from core.java_source import Member, Token, TypeDecl, parse_source
+
+STATIC_CHECKS = os.getenv("STATIC_CHECKS", "true").lower() in ("1", "true", "yes")
+MAX_STATIC_FINDINGS = 4
+
+LEGACY_TYPES = {
+    "Vector": ("ArrayList", "List<T> xs = new ArrayList<>();  // or Collections.synchronizedList(...) if shared"),
+    "Hashtable": ("HashMap", "Map<K, V> m = new HashMap<>();  // or ConcurrentHashMap if shared"),
+    "Stack": ("ArrayDeque", "Deque<T> stack = new ArrayDeque<>();  // push/pop/peek keep working"),
+}
+CONCRETE_COLLECTIONS = {
+    "ArrayList": "List", "LinkedList": "List", "CopyOnWriteArrayList": "List", "Vector": "List", "Stack": "Deque",
+    "HashMap": "Map", "LinkedHashMap": "Map", "TreeMap": "SortedMap", "ConcurrentHashMap": "ConcurrentMap",
+    "EnumMap": "Map", "IdentityHashMap": "Map", "WeakHashMap": "Map", "Hashtable": "Map",
+    "HashSet": "Set", "LinkedHashSet": "Set", "TreeSet": "SortedSet", "EnumSet": "Set",
+    "ArrayDeque": "Deque", "PriorityQueue": "Queue",
+}
+COLLECTION_TYPES = set(CONCRETE_COLLECTIONS) | {
+    "Collection", "List", "Set", "Map", "Queue", "Deque", "SortedMap", "SortedSet", "NavigableMap",
+    "NavigableSet", "ConcurrentMap", "Iterable", "Enumeration", "Dictionary", "BitSet",
+}
+
+
+def format_finding(title: str, area: str, severity: str, confidence: int, issue: str, fix: str,
+                   patch: Optional[str] = None) -> str:
+    """Render one finding in the same template build_guideline_prompt asks agents for."""
+    text = (
+        f"- Finding: {title}\n"
+        f"- Area: {area}\n"
+        f"- Severity: {severity}\n"
+        f"- Confidence: {confidence}\n"
+        f"- Issue: {issue}\n"
+        f"- Fix: {fix}\n"
+    )
+    if patch:
+        text += "- Patch (optional): ```java\n  " + patch.replace("\n", "\n  ") + "\n  ```\n"
+    return text
+
+
+def not_applicable(guid_key: str, reason: str) -> Dict[str, str]:
+    return {
+        "status": "not_applicable",
+        "content": format_finding("Not applicable", "approximate", "Low", 5, reason,
+                                  f"No change needed for {guid_key}."),
+    }
+
+
+def _findings(items: List[str]) -> Dict[str, str]:
+    return {"status": "findings", "content": "\n".join(items[:MAX_STATIC_FINDINGS])}
+
+
+def _member_at(types: List[TypeDecl], line: int) -> str:
+    """Best 'Area' label for a line: innermost member, else innermost type."""
+    best, best_span = "approximate", None
+    for t in types:
+        for m in t.members:
+            if m.line <= line <= m.end_line and (best_span is None or m.end_line - m.line < best_span):
+                best, best_span = f"{m.name or 'initializer'} in {t.name}", m.end_line - m.line
+        if best_span is None and t.line <= line <= t.end_line:
+            best = t.name
+    return best
+
+
+def _signature_types(m: Member) -> str:
+    return f"{m.type_text} {m.params_text}"
+
+
+# -----------------------
+# Detectors
+# -----------------------
+def check_g06(tokens: List[Token], types: List[TypeDecl]) -> Optional[Dict[str, str]]:
+    """Legacy synchronized collections (Vector/Hashtable/Stack)."""
+    uses: Dict[str, List[int]] = {}
+    for k, t in enumerate(tokens):
+        if t.kind != "ident" or t.text not in LEGACY_TYPES:
+            continue
+        prev = tokens[k - 1].text if k else ""
+        nxt = tokens[k + 1].text if k + 1 < len(tokens) else ""
+        # type position: `Vector<..>`, `Vector v`, `new Vector`, `import java.util.Vector`
+        if nxt == "<" or prev == "new" or (k + 1 < len(tokens) and tokens[k + 1].kind == "ident") or \
+                (prev == "." and k >= 2 and tokens[k - 2].text == "util"):
+            uses.setdefault(t.text, []).append(t.line)
+    if uses:
+        items = []
+        for name, lines in uses.items():
+            modern, patch = LEGACY_TYPES[name]
+            lines = sorted(set(lines))
+            label = "line" if len(lines) == 1 else "lines"
+            area = _member_at(types, lines[0]) + f" ({label} {','.join(str(n) for n in lines)})"
+            items.append(format_finding(
+                f"Legacy collection {name}", area, "Medium", 5,
+                f"{name} is a legacy synchronized collection; every call pays for locking.",
+                f"Replace {name} with {modern} (declare the variable as its interface).", patch,
+            ))
+        return _findings(items)
+    if not any(t.kind == "ident" and t.text in COLLECTION_TYPES for t in tokens) and \
+            not any(t.text == "[" for t in tokens):
+        return not_applicable("G06", "No collections or arrays are used, so there is no data structure choice to review.")
+    return None
+
+
+def check_g07(tokens: List[Token], types: List[TypeDecl]) -> Optional[Dict[str, str]]:
+    """Public non-final fields."""
+    items, undecided = [], False
+    for t in types:
+        if t.kind == "interface":
+            continue  # interface fields are implicitly public static final
+        for m in t.members:
+            if m.kind != "field":
+                continue
+            if "public" in m.modifiers and "final" not in m.modifiers:
+                getter = ("is" if m.type_text == "boolean" else "get") + m.name[:1].upper() + m.name[1:]
+                static = "static " if "static" in m.modifiers else ""
+                items.append(format_finding(
+                    f"Public mutable field {m.name}", f"field {m.name} in {t.name} (line {m.line})", "Medium", 5,
+                    f"{t.name}.{m.name} is public and non-final, so any caller can change it.",
+                    f"Make {m.name} private and expose an accessor (and a setter only if needed).",
+                    f"private {static}{m.type_text} {m.name};\npublic {static}{m.type_text} {getter}() {{ return {m.name}; }}",
+                ))
+            elif "private" not in m.modifiers and not ("static" in m.modifiers and "final" in m.modifiers):
+                undecided = True  # package/protected fields: judgement call, leave to the LLM
+    if undecided:
+        return None  # the LLM reviews every field, the public ones included
+    if items:
+        return _findings(items)
+    return not_applicable("G07", "All fields are private (or constants), nothing to encapsulate.")
+
+
+def check_g08(tokens: List[Token], types: List[TypeDecl]) -> Optional[Dict[str, str]]:
+    """Concrete collection types in non-private signatures."""
+    items = []
+    pattern = re.compile(r"\b(" + "|".join(sorted(CONCRETE_COLLECTIONS)) + r")\b")
+    for t in types:
+        for m in t.members:
+            if m.kind not in ("field", "method", "constructor") or "private" in m.modifiers:
+                continue
+            found = sorted(set(pattern.findall(_signature_types(m))))
+            if not found:
+                continue
+            what = "field" if m.kind == "field" else "signature of"
+            iface = ", ".join(f"{c} -> {CONCRETE_COLLECTIONS[c]}" for c in found)
+            items.append(format_finding(
+                f"Concrete type in {m.name} {'declaration' if m.kind == 'field' else 'signature'}",
+                f"{m.name} in {t.name} (line {m.line})", "Low", 5,
+                f"The {what} {m.name} exposes {', '.join(found)} instead of an interface.",
+                f"Declare it with the interface type ({iface}); keep the concrete class only at construction.",
+            ))
+    if items:
+        return _findings(items)
+    return not_applicable("G08", "No concrete collection classes appear in non-private signatures.")
+
+
+def check_g09(tokens: List[Token], types: List[TypeDecl]) -> Optional[Dict[str, str]]:
+    if not any(t.kind == "interface" for t in types):
+        return not_applicable("G09", "The file declares no interfaces.")
+    return None
+
+
+def check_g10(tokens: List[Token], types: List[TypeDecl]) -> Optional[Dict[str, str]]:
+    """equals without hashCode (or the reverse)."""
+    items, any_equals = [], False
+    for t in types:
+        if t.kind in ("interface", "record"):
+            continue
+        eq = next((m for m in t.members if m.kind == "method" and m.name == "equals"
+                   and m.params_text and "," not in m.params_text), None)
+        hc = next((m for m in t.members if m.kind == "method" and m.name == "hashCode"
+                   and not m.params_text.strip()), None)
+        any_equals = any_equals or eq is not None or hc is not None
+        if eq and not hc:
+            items.append(format_finding(
+                "equals without hashCode", f"equals in {t.name} (line {eq.line})", "High", 5,
+                f"{t.name} overrides equals but not hashCode, breaking hash-based collections.",
+                "Override hashCode using the same fields equals compares.",
+                "@Override\npublic int hashCode() { return Objects.hash(/* fields used in equals */); }",
+            ))
+        elif hc and not eq:
+            items.append(format_finding(
+                "hashCode without equals", f"hashCode in {t.name} (line {hc.line})", "Medium", 4,
+                f"{t.name} overrides hashCode but keeps identity equals.",
+                "Override equals on the same fields, or drop the custom hashCode.",
+            ))
+    if items:
+        return _findings(items)
+    if not any_equals:
+        return not_applicable("G10", "No class overrides equals or hashCode.")
+    return None  # both present: field consistency needs the LLM
+
+
+DETECTORS: Dict[str, Callable[[List[Token], List[TypeDecl]], Optional[Dict[str, str]]]] = {
+    "G06": check_g06,
+    "G07": check_g07,
+    "G08": check_g08,
+    "G09": check_g09,
+    "G10": check_g10,
+}
+
+
+def run_static_checks(code: str) -> Dict[str, Dict[str, str]]:
+    """Decided guidelines only: {guid_key: {"status", "content"}}."""
+    if not STATIC_CHECKS or not code or not code.strip():
+        return {}
+    try:
+        tokens, types = parse_source(code)
+    except Exception as e:  # never block a review on the pre-pass
+        print("static pre-analysis failed:", e)
+        return {}
+    if not types:
+        return {}
+    results = {}
+    for guid_key, detector in DETECTORS.items():
+        try:
+            res = detector(tokens, types)
+        except Exception as e:
+            print(f"static check {guid_key} failed:", e)
+            res = None
+        if res is not None:
+            results[guid_key] = res
+    return results
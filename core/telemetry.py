@@ -0,0 +1,266 @@
+# core/telemetry.py
+"""
+Lightweight tracing + metrics for the review graph (no extra dependencies).
+
+* Spans: `with span("name", kind=...)` nests through a contextvar, so LLM calls made
+  inside a graph node (threads or asyncio tasks) become children of that node's span.
+  Finished spans are kept in a bounded in-memory buffer and, when TRACE_FILE is set,
+  appended to it as JSON lines.
+* Metrics: finished "node" and "llm" spans feed Prometheus-style counters/histograms,
+  rendered by render_metrics() and served on /metrics by start_metrics_server().
+"""
+import contextvars
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# -----------------------
+# CONFIG
+# -----------------------
+TELEMETRY = os.getenv("TELEMETRY", "true").lower() in ("1", "true", "yes")
+TRACE_FILE = os.getenv("TRACE_FILE", "")               # JSONL span export, empty = off
+TRACE_BUFFER = int(os.getenv("TRACE_BUFFER", "5000"))   # finished spans kept in memory
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))      # Prometheus /metrics port, 0 = off
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")   # 0.0.0.0 to let a remote Prometheus scrape
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 40, 80, float("inf"))
+
+
+# -----------------------
+# Spans
+# -----------------------
+class Span:
+    __slots__ = ("trace_id", "span_id", "parent_id", "name", "kind", "node", "start", "end", "attrs")
+
+    def __init__(self, name: str, kind: str, parent: Optional["Span"], attrs: Dict[str, Any]):
+        self.trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent.span_id if parent else None
+        self.name = name
+        self.kind = kind
+        # the graph node this span runs under (labels LLM metrics)
+        self.node = name if kind == "node" else (parent.node if parent else None)
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.attrs = dict(attrs)
+
+    def set(self, **attrs: Any) -> None:
+        self.attrs.update(attrs)
+
+    def add(self, key: str, amount: float = 1) -> None:
+        self.attrs[key] = self.attrs.get(key, 0) + amount
+
+    @property
+    def duration(self) -> float:
+        return (self.end or time.time()) - self.start
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id, "span_id": self.span_id, "parent_span_id": self.parent_id,
+            "name": self.name, "kind": self.kind, "node": self.node,
+            "start_time": self.start, "end_time": self.end, "duration_s": round(self.duration, 6),
+            "attributes": self.attrs,
+        }
+
+
+_current: contextvars.ContextVar[Optional[Span]] = contextvars.ContextVar("review_span", default=None)
+_finished: deque = deque(maxlen=TRACE_BUFFER)
+_trace_lock = threading.Lock()
+
+
+def current_span() -> Optional[Span]:
+    return _current.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs: Any) -> Iterator[Span]:
+    """Open a child of the current span (or a new trace); exceptions are recorded and re-raised."""
+    sp = Span(name, kind, _current.get(), attrs)
+    token = _current.set(sp)
+    try:
+        yield sp
+    except BaseException as e:
+        sp.set(error=f"{type(e).__name__}: {e}"[:300])
+        raise
+    finally:
+        _current.reset(token)
+        sp.end = time.time()
+        if TELEMETRY:
+            _finish(sp)
+
+
+def _finish(sp: Span) -> None:
+    record = sp.to_dict()
+    with _trace_lock:
+        _finished.append(record)
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(record, default=str) + "\n")
+            except OSError as e:
+                print("trace export failed:", e)
+    _observe(sp)
+
+
+def trace_spans(trace_id: str) -> List[Dict[str, Any]]:
+    with _trace_lock:
+        return [s for s in _finished if s["trace_id"] == trace_id]
+
+
+def run_breakdown(trace_id: str) -> List[Dict[str, Any]]:
+    """Per-node rows for one review: wall time plus the LLM calls made under that node."""
+    rows: Dict[str, Dict[str, Any]] = {}
+    for s in sorted(trace_spans(trace_id), key=lambda s: s["start_time"]):
+        if s["kind"] == "node":
+            row = rows.setdefault(s["name"], _empty_row(s["name"]))
+            row["wall_s"] = round(row["wall_s"] + s["duration_s"], 3)
+        elif s["kind"] == "llm" and s["node"]:
+            a = s["attributes"]
+            row = rows.setdefault(s["node"], _empty_row(s["node"]))
+            row["calls"] += 1
+            row["cached"] += 1 if a.get("outcome") == "cache" else 0
+            row["queue_s"] = round(row["queue_s"] + a.get("queue_s", 0.0), 3)
+            row["retries"] += a.get("retries", 0)
+            row["prompt_chars"] += a.get("prompt_chars", 0)
+            row["response_chars"] += a.get("response_chars", 0)
+            row["tokens"] += a.get("prompt_tokens", 0) + a.get("completion_tokens", 0)
+    return list(rows.values())
+
+
+def _empty_row(node: str) -> Dict[str, Any]:
+    return {"node": node, "wall_s": 0.0, "calls": 0, "cached": 0, "queue_s": 0.0, "retries": 0,
+            "prompt_chars": 0, "response_chars": 0, "tokens": 0}
+
+
+# -----------------------
+# Metrics
+# -----------------------
+class _Registry:
+    """Counters and histograms keyed by (metric, sorted label items)."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters: Dict[Tuple[str, Tuple], float] = {}
+        self.histograms: Dict[Tuple[str, Tuple], List[float]] = {}  # bucket counts + [sum, count]
+        self.help: Dict[str, Tuple[str, str]] = {}
+
+    def inc(self, name: str, labels: Dict[str, str], amount: float = 1.0, doc: str = "") -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.help.setdefault(name, ("counter", doc))
+            self.counters[key] = self.counters.get(key, 0.0) + amount
+
+    def observe(self, name: str, labels: Dict[str, str], value: float, doc: str = "") -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.help.setdefault(name, ("histogram", doc))
+            h = self.histograms.setdefault(key, [0.0] * (len(LATENCY_BUCKETS) + 2))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if value <= bound:
+                    h[i] += 1
+            h[-2] += value
+            h[-1] += 1
+
+    def render(self) -> str:
+        def fmt(labels: Tuple, extra: Tuple = ()) -> str:
+            items = labels + extra
+            return "{" + ",".join(f'{k}="{v}"' for k, v in items) + "}" if items else ""
+
+        lines = []
+        with self.lock:
+            for name, (kind, doc) in sorted(self.help.items()):
+                lines.append(f"# HELP {name} {doc}")
+                lines.append(f"# TYPE {name} {kind}")
+                if kind == "counter":
+                    for (n, labels), v in sorted(self.counters.items()):
+                        if n == name:
+                            lines.append(f"{name}{fmt(labels)} {v:g}")
+                    continue
+                for (n, labels), h in sorted(self.histograms.items()):
+                    if n != name:
+                        continue
+                    for i, bound in enumerate(LATENCY_BUCKETS):
+                        le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                        lines.append(f"{name}_bucket{fmt(labels, (('le', le),))} {h[i]:g}")
+                    lines.append(f"{name}_sum{fmt(labels)} {h[-2]:.6f}")
+                    lines.append(f"{name}_count{fmt(labels)} {h[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+_registry = _Registry()
+
+
+def _observe(sp: Span) -> None:
+    a = sp.attrs
+    if sp.kind == "node":
+        _registry.observe("review_node_duration_seconds", {"node": sp.name}, sp.duration,
+                          "Wall time per graph node.")
+    elif sp.kind == "review":
+        _registry.observe("review_duration_seconds", {}, sp.duration, "End-to-end review wall time.")
+    elif sp.kind == "llm":
+        labels = {"node": sp.node or "none", "outcome": a.get("outcome", "unknown"),
+                  "tier": a.get("tier", "large")}
+        _registry.inc("llm_calls_total", labels, 1, "LLM invocations by node, outcome and model tier.")
+        if a.get("failover"):
+            _registry.inc("llm_failover_total", {"tier": labels["tier"]}, 1,
+                          "LLM invocations sent to the failover backend.")
+        _registry.observe("llm_call_duration_seconds", labels, sp.duration,
+                          "LLM invocation wall time including queueing and retries.")
+        node = {"node": labels["node"]}
+        _registry.observe("llm_queue_seconds", node, a.get("queue_s", 0.0),
+                          "Time spent waiting for the rate limiter / concurrency slots.")
+        _registry.inc("llm_retries_total", node, a.get("retries", 0), "Retried LLM attempts.")
+        _registry.inc("llm_prompt_chars_total", node, a.get("prompt_chars", 0), "Prompt characters sent.")
+        _registry.inc("llm_response_chars_total", node, a.get("response_chars", 0), "Response characters received.")
+        for kind in ("prompt", "completion"):
+            if a.get(f"{kind}_tokens"):
+                _registry.inc("llm_tokens_total", {"node": labels["node"], "kind": kind},
+                              a[f"{kind}_tokens"], "Provider-reported token usage.")
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition of everything recorded so far in this process."""
+    return _registry.render()
+
+
+_metrics_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST):
+    """Serve /metrics in a daemon thread (idempotent; port 0 disables)."""
+    global _metrics_server
+    if not port:
+        return None
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    with _server_lock:
+        if _metrics_server is not None:
+            return _metrics_server
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        try:
+            _metrics_server = ThreadingHTTPServer((host, port), Handler)
+        except OSError as e:  # e.g. a Streamlit rerun in another process holds the port
+            print(f"metrics server on :{port} not started:", e)
+            return None
+        threading.Thread(target=_metrics_server.serve_forever, daemon=True).start()
+        return _metrics_server
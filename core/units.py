@@ -0,0 +1,106 @@
+# core/units.py
+"""
+Review units for the method-level findings cache.
+
+A file is cut into one unit per method, constructor and initializer body, plus
+one "declarations" unit: the file with every body collapsed to `{ ... }`
+(package, imports, type headers, fields and member signatures). Each unit has
+a digest of its normalized text (comments dropped, whitespace collapsed) and
+of its enclosing types, so an untouched method in the next revision gets the
+same digest. The owner is part of the digest because cached findings name it
+(Area: Foo.bar): the same getter in another class is reviewed again.
+
+Units are returned as Chunks so the prompt, compaction and result helpers in
+core/node.py work on them unchanged. The declarations unit is not an exact
+slice of the file; units are only used for guideline prompts, never for the
+final transform.
+"""
+from functools import lru_cache
+from typing import List, NamedTuple, Tuple
+
+from core.cache import make_key
+from core.java_source import Chunk, enclosing_types_at, mask_source, parse_source, scan_literals
+
+_BODY_KINDS = ("method", "constructor", "initializer")
+_COMMENT_KINDS = ("line_comment", "block_comment", "javadoc")
+
+
+class Unit(NamedTuple):
+    kind: str       # declarations | method | constructor | initializer
+    name: str       # "Foo.bar", or "" for the declarations unit
+    chunk: Chunk    # text and 1-based file lines
+    digest: str     # hash of the enclosing types and the normalized text
+
+
+def normalize(text: str) -> str:
+    """Comments dropped and whitespace collapsed (string literals kept as they are)."""
+    out, prev = [], 0
+    for kind, a, b in scan_literals(text):
+        if kind in _COMMENT_KINDS:
+            out.append(text[prev:a])
+            out.append(" ")
+            prev = b
+    out.append(text[prev:])
+    return " ".join("".join(out).split())
+
+
+def _bodies(code: str, lines: List[str]) -> List[Tuple[int, int, str, str]]:
+    """(start_line, end_line, kind, name) of member bodies, merged where they share a line."""
+    masked_lines = mask_source(code).splitlines()
+    spans = []
+    for t in parse_source(code)[1]:
+        for m in t.members:
+            if m.kind in _BODY_KINDS and "{" in "".join(masked_lines[m.line - 1:m.end_line]):
+                spans.append((m.line, m.end_line, m.kind, f"{t.name}.{m.name or 'initializer'}"))
+    merged: List[Tuple[int, int, str, str]] = []
+    for a, b, kind, name in sorted(spans):
+        if merged and a <= merged[-1][1]:
+            pa, pb, pkind, pname = merged[-1]
+            merged[-1] = (pa, max(pb, b), pkind, f"{pname}+{name}")
+        else:
+            merged.append((a, b, kind, name))
+    return merged
+
+
+def _signature(masked: str, text: str) -> str:
+    """Member text up to its opening brace, on one line, with the body collapsed."""
+    brace = masked.find("{")
+    head = text[:brace] if brace >= 0 else text
+    return " ".join(head.split()) + " { ... }"
+
+
+@lru_cache(maxsize=16)
+def _units(code: str) -> Tuple[Unit, ...]:
+    lines = code.splitlines(keepends=True)
+    masked = mask_source(code).splitlines(keepends=True)
+    try:
+        bodies = _bodies(code, lines)
+    except Exception as e:  # never block a review on the unit split
+        print("unit split failed:", e)
+        bodies = []
+
+    units: List[Unit] = []
+    skeleton: List[str] = []
+    pos = 0
+    contexts = enclosing_types_at(code, [a for a, _, _, _ in bodies])  # one scan, not one per body
+    for (a, b, kind, name), context in zip(bodies, contexts):
+        skeleton.extend(lines[pos:a - 1])
+        text = "".join(lines[a - 1:b])
+        indent = lines[a - 1][: len(lines[a - 1]) - len(lines[a - 1].lstrip())]
+        skeleton.append(indent + _signature("".join(masked[a - 1:b]), text) + "\n")
+        chunk = Chunk(0, a, b, text, context)
+        units.append(Unit(kind, name, chunk, make_key("unit", context, normalize(text))))
+        pos = b
+    skeleton.extend(lines[pos:])
+    decl_text = "".join(skeleton)
+    decl = Unit("declarations", "", Chunk(0, 1, max(1, len(lines)), decl_text, ""),
+                make_key("unit", normalize(decl_text)))
+    ordered = [decl] + units
+    return tuple(u._replace(chunk=u.chunk._replace(index=k)) for k, u in enumerate(ordered))
+
+
+def code_units(code: str) -> List[Unit]:
+    """Declarations unit first, then member bodies in file order."""
+    if not code or not code.strip():
+        return []
+    return list(_units(code))
@@ -0,0 +1,153 @@
+# pr_review.py
+"""
+Pull request review from a local git checkout.
+
+Reviews only what a change touched: the changed lines of every .java file plus
+their enclosing methods (core/review_scope.py). Findings and the suggested
+patch are limited to the changed lines, so cost follows the size of the diff.
+
+    python pr_review.py --base origin/main --head HEAD
+    python pr_review.py --patch pr.diff            # new side = the checked-out files
+    python pr_review.py --base main --patch-out suggestions.diff --fail-on High
+
+One JSON line per file goes to --out. The suggested edits of all files are
+written as one unified diff to --patch-out (apply with `git apply`).
+"""
+import argparse
+import json
+import re
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+SEVERITIES = ("Low", "Medium", "High")
+
+
+def git(repo: Path, *args: str) -> str:
+    proc = subprocess.run(["git", *args], cwd=repo, capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"git {' '.join(args)}: {proc.stderr.strip()}")
+    return proc.stdout
+
+
+def read_diff(args: argparse.Namespace, repo: Path) -> str:
+    if args.patch:
+        return Path(args.patch).read_text(encoding="utf-8", errors="replace")
+    revs = [args.base] + ([args.head] if args.head else [])
+    return git(repo, "diff", "-U0", "--no-color", "--no-ext-diff", "--diff-filter=AMR", *revs, "--", args.pattern)
+
+
+def read_new_side(repo: Path, head: Optional[str], path: str) -> str:
+    """File content on the new side of the diff: the head revision, or the working tree."""
+    if head:
+        return git(repo, "show", f"{head}:{path}")
+    raw = (repo / path).read_bytes()
+    try:
+        return raw.decode("utf-8")
+    except UnicodeDecodeError:
+        return raw.decode("latin-1")
+
+
+def severities(merged: str) -> List[str]:
+    return re.findall(r"Severity:\s*\**\s*(High|Medium|Low)", merged or "", re.I)
+
+
+def review_path(repo: Path, head: Optional[str], path: str, changed: List[Tuple[int, int]],
+                context_lines: int) -> Dict[str, Any]:
+    from core.clients import call_stats
+    from core.graph import workflow
+    from core.review_scope import make_scope, unified_patch
+    from core.schema import Response
+    from core.telemetry import span
+
+    started = time.time()
+    calls_before = call_stats()["calls"]
+    scope = make_scope(changed, context_lines)
+    rec: Dict[str, Any] = {"path": path, "changed_lines": scope["changed_lines"]}
+    try:
+        code = read_new_side(repo, head, path)
+        with span("review", kind="review", path=path, scoped=True) as sp:
+            rec["trace_id"] = sp.trace_id
+            final_state = workflow.invoke(Response(code_snippet=code, review_scope=scope))
+        merged = final_state.get("merge_guide_res", "") or ""
+        report = final_state.get("final_patch_report") or {}
+        rec["findings"] = merged
+        rec["severities"] = severities(merged)
+        rec["patch"] = unified_patch(code, final_state.get("final_updated_code") or code, path)
+        rec["scope"] = report.get("scope")
+        rec["compaction"] = final_state.get("compaction_report")
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"
+    rec["elapsed_s"] = round(time.time() - started, 3)
+    rec["calls"] = call_stats()["calls"] - calls_before  # approximate with several workers
+    return rec
+
+
+def run(args: argparse.Namespace) -> int:
+    from core.review_scope import parse_diff
+
+    repo = Path(args.repo).resolve()
+    if not args.patch and not args.base:
+        print("either --base (and optionally --head) or --patch is required")
+        return 2
+    files = {p: r for p, r in parse_diff(read_diff(args, repo)).items() if Path(p).match(args.pattern)}
+    changed_total = sum(b - a + 1 for ranges in files.values() for a, b in ranges)
+    print(f"{len(files)} changed files, {changed_total} changed lines")
+    if not files:
+        return 0
+
+    head = None if args.patch else args.head
+    with ThreadPoolExecutor(max_workers=max(1, args.workers)) as pool:
+        futures = [pool.submit(review_path, repo, head, p, r, args.context_lines) for p, r in sorted(files.items())]
+        records = [f.result() for f in futures]
+
+    failed = 0
+    worst = -1
+    with open(args.out, "w", encoding="utf-8") as out:
+        for rec in records:
+            out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            failed += 1 if rec.get("error") else 0
+            for sev in rec.get("severities", []):
+                worst = max(worst, SEVERITIES.index(sev.capitalize()))
+            scope = rec.get("scope") or {}
+            status = rec.get("error") or (
+                f"{len(rec['severities'])} findings, regions={scope.get('regions', 0)} "
+                f"edits kept={scope.get('edits_kept', 0)} dropped={scope.get('edits_dropped', 0)}"
+            )
+            print(f"{rec['path']}: {status} ({rec['elapsed_s']}s, {rec['calls']} calls)")
+    if args.patch_out:
+        with open(args.patch_out, "w", encoding="utf-8") as fh:
+            fh.write("".join(rec.get("patch", "") for rec in records))
+
+    if failed:
+        return 1
+    if args.fail_on != "none" and worst >= SEVERITIES.index(args.fail_on):
+        print(f"findings at or above {args.fail_on} severity")
+        return 3
+    return 0
+
+
+def main(argv=None) -> int:
+    from core.review_scope import SCOPE_CONTEXT_LINES
+
+    ap = argparse.ArgumentParser(description="Review only the code changed between two revisions.")
+    ap.add_argument("--repo", default=".", help="git checkout to review")
+    ap.add_argument("--base", help="base revision (e.g. origin/main)")
+    ap.add_argument("--head", help="head revision (default: the working tree)")
+    ap.add_argument("--patch", help="unified diff file instead of --base/--head; its new side must be checked out")
+    ap.add_argument("--pattern", default="*.java", help="file name glob")
+    ap.add_argument("--context-lines", type=int, default=SCOPE_CONTEXT_LINES,
+                    help="lines of context around each changed member")
+    ap.add_argument("--workers", type=int, default=4, help="files reviewed in parallel")
+    ap.add_argument("--out", default="pr_review.jsonl", help="JSONL results file (overwritten)")
+    ap.add_argument("--patch-out", help="write the suggested edits as one unified diff")
+    ap.add_argument("--fail-on", choices=("none",) + SEVERITIES, default="none",
+                    help="exit with status 3 when a finding has this severity or higher")
+    return run(ap.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,345 @@
+# service.py
+"""
+Local review job service: HTTP front end + durable SQLite queue + worker processes.
+
+    python service.py --port 8090 --workers 2
+
+Endpoints (JSON):
+  POST /jobs                 {"code": "..."}  -> 202 {"job_id", "status", "coalesced"}
+  GET  /jobs/<id>            status and timings
+  GET  /jobs/<id>/result     200 with the review once done, 202 while queued/running,
+                             ?wait=S long-polls up to S seconds
+  GET  /stats                queue counts
+
+The job id is sha256(code + review config), so identical submissions - concurrent or
+later - land on the same row (INSERT OR IGNORE): one in-flight run per id, and its
+result is served from the store afterwards. Workers claim jobs with a lease; a job
+whose worker died is picked up again once the lease expires (up to JOB_MAX_ATTEMPTS).
+A run where some LLM call failed or hit the budget (state "degraded") is recorded as
+failed with its fallback result, so the next identical submission runs it again.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from core.cache import make_key
+
+# -----------------------
+# CONFIG
+# -----------------------
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", str(Path(__file__).parent / ".cache" / "review_jobs.sqlite"))
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "900"))             # a running job is reclaimed after this
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", str(7 * 24 * 3600)))  # 0 = keep results forever
+JOB_POLL_INTERVAL = 0.25                                           # idle worker / long-poll sleep (s)
+MAX_CODE_BYTES = 2_000_000
+
+
+def review_config() -> Dict[str, Any]:
+    """Settings that change the review output; part of the job id."""
+    from core import clients, node, review_scope, routing, static_checks
+    return {
+        "model": clients.GROQ_MODEL, "stub": clients.USE_STUB,
+        "tiers": {t.name: [t.model, t.max_tokens] for t in routing.TIERS.values()}, "routes": routing.ROUTES,
+        "merge_mode": node.MERGE_MODE, "final_mode": node.FINAL_MODE,
+        "guideline_groups": node.GUIDELINE_GROUPS, "group_tokens": node.GROUP_TOKENS_PER_GUIDELINE,
+        "chunk_token_budget": node.CHUNK_TOKEN_BUDGET,
+        "compaction": node.COMPACTION, "slicing": node.SLICING,
+        "findings_cache": node.FINDINGS_CACHE_ENABLED and node.FINDINGS_PROMPT_VERSION,
+        "static_checks": static_checks.STATIC_CHECKS,
+        "apply_all_guidelines": node.APPLY_ALL_GUIDELINES, "max_findings": node.MAX_FINDINGS,
+        "scope_context_lines": review_scope.SCOPE_CONTEXT_LINES,
+        # a budget or hedging change decides which stages degrade to their fallbacks
+        "budget_s": node.REVIEW_BUDGET_S, "stage_budget": node.STAGE_BUDGET,
+        "hedge": [clients.HEDGE_PERCENTILE, clients.HEDGE_MIN_SAMPLES, clients.HEDGE_MIN_DELAY],
+        "guidelines": sorted(node.GUIDES),
+    }
+
+
+def job_id(code: str, config: Dict[str, Any]) -> str:
+    return make_key("review-job", code, config)
+
+
+# -----------------------
+# Job store
+# -----------------------
+class JobStore:
+    """SQLite job table shared by the HTTP process and the workers (WAL mode)."""
+
+    def __init__(self, path: str = JOB_DB_PATH):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        # isolation_level=None: explicit BEGIN IMMEDIATE where claims need it
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._lock = threading.RLock()  # one connection, shared by the HTTP handler threads
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, status TEXT NOT NULL, code TEXT NOT NULL, config TEXT NOT NULL, "
+            "result TEXT, error TEXT, attempts INTEGER NOT NULL DEFAULT 0, submissions INTEGER NOT NULL DEFAULT 1, "
+            "worker TEXT, lease_until REAL, created_at REAL NOT NULL, started_at REAL, finished_at REAL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs(status, created_at)")
+
+    def submit(self, code: str, config: Dict[str, Any]) -> Dict[str, Any]:
+        """Enqueue (or join) the job for this code+config. `coalesced` = an existing row was reused."""
+        with self._lock:
+            jid = job_id(code, config)
+            now = time.time()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                cur = self.conn.execute(
+                    "INSERT OR IGNORE INTO jobs(id, status, code, config, created_at) VALUES (?, 'queued', ?, ?, ?)",
+                    (jid, code, json.dumps(config, sort_keys=True), now),
+                )
+                coalesced = cur.rowcount == 0
+                if coalesced:
+                    # failed and expired results run again; queued/running/done are shared as-is
+                    stale = now - JOB_RESULT_TTL if JOB_RESULT_TTL else 0
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'queued', attempts = 0, result = NULL, error = NULL, "
+                        "created_at = ?, started_at = NULL, finished_at = NULL "
+                        "WHERE id = ? AND (status = 'failed' OR (status = 'done' AND finished_at < ?))",
+                        (now, jid, stale),
+                    )
+                    self.conn.execute("UPDATE jobs SET submissions = submissions + 1 WHERE id = ?", (jid,))
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            job = self.get(jid)
+            job["coalesced"] = coalesced
+            return job
+
+    def claim(self, worker: str) -> Optional[Dict[str, Any]]:
+        """Lease the oldest queued job (or one whose lease ran out)."""
+        with self._lock:
+            now = time.time()
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self.conn.execute(
+                    "SELECT id, code, attempts FROM jobs "
+                    "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                    "ORDER BY created_at LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if row is None:
+                    self.conn.execute("COMMIT")
+                    return None
+                jid, code, attempts = row
+                if attempts >= JOB_MAX_ATTEMPTS:
+                    self.conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, finished_at = ? WHERE id = ?",
+                        (f"gave up after {attempts} attempts (worker lost)", now, jid),
+                    )
+                    self.conn.execute("COMMIT")
+                    return self.claim(worker)
+                self.conn.execute(
+                    "UPDATE jobs SET status = 'running', worker = ?, lease_until = ?, attempts = attempts + 1, "
+                    "started_at = ? WHERE id = ?",
+                    (worker, now + JOB_LEASE_S, now, jid),
+                )
+                self.conn.execute("COMMIT")
+            except BaseException:
+                self.conn.execute("ROLLBACK")
+                raise
+            return {"id": jid, "code": code}
+
+    def finish(self, jid: str, worker: str, result: Optional[Dict[str, Any]], error: Optional[str]) -> None:
+        with self._lock:
+            # only the current lease holder may record the outcome
+            self.conn.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                ("failed" if error else "done", json.dumps(result, ensure_ascii=False) if result else None,
+                 error, time.time(), jid, worker),
+            )
+
+    def get(self, jid: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT id, status, error, attempts, submissions, created_at, started_at, finished_at, result "
+                "FROM jobs WHERE id = ?",
+                (jid,),
+            ).fetchone()
+            if row is None:
+                return None
+            keys = ("job_id", "status", "error", "attempts", "submissions", "created_at", "started_at", "finished_at")
+            job = dict(zip(keys, row[:-1]))
+            if with_result and row[-1]:
+                job["result"] = json.loads(row[-1])
+            return job
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self.conn.execute("SELECT status, COUNT(*), SUM(submissions) FROM jobs GROUP BY status").fetchall()
+            out = {status: count for status, count, _ in rows}
+            out["submissions"] = sum(subs or 0 for _, _, subs in rows)
+            return out
+
+
+# -----------------------
+# Workers
+# -----------------------
+def run_review(code: str) -> Dict[str, Any]:
+    from core.clients import call_stats
+    from core.graph import get_workflow
+    from core.schema import Response
+    from core.telemetry import span
+
+    started = time.time()
+    calls_before = call_stats()["calls"]
+    with span("review", kind="review") as sp:
+        final_state = get_workflow().invoke(Response(code_snippet=code))
+    return {
+        "merge_guide_res": final_state.get("merge_guide_res", "") or "",
+        "final_updated_code": final_state.get("final_updated_code", "") or "",
+        "final_patch_report": final_state.get("final_patch_report"),
+        "compaction_report": final_state.get("compaction_report"),
+        "unit_cache_report": final_state.get("unit_cache_report"),
+        "degraded": final_state.get("degraded") or [],
+        "trace_id": sp.trace_id,
+        "elapsed_s": round(time.time() - started, 3),
+        "calls": call_stats()["calls"] - calls_before,
+    }
+
+
+def worker_loop(db_path: str, name: str) -> None:
+    """Worker process: claim, review, record - until terminated."""
+    store = JobStore(db_path)
+    while True:
+        try:
+            job = store.claim(name)
+        except sqlite3.Error as e:
+            print(f"[{name}] claim failed:", e)
+            job = None
+        if job is None:
+            time.sleep(JOB_POLL_INTERVAL)
+            continue
+        result, error = None, None
+        try:
+            result = run_review(job["code"])
+            if result["degraded"]:
+                # stub/fallback output: keep it for this caller, but never share it with later submissions
+                error = "LLM calls failed or timed out for: " + ", ".join(result["degraded"])
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        store.finish(job["id"], name, result, error)
+
+
+def start_workers(db_path: str, count: int):
+    # spawn: workers must not inherit the HTTP server's threads or sockets
+    ctx = multiprocessing.get_context("spawn")
+    procs = []
+    for i in range(count):
+        p = ctx.Process(target=worker_loop, args=(db_path, f"worker-{os.getpid()}-{i}"), daemon=True)
+        p.start()
+        procs.append(p)
+    return procs
+
+
+# -----------------------
+# HTTP
+# -----------------------
+def make_handler(store: JobStore, config: Dict[str, Any]):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if self.path.rstrip("/") != "/jobs":
+                self._send(404, {"error": "not found"})
+                return
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_CODE_BYTES:
+                self._send(413, {"error": f"body larger than {MAX_CODE_BYTES} bytes"})
+                return
+            try:
+                code = json.loads(self.rfile.read(length) or b"{}").get("code")
+            except (json.JSONDecodeError, AttributeError):
+                code = None
+            if not isinstance(code, str) or not code.strip():
+                self._send(400, {"error": 'expected a JSON body {"code": "..."}'})
+                return
+            job = store.submit(code, config)
+            self._send(200 if job["status"] == "done" else 202, job)
+
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            parts = [p for p in path.split("/") if p]
+            if parts == ["stats"]:
+                self._send(200, store.stats())
+                return
+            if len(parts) not in (2, 3) or parts[0] != "jobs" or (len(parts) == 3 and parts[2] != "result"):
+                self._send(404, {"error": "not found"})
+                return
+            if len(parts) == 2:
+                job = store.get(parts[1])
+                self._send(200 if job else 404, job or {"error": "unknown job"})
+                return
+            params = dict(p.partition("=")[::2] for p in query.split("&") if p)
+            try:
+                wait = min(float(params.get("wait", 0)), 60.0)
+            except ValueError:
+                wait = 0.0
+            deadline = time.time() + wait
+            while True:
+                job = store.get(parts[1], with_result=True)
+                if job is None or job["status"] in ("done", "failed") or time.time() >= deadline:
+                    break
+                time.sleep(JOB_POLL_INTERVAL)
+            if job is None:
+                self._send(404, {"error": "unknown job"})
+            elif job["status"] == "done":
+                self._send(200, job)
+            elif job["status"] == "failed":
+                self._send(500, job)
+            else:
+                self._send(202, job)
+
+    return Handler
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Review job service (SQLite queue + worker processes)")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=int(os.getenv("SERVICE_PORT", "8090")))
+    ap.add_argument("--workers", type=int, default=int(os.getenv("SERVICE_WORKERS", "2")))
+    ap.add_argument("--db", default=JOB_DB_PATH, help="SQLite job database")
+    args = ap.parse_args(argv)
+
+    store = JobStore(args.db)
+    config = review_config()
+    procs = start_workers(args.db, args.workers)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, config))
+    print(f"review service on http://{args.host}:{args.port} ({args.workers} workers, db={args.db})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        for p in procs:
+            p.terminate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
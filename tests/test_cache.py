@@ -0,0 +1,154 @@
+# tests/test_cache.py
+import pytest
+
+from core import cache
+from core.cache import LRUCache, SqliteStore, TieredCache, make_key
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache.time, "time", clock)
+    return clock
+
+
+def _store(tmp_path, **kw):
+    return SqliteStore(str(tmp_path / "cache.sqlite"), **kw)
+
+
+def _accessed_at(store, key):
+    (row,) = store._conn.execute(f"SELECT accessed_at FROM {store.table} WHERE key = ?", (key,))
+    return row[0]
+
+
+def test_make_key_is_stable_and_order_sensitive():
+    assert make_key("a", 1, {"x": [1, 2]}) == make_key("a", 1, {"x": [1, 2]})
+    assert make_key("a", "b") != make_key("b", "a")
+
+
+# -----------------------
+# Memory tier
+# -----------------------
+def test_lru_evicts_the_least_recently_used(clock):
+    lru = LRUCache(maxsize=2, ttl=0)
+    lru.put("a", 1)
+    lru.put("b", 2)
+    assert lru.get("a") == 1  # "b" is now the oldest
+    assert lru.put("c", 3) == 1
+    assert (lru.get("a"), lru.get("b"), lru.get("c")) == (1, None, 3)
+    assert LRUCache(maxsize=0).put("a", 1) == 0
+
+
+def test_lru_ttl(clock):
+    lru = LRUCache(maxsize=4, ttl=10)
+    lru.put("a", 1)
+    clock.now += 10
+    assert lru.get("a") == 1
+    clock.now += 1
+    assert lru.get("a") is None and len(lru) == 0
+
+
+# -----------------------
+# Disk tier
+# -----------------------
+def test_sqlite_round_trip_and_ttl(tmp_path, clock):
+    store = _store(tmp_path, ttl=60)
+    store.put("k", {"v": [1, "two"]})
+    assert store.get("k") == {"v": [1, "two"]}
+    assert store.get("missing") is None
+    clock.now += 61
+    assert store.get("k") is None
+    assert store._conn.execute("SELECT COUNT(*) FROM llm_cache").fetchone() == (0,)
+
+
+def test_sqlite_evicts_expired_then_least_recently_accessed(tmp_path, clock):
+    store = _store(tmp_path, max_entries=2, ttl=1000)
+    store.put("old", 0)
+    clock.now += 900
+    for key in ("a", "b", "c"):
+        store.put(key, key)
+        clock.now += 1
+    clock.now += 200  # "old" has expired
+    assert store.evict() == 2  # "old" by TTL, then "a" as the least recently accessed
+    assert store.get_many(["old", "a", "b", "c"]) == {"b": "b", "c": "c"}
+
+
+def test_sqlite_disk_hits_are_touched_in_batches(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(cache, "_TOUCH_BATCH", 3)
+    store = _store(tmp_path, ttl=0)
+    store.put_many([(k, k) for k in "abcd"])
+    written = _accessed_at(store, "a")
+
+    clock.now += cache._TOUCH_AFTER_S - 1
+    store.get("a")  # read again soon after: nothing to write
+    assert store._touches == {}
+
+    clock.now += 1
+    store.get("a")
+    store.get("b")
+    assert set(store._touches) == {"a", "b"}
+    assert _accessed_at(store, "a") == written  # queued, not yet written
+    store.get("c")  # a full batch: flushed
+    assert store._touches == {}
+    assert _accessed_at(store, "a") == clock.now
+
+    clock.now += cache._TOUCH_AFTER_S
+    store.get("d")
+    store.put("e", "e")  # the next write carries pending touches along
+    assert store._touches == {} and _accessed_at(store, "d") == clock.now
+
+
+def test_touched_rows_survive_lru_eviction(tmp_path, clock, monkeypatch):
+    monkeypatch.setattr(cache, "_TOUCH_BATCH", 100)
+    store = _store(tmp_path, max_entries=1, ttl=0)
+    store.put("a", 1)
+    clock.now += 1
+    store.put("b", 2)
+    clock.now += cache._TOUCH_AFTER_S
+    store.get("a")  # pending touch, flushed by evict() before it picks a victim
+    assert store.evict() == 1
+    assert store.get_many(["a", "b"]) == {"a": 1}
+
+
+def test_get_many_and_put_many_span_the_500_key_split(tmp_path, clock):
+    store = _store(tmp_path, max_entries=10_000, ttl=0)
+    items = [(f"k{n}", n) for n in range(1234)]
+    store.put_many(items)
+    keys = [k for k, _ in items] + ["nope"]
+    assert store.get_many(keys) == dict(items)
+
+
+# -----------------------
+# Two tiers
+# -----------------------
+def test_tiered_counters(tmp_path, clock):
+    tiered = TieredCache(LRUCache(maxsize=1, ttl=0), _store(tmp_path, ttl=0))
+    tiered.put("a", 1)
+    tiered.put("b", 2)  # pushes "a" out of memory
+    assert tiered.get("b") == 2  # memory hit
+    assert tiered.get("a") == 1  # disk hit, promoted (evicting "b" from memory)
+    assert tiered.get("c") is None
+    assert tiered.get_many(["a", "b", "c", "a"]) == {"a": 1, "b": 2}
+    tiered.get_many(["c"], count=False)
+    stats = tiered.stats()
+    assert {k: stats[k] for k in ("memory_hits", "disk_hits", "misses", "writes")} == \
+        {"memory_hits": 2, "disk_hits": 2, "misses": 2, "writes": 2}
+    assert stats["evictions"] == 3
+    assert stats["hit_rate"] == round(4 / 6, 4) and stats["memory_entries"] == 1
+
+
+def test_tiered_without_disk(clock):
+    tiered = TieredCache(LRUCache(maxsize=4, ttl=0), None)
+    tiered.put_many([("a", 1), ("b", 2)])
+    assert tiered.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+    tiered.clear()
+    assert tiered.get("a") is None
+    assert tiered.stats()["writes"] == 2
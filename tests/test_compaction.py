@@ -0,0 +1,86 @@
+# tests/test_compaction.py
+import pytest
+
+from core import compaction, node
+from core.compaction import Compacted, compact_source, policy_for, remap_line_refs
+from core.java_source import Chunk
+
+CODE = """\
+/*
+ * License header.
+ */
+package demo;
+
+import java.util.List;
+
+public class Box {
+    // the items
+    private List<String> items;
+
+    public int size() {
+        return items.size();
+    }
+}
+"""
+
+
+@pytest.fixture(autouse=True)
+def compaction_on(monkeypatch):
+    monkeypatch.setattr(compaction, "COMPACTION", True)
+
+
+def test_compact_line_map_points_at_the_original_lines():
+    c = compact_source(CODE, policy_for(["G04"]))
+    lines = c.text.splitlines()
+    originals = CODE.splitlines()
+    assert len(lines) == len(c.line_map)
+    for text, orig in zip(lines, c.line_map):
+        assert text.strip() == originals[orig - 1].strip()
+    assert "License" not in c.text and "import" not in c.text
+
+
+def test_remap_single_lines_and_ranges():
+    c = Compacted("a\nb\nc\n", line_map=[4, 10, 12])
+    text = "Issue at line 2; see lines 1-3 and Lines 2 to 3."
+    assert remap_line_refs(text, c) == "Issue at line 10; see lines 4-12 and Lines 10-12."
+
+
+def test_remap_adds_the_chunk_offset():
+    c = Compacted("a\nb\n", line_map=[1, 3])
+    assert remap_line_refs("line 2", c, first_line=101) == "line 103"
+
+
+def test_remap_leaves_numbers_outside_the_compact_text():
+    c = Compacted("a\nb\n", line_map=[5, 9])
+    # the model already counted in file lines: nothing to map
+    assert remap_line_refs("line 40 and lines 1-7", c) == "line 40 and lines 1-7"
+    assert remap_line_refs("", c) == ""
+
+
+def test_remap_through_real_compaction():
+    c = compact_source(CODE, policy_for(["G04"]))
+    k = next(n for n, ln in enumerate(c.text.splitlines(), start=1) if "return items.size()" in ln)
+    assert remap_line_refs(f"Area: size (line {k})", c) == "Area: size (line 13)"
+
+
+def test_chunk_labels_leave_out_file_lines_when_compacting(monkeypatch):
+    monkeypatch.setattr(node, "COMPACTION", True)
+    body = "".join(f"    int f{k} = {k};\n\n" for k in range(20))
+    chunks = [Chunk(0, 1, 2, "class A {\n\n", ""), Chunk(1, 3, 42, body, "class A")]
+    state = {"code_snippet": "class A {\n\n" + body}
+    labels = node._review_labels(state, chunks)
+    assert labels[1] == "chunk 2/2, inside class A"  # no "lines 3-42" for the model to cite
+    prompt = node.build_guideline_prompt("G04", "t", "d", node._compact_text(state, chunks[1], ["G04"]),
+                                         chunk_label=labels[1])
+    assert "lines 3-" not in prompt
+    # the final transform gets the original text, so its labels keep the file range
+    assert "lines 3-42" in node._chunk_labels(state, chunks)[1]
+
+
+def test_remap_for_a_chunk_that_does_not_start_at_line_1():
+    # blank lines are dropped: compact line 6 is file line 3 + 2 * 5 = 13
+    body = "".join(f"    int f{k} = {k};\n\n" for k in range(20))
+    chunk = Chunk(1, 3, 42, body, "class A")
+    (raw,) = node._remap_raws(["- Area: f5 (line 6)"], [chunk], ["G04"])
+    assert raw == "- Area: f5 (line 13)"
+    assert body.splitlines()[13 - 3].strip() == "int f5 = 5;"
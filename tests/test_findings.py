@@ -0,0 +1,83 @@
+# tests/test_findings.py
+from core.findings import Finding, dedupe_findings, parse_findings
+
+REPLY = """\
+[lines 10-40]
+- Finding: Public mutable field count
+- Area: field count in Counter (line 12)
+- Severity: High
+- Confidence: 4
+- Issue: count can be changed by any caller.
+- Fix: Make count private.
+- Patch (optional): ```java
+  private int count;
+  ```
+- Finding: Missing final on constant
+- Area: field MAX in Counter
+- Severity: medium
+- Confidence: 9
+- Issue: MAX is never reassigned.
+- Fix: Declare MAX final.
+"""
+
+
+def test_parse_reads_every_field_and_the_chunk_tag():
+    first, second = parse_findings(REPLY, "G07")
+    assert first.guideline == "G07"
+    assert first.title == "Public mutable field count"
+    assert first.area == "field count in Counter (line 12)"
+    assert (first.severity, first.confidence) == ("High", 4)
+    assert first.fix == "Make count private."
+    assert first.patch == "private int count;"
+    assert first.lines == "10-40"
+    # severity is normalized, confidence clamped to 1..5, no patch stays None
+    assert (second.severity, second.confidence, second.patch) == ("Medium", 5, None)
+    assert second.lines == "10-40"
+
+
+def test_parse_tolerates_markdown_and_unlabelled_patch_fences():
+    text = (
+        "1. **Title:** Use try-with-resources\n"
+        "2. **Area:** method read\n"
+        "3. **Fix:** Wrap the stream.\n"
+        "```java\n"
+        "try (InputStream in = open()) { use(in); }\n"
+        "```\n"
+    )
+    (f,) = parse_findings(text, "G05")
+    assert f.title == "Use try-with-resources"
+    assert f.area == "method read"
+    assert f.patch == "try (InputStream in = open()) { use(in); }"
+
+
+def test_parse_drops_placeholder_patches_and_unparseable_text():
+    (f,) = parse_findings("- Finding: Stub\n- Patch (optional): ```java\n  // minimal snippet\n  ```\n", "G01")
+    assert f.patch is None
+    assert parse_findings("NO_FINDINGS", "G01") == []
+    assert parse_findings("", "G01") == []
+
+
+def test_dedupe_folds_the_same_patch_across_guidelines():
+    a = Finding("G04", "Expose a copy", area="method getItems", severity="Medium",
+                patch="return List.copyOf(items);")
+    b = Finding("G07", "Return an unmodifiable view", area="getItems()", severity="High",
+                patch="return  List.copyOf(items);")
+    kept = dedupe_findings([a, b])
+    assert kept == [b]  # the higher-ranked copy survives
+    assert b.related == ["G04"]
+
+
+def test_dedupe_folds_repeated_wording_only_within_one_guideline():
+    a = Finding("G03", "Null check missing", area="method load", fix="Check name for null.")
+    b = Finding("G03", "Null check missing", area="load", fix="Check name for null!")
+    c = Finding("G09", "Null check missing", area="load", fix="Check name for null.")
+    kept = dedupe_findings([a, b, c])
+    assert len(kept) == 2
+    assert {f.guideline for f in kept} == {"G03", "G09"}
+
+
+def test_dedupe_keeps_findings_in_different_areas_and_fillers():
+    a = Finding("G02", "Hoist size()", area="method sum", patch="int n = xs.size();")
+    b = Finding("G02", "Hoist size()", area="method avg", patch="int n = xs.size();")
+    stub = Finding("G02", "Minimal suggestion", area="method sum", patch="int n = xs.size();")
+    assert len(dedupe_findings([a, b, stub])) == 3
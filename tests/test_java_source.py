@@ -0,0 +1,52 @@
+# tests/test_java_source.py
+from core.java_source import CHARS_PER_TOKEN, chunk_source
+
+METHOD = """\
+    public int m{n}(int x) {{
+        int y = x * {n};
+        return y + {n};
+    }}
+
+"""
+
+CODE = (
+    "package demo;\n\n"
+    "public class Big {\n"
+    + "".join(METHOD.format(n=n) for n in range(40))
+    + "}\n"
+)
+
+
+def test_small_code_is_one_chunk():
+    (chunk,) = chunk_source("class A {}\n", 1000)
+    assert (chunk.index, chunk.start_line, chunk.end_line) == (0, 1, 1)
+    assert chunk_source("", 1000) == []
+
+
+def test_chunks_rejoin_to_the_source_with_contiguous_lines():
+    chunks = chunk_source(CODE, 100)
+    assert len(chunks) > 1
+    assert "".join(c.text for c in chunks) == CODE
+    assert chunks[0].start_line == 1 and chunks[-1].end_line == len(CODE.splitlines())
+    for prev, cur in zip(chunks, chunks[1:]):
+        assert cur.start_line == prev.end_line + 1
+        assert cur.index == prev.index + 1
+    for c in chunks:
+        assert c.text.count("\n") == c.end_line - c.start_line + 1
+
+
+def test_chunks_stay_in_budget_and_cut_between_members():
+    chunks = chunk_source(CODE, 100)
+    for c in chunks:
+        assert len(c.text) <= 100 * CHARS_PER_TOKEN
+        # no method is split: each chunk ends after a closing brace or a blank line
+        assert c.text.rstrip("\n").splitlines()[-1].strip() in ("}", "")
+    assert all("class Big" in c.context for c in chunks[1:])
+
+
+def test_oversized_member_is_split_at_line_boundaries():
+    body = "".join(f"        int v{k} = {k};\n" for k in range(200))
+    code = "class Huge {\n    void run() {\n" + body + "    }\n}\n"
+    chunks = chunk_source(code, 50)
+    assert "".join(c.text for c in chunks) == code
+    assert all(len(c.text) <= 50 * CHARS_PER_TOKEN for c in chunks)
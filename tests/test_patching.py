@@ -0,0 +1,79 @@
+# tests/test_patching.py
+from core.patching import apply_patch, looks_like_diff, parse_unified_diff
+
+SOURCE = "\n".join(f"line {k}" for k in range(1, 21)) + "\n"
+
+
+def test_parse_skips_file_headers_and_context_only_hunks():
+    diff = (
+        "--- a/Foo.java\n+++ b/Foo.java\n"
+        "@@ -2,2 +2,2 @@\n line 2\n-line 3\n+LINE 3\n"
+        "@@ -8,1 +8,1 @@\n line 8\n"
+    )
+    hunks = parse_unified_diff(diff)
+    assert len(hunks) == 1
+    assert hunks[0].old_start == 2
+    assert hunks[0].lines == [(" ", "line 2"), ("-", "line 3"), ("+", "LINE 3")]
+
+
+def test_applies_hunks_in_file_order_whatever_the_reply_order():
+    diff = (
+        "@@ -15,2 +15,2 @@\n line 15\n-line 16\n+LINE 16\n"
+        "@@ -3,2 +3,2 @@\n line 3\n-line 4\n+LINE 4\n"
+    )
+    patched, report = apply_patch(SOURCE, diff)
+    assert report["applied"] == 2 and report["rejected"] == []
+    assert "LINE 4\n" in patched and "LINE 16\n" in patched
+    assert patched.count("\n") == SOURCE.count("\n")
+
+
+def test_wrong_line_numbers_are_placed_by_content():
+    patched, report = apply_patch(SOURCE, "@@ -1,2 +1,2 @@\n line 9\n-line 10\n+LINE 10\n")
+    assert report["applied"] == 1
+    assert "line 9\nLINE 10\nline 11" in patched
+
+
+def test_overlapping_hunk_is_rejected_and_reported():
+    diff = (
+        "@@ -5,2 +5,2 @@\n line 5\n-line 6\n+A\n"
+        "@@ -6,1 +6,1 @@\n-line 6\n+B\n"
+    )
+    patched, report = apply_patch(SOURCE, diff)
+    assert report["applied"] == 1
+    assert [r["hunk"] for r in report["rejected"]] == [2]
+    assert "overlaps" in report["rejected"][0]["reason"]
+
+
+def test_unplaceable_hunk_is_rejected_others_still_apply():
+    diff = (
+        "@@ -2,1 +2,1 @@\n-no such line\n+X\n"
+        "@@ -7,1 +7,1 @@\n-line 7\n+LINE 7\n"
+    )
+    patched, report = apply_patch(SOURCE, diff)
+    assert report["applied"] == 1 and report["rejected"][0]["hunk"] == 1
+    assert "LINE 7" in patched
+
+
+def test_whitespace_insensitive_and_fuzzy_match():
+    diff = "@@ -11,3 +11,3 @@\n  line   11\n-line 12\n+LINE 12\n changed context\n"
+    patched, report = apply_patch(SOURCE, diff)
+    assert report["applied"] == 1 and report["fuzzy"] == 1
+    assert "line 11\nLINE 12\nline 13" in patched
+
+
+def test_crlf_line_endings_are_kept():
+    source = SOURCE.replace("\n", "\r\n")
+    patched, report = apply_patch(source, "@@ -3,2 +3,2 @@\n line 3\n-line 4\n+LINE 4\n")
+    assert report["applied"] == 1
+    assert "line 3\r\nLINE 4\r\nline 5" in patched
+    assert patched.endswith("\r\n") and "\n" not in patched.replace("\r\n", "")
+
+
+def test_pure_insertion_uses_line_number():
+    patched, _ = apply_patch(SOURCE, "@@ -2,0 +3,1 @@\n+inserted\n")
+    assert "line 2\ninserted\nline 3" in patched
+
+
+def test_looks_like_diff():
+    assert looks_like_diff("```diff\n@@ -1 +1 @@\n-a\n+b\n```")
+    assert not looks_like_diff("public class A {}")
@@ -0,0 +1,185 @@
+# tests/test_ratelimit.py
+import asyncio
+import email.utils
+import threading
+import time
+
+import pytest
+
+from core import ratelimit
+from core.ratelimit import RateLimiter, TokenBucket, _parse_duration, estimate_tokens, retry_after
+
+
+class RateLimited(Exception):
+    def __init__(self, message="rate limit exceeded", headers=None):
+        super().__init__(message)
+        self.status_code = 429
+        self.response = type("Resp", (), {"headers": headers or {}, "status_code": 429})()
+
+
+# -----------------------
+# Retry hints
+# -----------------------
+@pytest.mark.parametrize("value, seconds", [
+    ("7", 7.0), ("7.5s", 7.5), ("1m30.5s", 90.5), ("120ms", 0.12), ("1h", 3600.0), ("2m", 120.0),
+])
+def test_parse_duration(value, seconds):
+    assert _parse_duration(value) == pytest.approx(seconds)
+
+
+@pytest.mark.parametrize("value", ["", "soon", "ms"])
+def test_parse_duration_rejects_garbage(value):
+    assert _parse_duration(value) is None
+
+
+def test_retry_after_header_wins():
+    exc = RateLimited(headers={"retry-after": "3", "x-ratelimit-reset-tokens": "20s"})
+    assert retry_after(exc) == 3.0
+
+
+def test_retry_after_http_date():
+    when = email.utils.formatdate(time.time() + 30, usegmt=True)
+    assert 25 <= retry_after(RateLimited(headers={"retry-after": when})) <= 31
+
+
+def test_retry_after_uses_the_longest_reset_header_on_a_429():
+    exc = RateLimited(headers={"x-ratelimit-reset-requests": "2s", "x-ratelimit-reset-tokens": "1m6s"})
+    assert retry_after(exc) == 66.0
+
+
+def test_retry_after_from_the_message():
+    assert retry_after(Exception("Rate limit reached. Please try again in 7.66s.")) == pytest.approx(7.66)
+    assert retry_after(Exception("connection reset")) is None
+
+
+def test_estimate_books_the_expected_share_of_max_tokens(monkeypatch):
+    monkeypatch.setattr(ratelimit, "LLM_EXPECTED_OUTPUT", 0.5)
+    assert estimate_tokens("x" * 400, 200) == 101 + 100
+    assert estimate_tokens("", 0) == 1
+
+
+# -----------------------
+# Token bucket
+# -----------------------
+def test_reserve_books_ahead_and_returns_the_wait():
+    bucket = TokenBucket(60)  # 1 unit per second
+    now = bucket.updated
+    assert bucket.reserve(60, now) == 0.0
+    assert bucket.reserve(3, now) == pytest.approx(3.0)  # queued behind the full booking
+    assert bucket.reserve(1, now + 3) == pytest.approx(1.0)
+
+
+def test_reserve_is_capped_at_capacity_and_unlimited_is_free():
+    bucket = TokenBucket(60)
+    assert bucket.reserve(1000, bucket.updated) == 0.0  # one oversized call may still run
+    assert TokenBucket(0).reserve(10 ** 6, time.monotonic()) == 0.0
+
+
+def test_refund_and_drain():
+    bucket = TokenBucket(60)
+    now = bucket.updated
+    bucket.reserve(50, now)
+    bucket.refund(30)
+    assert bucket.balance == pytest.approx(40)
+    bucket.refund(1000)
+    assert bucket.balance == 60  # never above capacity
+    bucket.drain(now)
+    assert bucket.balance == 0
+    assert bucket.reserve(6, now) == pytest.approx(6.0)
+
+
+def test_release_settles_the_booking_against_real_usage():
+    limiter = RateLimiter(rpm=0, tpm=600)
+    limiter.acquire(200)
+    assert limiter.tokens.balance == pytest.approx(400, abs=1)
+    limiter.release(booked=200, used=50)
+    assert limiter.tokens.balance == pytest.approx(550, abs=1)
+    limiter.acquire(100)
+    limiter.release(booked=100, used=0)  # unknown usage: the estimate stands
+    assert limiter.tokens.balance == pytest.approx(450, abs=1)
+
+
+# -----------------------
+# AIMD + pause
+# -----------------------
+def test_429_halves_the_window_and_successes_grow_it():
+    limiter = RateLimiter(rpm=0, tpm=0, min_concurrency=1, max_concurrency=8)
+    limiter.acquire(1)
+    limiter.release(RateLimited())
+    assert limiter.snapshot()["concurrency_limit"] == 4
+    for _ in range(3):
+        limiter.acquire(1)
+        limiter.release()
+    assert limiter.snapshot()["concurrency_limit"] == 4
+    limiter.acquire(1)
+    limiter.release()  # a full window (4) of successes: +1
+    assert limiter.snapshot()["concurrency_limit"] == 5
+
+
+def test_window_never_drops_below_the_minimum_and_neutral_release_is_neutral():
+    limiter = RateLimiter(rpm=0, tpm=0, min_concurrency=2, max_concurrency=4)
+    for _ in range(5):
+        limiter.acquire(1)
+        limiter.release(RateLimited())
+    assert limiter.snapshot()["concurrency_limit"] == 2
+    limiter.acquire(1)
+    limiter.release(success=False)
+    assert limiter._successes == 0 and limiter.snapshot()["in_flight"] == 0
+
+
+def test_429_hint_pauses_admission():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    limiter.acquire(1)
+    limiter.release(RateLimited(headers={"retry-after": "0.2"}))
+    assert limiter.snapshot()["paused_for_s"] > 0
+    waited = limiter.acquire(1)
+    assert waited >= 0.15
+    limiter.release()
+
+
+def test_full_window_blocks_until_a_release():
+    limiter = RateLimiter(rpm=0, tpm=0, min_concurrency=1, max_concurrency=1)
+    limiter.acquire(1)
+    threading.Timer(0.1, limiter.release).start()
+    assert limiter.acquire(1) >= 0.08
+
+
+# -----------------------
+# Async waiters
+# -----------------------
+def test_aacquire_is_woken_by_a_release_from_another_thread():
+    limiter = RateLimiter(rpm=0, tpm=0, min_concurrency=1, max_concurrency=1)
+
+    async def main():
+        limiter.acquire(1)  # the only slot, held by "another thread"
+        threading.Timer(0.1, limiter.release).start()
+        return await asyncio.wait_for(limiter.aacquire(1), timeout=2)
+
+    waited = asyncio.run(main())
+    assert 0.08 <= waited < 1.0
+    assert limiter.snapshot()["in_flight"] == 1
+
+
+def test_aacquire_waits_out_a_pause_without_a_release():
+    limiter = RateLimiter(rpm=0, tpm=0)
+    limiter.paused_until = time.monotonic() + 0.15
+    waited = asyncio.run(asyncio.wait_for(limiter.aacquire(1), timeout=2))
+    assert waited >= 0.1
+
+
+def test_aacquire_serves_every_waiter():
+    limiter = RateLimiter(rpm=0, tpm=0, min_concurrency=2, max_concurrency=2)
+    peak = 0
+
+    async def job():
+        nonlocal peak
+        await limiter.aacquire(1)
+        peak = max(peak, limiter.in_flight)
+        await asyncio.sleep(0.005)
+        limiter.release(success=False)
+
+    async def main():
+        await asyncio.wait_for(asyncio.gather(*(job() for _ in range(20))), timeout=5)
+
+    asyncio.run(main())
+    assert peak == 2 and limiter.in_flight == 0
@@ -0,0 +1,67 @@
+# tests/test_review_scope.py
+from core.review_scope import make_scope, parse_diff, restrict_edits
+
+DIFF = """\
+diff --git a/src/Foo.java b/src/Foo.java
+--- a/src/Foo.java
++++ b/src/Foo.java
+@@ -3,4 +3,5 @@ class Foo {
+ a
+-b
++B
++B2
+ c
+ d
+@@ -20,3 +21,2 @@
+ x
+-y
+ z
+--- a/src/Gone.java
++++ /dev/null
+@@ -1,2 +0,0 @@
+-class Gone {
+-}
+"""
+
+
+def test_parse_diff_maps_changes_to_new_side_lines():
+    # B/B2 are new lines 4-5; deleting y marks the line after x (new line 22)
+    assert parse_diff(DIFF) == {"src/Foo.java": [(4, 5), (22, 22)]}
+
+
+def test_parse_diff_handles_zero_context_deletions_and_no_newline_markers():
+    diff = (
+        "+++ b/A.java\n"
+        "@@ -7 +6,0 @@\n-gone\n"
+        "@@ -10 +10 @@\n-old\n\\ No newline at end of file\n+new\n"
+    )
+    assert parse_diff(diff) == {"A.java": [(7, 7), (10, 10)]}
+
+
+def test_parse_diff_of_nothing_is_empty():
+    assert parse_diff("") == {}
+    assert parse_diff("+++ b/A.java\n") == {}
+
+
+ORIGINAL = "".join(f"line {k}\n" for k in range(1, 11))
+
+
+def test_restrict_edits_keeps_only_edits_at_changed_lines():
+    updated = ORIGINAL.replace("line 2\n", "LINE 2\n").replace("line 8\n", "LINE 8\n")
+    out, stats = restrict_edits(ORIGINAL, updated, make_scope([(7, 9)]))
+    assert "LINE 8\n" in out and "line 2\n" in out
+    assert stats == {"edits_kept": 1, "edits_dropped": 1}
+
+
+def test_restrict_edits_keeps_insertions_next_to_a_changed_line():
+    updated = ORIGINAL.replace("line 5\n", "line 5\nadded\n").replace("line 1\n", "line 1\nfar\n")
+    out, stats = restrict_edits(ORIGINAL, updated, make_scope([(5, 5)]))
+    assert out == ORIGINAL.replace("line 5\n", "line 5\nadded\n")
+    assert stats == {"edits_kept": 1, "edits_dropped": 1}
+
+
+def test_restrict_edits_without_changed_lines_reverts_everything():
+    updated = ORIGINAL.replace("line 3\n", "")
+    out, stats = restrict_edits(ORIGINAL, updated, make_scope([]))
+    assert out == ORIGINAL
+    assert stats == {"edits_kept": 0, "edits_dropped": 1}
@@ -0,0 +1,106 @@
+# tests/test_routing.py
+import asyncio
+import time
+
+import pytest
+
+from core import clients, routing
+from core.ratelimit import get_limiter
+from core.routing import DEFAULT_TIER, GROQ_MODEL, SMALL_MODEL, Tier, parse_routes, parse_tiers, tier_for
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    tiers = parse_tiers("small=tiny-model:500:20;fast=mid-model;huge=big-model::300")
+    monkeypatch.setattr(routing, "TIERS", tiers)
+    return tiers
+
+
+def test_parse_tiers_extends_the_built_in_tiers():
+    assert parse_tiers("") == {
+        DEFAULT_TIER: Tier(DEFAULT_TIER, GROQ_MODEL),
+        "small": Tier("small", SMALL_MODEL, 800, 30.0),
+    }
+    tiers = parse_tiers(" Fast = mid-model : 600 ; huge=big-model::300;;")
+    assert tiers["fast"] == Tier("fast", "mid-model", 600, None)
+    assert tiers["huge"] == Tier("huge", "big-model", None, 300.0)
+    assert tiers[DEFAULT_TIER].model == GROQ_MODEL
+
+
+def test_parse_tiers_ignores_incomplete_entries():
+    assert set(parse_tiers("=model;nomodel=;junk")) == {DEFAULT_TIER, "small"}
+
+
+def test_tier_caps_max_tokens():
+    assert Tier("t", "m", 500).cap(1500) == 500
+    assert Tier("t", "m").cap(1500) == 1500
+    assert Tier("t", GROQ_MODEL).limiter_key == "default"
+    assert Tier("t", "other").limiter_key == "groq:other"
+
+
+def test_parse_routes_normalizes_names_and_drops_unknown_tiers(tiers):
+    routes = parse_routes("g09=small; G10=FAST,Merge=huge,final=nope,G01=")
+    assert routes == {"G09": "small", "G10": "fast", "merge": "huge"}
+    assert parse_routes("") == {}
+
+
+def test_tier_for_routes_guidelines_and_groups(tiers, monkeypatch):
+    monkeypatch.setattr(routing, "ROUTES", parse_routes("G09=small,G10=small,G08=fast,merge=huge"))
+    assert tier_for(None) is tiers[DEFAULT_TIER]
+    assert tier_for("G09").model == "tiny-model"
+    assert tier_for("merge").name == "huge"
+    assert tier_for("G01").name == DEFAULT_TIER
+    assert tier_for("G09+G10").name == "small"  # every member agrees
+    assert tier_for("G09+G08").name == DEFAULT_TIER
+    assert tier_for("G09+G01").name == DEFAULT_TIER
+
+
+def test_failover_model_needs_a_base_url(monkeypatch):
+    tier = Tier("t", "m")
+    monkeypatch.setattr(routing, "FAILOVER_BASE_URL", "")
+    assert routing.failover_model(tier) is None
+    monkeypatch.setattr(routing, "FAILOVER_BASE_URL", "http://localhost:8000/v1")
+    monkeypatch.setattr(routing, "FAILOVER_MODEL", "")
+    assert routing.failover_model(tier) == "m"
+    monkeypatch.setattr(routing, "FAILOVER_MODEL", "local-model")
+    assert routing.failover_model(tier) == "local-model"
+
+
+# -----------------------
+# Failover without a usable client
+# -----------------------
+class FakeClient:
+    def __init__(self):
+        self.calls = 0
+
+    def invoke(self, input, max_tokens, temperature):
+        self.calls += 1
+        return {"content": "ok"}
+
+    async def ainvoke(self, input, max_tokens, temperature):
+        return self.invoke(input, max_tokens, temperature)
+
+
+@pytest.fixture
+def paused_primary_without_failover(monkeypatch):
+    """A failover model is configured but its client cannot be built, and the primary is paused."""
+    fake = FakeClient()
+    monkeypatch.setattr(clients, "USE_STUB", False)
+    monkeypatch.setattr(clients, "_override", fake)
+    monkeypatch.setattr(clients, "_clients", {})
+    monkeypatch.setattr(clients, "_build_failover_client", lambda model, timeout=None: None)
+    monkeypatch.setattr(clients, "get_response_cache", lambda: None)
+    monkeypatch.setattr(routing, "FAILOVER_BASE_URL", "http://localhost:8000/v1")
+    limiter = get_limiter(routing.TIERS[DEFAULT_TIER].limiter_key)
+    monkeypatch.setattr(limiter, "paused_until", time.monotonic() + 0.1)
+    return fake
+
+
+def test_paused_primary_is_retried_when_the_failover_client_is_missing(paused_primary_without_failover):
+    assert clients.invoke("p", max_tokens=10) == {"content": "ok"}
+    assert paused_primary_without_failover.calls == 1
+
+
+def test_async_paused_primary_is_retried_when_the_failover_client_is_missing(paused_primary_without_failover):
+    assert asyncio.run(clients.ainvoke("p", max_tokens=10)) == {"content": "ok"}
+    assert paused_primary_without_failover.calls == 1
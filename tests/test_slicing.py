@@ -0,0 +1,88 @@
+# tests/test_slicing.py
+import pytest
+
+from core import slicing
+from core.java_source import Chunk
+from core.slicing import empty_slices, slice_chunk, slice_lines
+
+CODE = """\
+import java.util.List;
+
+public class Account {
+    private String id;
+
+    public String getId() {
+        return id;
+    }
+
+    public void load() throws IOException {
+        read();
+    }
+
+    public void save() {
+        try {
+            write();
+        } catch (IOException e) {
+            log(e);
+        }
+    }
+
+    private int twice(int n) {
+        return n * 2;
+    }
+}
+"""
+
+
+def _text(lines):
+    src = CODE.splitlines()
+    return [src[k - 1].strip() for k in sorted(lines)]
+
+
+@pytest.fixture(autouse=True)
+def slicing_on(monkeypatch):
+    monkeypatch.setattr(slicing, "SLICING", True)
+
+
+def test_exceptions_slice_keeps_try_blocks_and_throws_signatures():
+    kept = _text(slice_lines(CODE, "G05"))
+    assert "public void load() throws IOException {" in kept
+    assert "read();" not in kept  # only the signature of a throwing method
+    assert "} catch (IOException e) {" in kept and "log(e);" in kept
+    assert "return n * 2;" not in kept and "return id;" not in kept
+    # the enclosing class header and closing brace frame the slice
+    assert "public class Account {" in kept and kept[-1] == "}"
+
+
+def test_state_access_slice_keeps_fields_and_accessors():
+    kept = _text(slice_lines(CODE, "G07"))
+    assert "private String id;" in kept and "return id;" in kept
+    assert "write();" not in kept and "return n * 2;" not in kept
+
+
+def test_signatures_slice_keeps_imports_and_member_headers_only():
+    kept = _text(slice_lines(CODE, "G08"))
+    assert "import java.util.List;" in kept
+    assert "private int twice(int n) {" in kept
+    assert "return n * 2;" not in kept
+
+
+def test_guidelines_without_a_slicer_see_the_whole_code():
+    assert slice_lines(CODE, "G01") is None
+    assert slice_lines("", "G05") is None
+
+
+def test_slice_chunk_blanks_other_lines_but_keeps_line_numbers():
+    chunk = Chunk(0, 1, len(CODE.splitlines()), CODE, "")
+    sliced = slice_chunk(chunk, frozenset({3, 4, 25}))
+    assert sliced.text.count("\n") == CODE.count("\n")
+    assert [ln.strip() for ln in sliced.text.splitlines() if ln.strip()] == \
+        ["public class Account {", "private String id;", "}"]
+    assert slice_chunk(chunk, frozenset({2})) is None  # only a blank line: nothing to review
+
+
+def test_empty_slices_mark_guidelines_with_nothing_to_review():
+    out = empty_slices(CODE, [Chunk(0, 1, len(CODE.splitlines()), CODE, "")])
+    assert set(out) == {"G10"}  # no equals/hashCode anywhere
+    assert out["G10"]["status"] == "not_applicable"
+    assert "G10" not in empty_slices(CODE, [Chunk(0, 1, 1, CODE, "")], decided={"G10"})
@@ -0,0 +1,142 @@
+# tests/test_static_checks.py
+import pytest
+
+from core import static_checks
+from core.java_source import parse_source
+from core.static_checks import check_g06, check_g07, check_g08, check_g09, check_g10, run_static_checks
+
+
+def _check(detector, code):
+    return detector(*parse_source(code))
+
+
+@pytest.fixture(autouse=True)
+def static_checks_on(monkeypatch):
+    monkeypatch.setattr(static_checks, "STATIC_CHECKS", True)
+
+
+# -----------------------
+# G06 legacy collections
+# -----------------------
+def test_g06_flags_legacy_collections_with_their_lines():
+    code = (
+        "import java.util.Vector;\n"
+        "class A {\n"
+        "    private Vector<String> names = new Vector<>();\n"
+        "    void run() { Stack<Integer> s = new Stack<>(); }\n"
+        "}\n"
+    )
+    res = _check(check_g06, code)
+    assert res["status"] == "findings"
+    assert "Legacy collection Vector" in res["content"] and "(lines 1,3)" in res["content"]
+    assert "Legacy collection Stack" in res["content"] and "run in A (line 4)" in res["content"]
+
+
+def test_g06_ignores_legacy_names_outside_type_position():
+    code = "class A {\n    private List<String> xs;\n    int n() { return Vector.size(); }\n}\n"
+    assert _check(check_g06, code) is None  # collections in use: the choice is the LLM's
+
+
+def test_g06_not_applicable_without_collections_or_arrays():
+    assert _check(check_g06, "class A {\n    int x;\n}\n")["status"] == "not_applicable"
+    assert _check(check_g06, "class A {\n    int[] xs;\n}\n") is None
+
+
+# -----------------------
+# G07 public mutable fields
+# -----------------------
+def test_g07_flags_public_non_final_fields():
+    code = "class A {\n    public boolean open;\n    public static final int MAX = 1;\n    private int n;\n}\n"
+    res = _check(check_g07, code)
+    assert res["status"] == "findings"
+    assert "Public mutable field open" in res["content"] and "isOpen()" in res["content"]
+    assert "MAX" not in res["content"]
+
+
+def test_g07_skips_interface_fields():
+    code = "interface Limits {\n    int MAX = 10;\n}\nclass A {\n    private int n;\n}\n"
+    assert _check(check_g07, code)["status"] == "not_applicable"
+
+
+def test_g07_leaves_package_private_fields_to_the_llm():
+    code = "class A {\n    public int shown;\n    int count;\n}\n"
+    assert _check(check_g07, code) is None
+    assert _check(check_g07, "class A {\n    protected String name;\n}\n") is None
+
+
+# -----------------------
+# G08 concrete types in signatures
+# -----------------------
+def test_g08_flags_concrete_collections_in_non_private_signatures():
+    code = (
+        "class A {\n"
+        "    public ArrayList<String> names;\n"
+        "    private HashMap<String, Integer> index;\n"
+        "    public void load(HashMap<String, Integer> m) {}\n"
+        "}\n"
+    )
+    res = _check(check_g08, code)
+    assert res["status"] == "findings"
+    assert "ArrayList -> List" in res["content"] and "HashMap -> Map" in res["content"]
+    assert "index" not in res["content"]
+
+
+def test_g08_not_applicable_with_interface_types_only():
+    code = "class A {\n    public List<String> names() { return new ArrayList<>(); }\n}\n"
+    assert _check(check_g08, code)["status"] == "not_applicable"
+
+
+# -----------------------
+# G09 interfaces
+# -----------------------
+def test_g09_is_decided_only_without_interfaces():
+    assert _check(check_g09, "class A {}\n")["status"] == "not_applicable"
+    assert _check(check_g09, "interface Shape {\n    double area();\n}\n") is None
+
+
+# -----------------------
+# G10 equals/hashCode
+# -----------------------
+def test_g10_flags_equals_without_hashcode_and_the_reverse():
+    code = (
+        "class A {\n    public boolean equals(Object o) { return o == this; }\n}\n"
+        "class B {\n    public int hashCode() { return 1; }\n}\n"
+    )
+    res = _check(check_g10, code)
+    assert res["status"] == "findings"
+    assert "equals in A (line 2)" in res["content"] and "hashCode in B (line 5)" in res["content"]
+
+
+def test_g10_only_counts_the_overriding_arity():
+    # equals(a, b) and hashCode(seed) are overloads, not overrides
+    code = (
+        "class A {\n"
+        "    static boolean equals(A a, A b) { return a == b; }\n"
+        "    int hashCode(int seed) { return seed; }\n"
+        "}\n"
+    )
+    assert _check(check_g10, code)["status"] == "not_applicable"
+    code = "class A {\n    public boolean equals(Object o) { return true; }\n    int hashCode(int seed) { return seed; }\n}\n"
+    assert _check(check_g10, code)["status"] == "findings"
+
+
+def test_g10_leaves_a_complete_pair_to_the_llm():
+    code = (
+        "class A {\n"
+        "    public boolean equals(Object o) { return o instanceof A; }\n"
+        "    public int hashCode() { return 1; }\n"
+        "}\n"
+    )
+    assert _check(check_g10, code) is None
+
+
+# -----------------------
+# Pre-pass
+# -----------------------
+def test_run_static_checks_returns_decided_guidelines_only(monkeypatch):
+    code = "interface Shape {\n    double area();\n}\nclass A {\n    int n;\n}\n"
+    out = run_static_checks(code)
+    assert set(out) == {"G06", "G08", "G10"}  # G07 (package-private n) and G09 go to the LLM
+    assert run_static_checks("") == {}
+    monkeypatch.setattr(static_checks, "STATIC_CHECKS", False)
+    assert run_static_checks(code) == {}
@@ -0,0 +1,92 @@
+# tests/test_units.py
+from core.units import code_units, normalize
+
+CODE = """\
+package demo;
+
+import java.util.List;
+
+/** Accounts. */
+public class Account {
+    private String id;
+
+    static { init(); }
+
+    public Account(String id) {
+        this.id = id;
+    }
+
+    public String getId() {
+        return id;
+    }
+
+    interface Listener {
+        void changed();
+    }
+}
+
+class Other {
+    public String getId() {
+        return id;
+    }
+}
+"""
+
+
+def _by_name(code):
+    return {u.name: u for u in code_units(code)}
+
+
+def test_declarations_unit_comes_first_and_bodies_follow_in_file_order():
+    units = code_units(CODE)
+    assert [u.kind for u in units] == ["declarations", "initializer", "constructor", "method", "method"]
+    assert [u.name for u in units[1:]] == ["Account.initializer", "Account.Account", "Account.getId", "Other.getId"]
+    assert [u.chunk.index for u in units] == list(range(len(units)))
+    assert code_units("") == [] and code_units("  \n") == []
+
+
+def test_skeleton_and_bodies_cover_every_line():
+    decl, *bodies = code_units(CODE)
+    lines = CODE.splitlines(keepends=True)
+    covered = [n for u in bodies for n in range(u.chunk.start_line, u.chunk.end_line + 1)]
+    assert len(covered) == len(set(covered))  # bodies never overlap
+    for u in bodies:
+        assert u.chunk.text == "".join(lines[u.chunk.start_line - 1:u.chunk.end_line])
+    # every other line is in the skeleton, each body collapsed to one signature line
+    skeleton = decl.chunk.text.splitlines(keepends=True)
+    assert len(skeleton) == len(lines) - len(covered) + len(bodies)
+    rebuilt, pos = [], 0
+    for u in bodies:
+        rebuilt.extend(lines[pos:u.chunk.start_line - 1])
+        rebuilt.append(u.chunk.text)
+        pos = u.chunk.end_line
+    rebuilt.extend(lines[pos:])
+    assert "".join(rebuilt) == CODE
+    assert "    public String getId() { ... }\n" in skeleton
+    assert "return id;" not in decl.chunk.text and "private String id;" in decl.chunk.text
+
+
+def test_same_method_in_another_type_gets_another_digest():
+    units = _by_name(CODE)
+    assert normalize(units["Account.getId"].chunk.text) == normalize(units["Other.getId"].chunk.text)
+    assert units["Account.getId"].digest != units["Other.getId"].digest
+
+
+def test_whitespace_and_comment_edits_keep_the_digest():
+    edited = CODE.replace(
+        "        return id;\n    }\n\n    interface",
+        "        // plain accessor\n        return   id; /* no copy */\n    }\n\n    interface",
+    )
+    assert edited != CODE
+    before, after = _by_name(CODE), _by_name(edited)
+    assert after["Account.getId"].digest == before["Account.getId"].digest
+    assert after[""].digest == before[""].digest  # the skeleton did not change either
+    assert after["Account.getId"].chunk.end_line == before["Account.getId"].chunk.end_line + 1
+
+
+def test_code_edits_and_string_literals_change_the_digest():
+    before = _by_name(CODE)
+    after = _by_name(CODE.replace("this.id = id;", "this.id = id.trim();"))
+    assert after["Account.Account"].digest != before["Account.Account"].digest
+    assert after["Account.getId"].digest == before["Account.getId"].digest
+    assert normalize('s = "a // b";  // note') == 's = "a // b";'